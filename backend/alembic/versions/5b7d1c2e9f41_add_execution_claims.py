@@ -0,0 +1,50 @@
+"""Add execution claim lease and idempotency key
+
+Revision ID: 5b7d1c2e9f41
+Revises: 9012a7537f3f
+Create Date: 2026-10-18 10:12:41.503118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b7d1c2e9f41'
+down_revision = '9012a7537f3f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('post_executions', sa.Column('idempotency_key', sa.String(length=80), nullable=True))
+    op.add_column('post_executions', sa.Column('claim_token', sa.String(length=32), nullable=True))
+    op.add_column('post_executions', sa.Column('lease_expires_at', sa.DateTime(), nullable=True))
+    op.add_column('post_executions', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+    op.add_column('post_executions', sa.Column('upload_started_at', sa.DateTime(), nullable=True))
+
+    # Ключ получает одно выполнение на пару (пост, аккаунт): успешное, иначе самое новое.
+    # Дубликаты, созданные повторной публикацией, остаются с NULL ключом.
+    op.execute("""
+        UPDATE post_executions pe
+        SET idempotency_key = pe.post_id::text || ':' || pe.account_id::text
+        FROM (
+            SELECT DISTINCT ON (post_id, account_id) id
+            FROM post_executions
+            ORDER BY post_id, account_id, (status = 'SUCCESS') DESC, created_at DESC
+        ) keep
+        WHERE pe.id = keep.id
+    """)
+
+    op.create_index(op.f('ix_post_executions_idempotency_key'), 'post_executions', ['idempotency_key'], unique=True)
+    op.create_index(op.f('ix_post_executions_lease_expires_at'), 'post_executions', ['lease_expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_post_executions_lease_expires_at'), table_name='post_executions')
+    op.drop_index(op.f('ix_post_executions_idempotency_key'), table_name='post_executions')
+    op.drop_column('post_executions', 'upload_started_at')
+    op.drop_column('post_executions', 'heartbeat_at')
+    op.drop_column('post_executions', 'lease_expires_at')
+    op.drop_column('post_executions', 'claim_token')
+    op.drop_column('post_executions', 'idempotency_key')
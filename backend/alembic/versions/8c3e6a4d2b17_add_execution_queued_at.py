@@ -0,0 +1,25 @@
+"""Add execution queued_at
+
+Revision ID: 8c3e6a4d2b17
+Revises: 5b7d1c2e9f41
+Create Date: 2026-10-18 11:04:27.918342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c3e6a4d2b17'
+down_revision = '5b7d1c2e9f41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('post_executions', sa.Column('queued_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE post_executions SET queued_at = created_at")
+
+
+def downgrade() -> None:
+    op.drop_column('post_executions', 'queued_at')
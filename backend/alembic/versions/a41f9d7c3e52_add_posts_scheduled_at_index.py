@@ -0,0 +1,24 @@
+"""Add posts scheduled_at index
+
+Revision ID: a41f9d7c3e52
+Revises: 8c3e6a4d2b17
+Create Date: 2026-10-18 12:21:09.337451
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41f9d7c3e52'
+down_revision = '8c3e6a4d2b17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_posts_scheduled_at'), 'posts', ['scheduled_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_posts_scheduled_at'), table_name='posts')
@@ -0,0 +1,47 @@
+"""Add cascade deletes and post archive
+
+Revision ID: a6d2f8e4b153
+Revises: f3b9c6e2d418
+Create Date: 2026-10-18 16:12:05.647390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d2f8e4b153'
+down_revision = 'f3b9c6e2d418'
+branch_labels = None
+depends_on = None
+
+
+# (таблица, колонка, ссылка) - внешние ключи, удаление по которым выполняет БД
+CASCADE_FOREIGN_KEYS = [
+    ('accounts', 'group_id', 'groups'),
+    ('activity_logs', 'account_id', 'accounts'),
+    ('post_executions', 'account_id', 'accounts'),
+    ('post_executions', 'post_id', 'posts'),
+]
+
+
+def _recreate_foreign_keys(ondelete) -> None:
+    for table, column, referent in CASCADE_FOREIGN_KEYS:
+        name = f'{table}_{column}_fkey'
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, referent, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    _recreate_foreign_keys('CASCADE')
+    # Для каскада по accounts/posts PostgreSQL ищет дочерние строки по этим колонкам
+    op.create_index('ix_activity_logs_account_id', 'activity_logs', ['account_id'], unique=False)
+    op.create_index('ix_post_executions_account_id', 'post_executions', ['account_id'], unique=False)
+    op.add_column('posts', sa.Column('archived_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('posts', 'archived_at')
+    op.drop_index('ix_post_executions_account_id', table_name='post_executions')
+    op.drop_index('ix_activity_logs_account_id', table_name='activity_logs')
+    _recreate_foreign_keys(None)
@@ -0,0 +1,50 @@
+"""Add account daily quotas
+
+Revision ID: b7e2c94f1a08
+Revises: a41f9d7c3e52
+Create Date: 2026-10-18 13:02:55.146207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2c94f1a08'
+down_revision = 'a41f9d7c3e52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('account_daily_quotas',
+    sa.Column('account_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('posts_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['account_id'], ['accounts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('account_id', 'day')
+    )
+
+    # Переносим только сегодняшние счётчики: posts_count_today никогда не сбрасывался,
+    # поэтому значение осмысленно лишь для аккаунтов, публиковавших сегодня
+    op.execute("""
+        INSERT INTO account_daily_quotas (account_id, day, posts_count)
+        SELECT id, (now() AT TIME ZONE 'UTC')::date, posts_count_today
+        FROM accounts
+        WHERE posts_count_today > 0
+          AND last_post_at::date = (now() AT TIME ZONE 'UTC')::date
+    """)
+
+    op.drop_column('accounts', 'posts_count_today')
+
+
+def downgrade() -> None:
+    op.add_column('accounts', sa.Column('posts_count_today', sa.Integer(), nullable=True))
+    op.execute("""
+        UPDATE accounts a
+        SET posts_count_today = q.posts_count
+        FROM account_daily_quotas q
+        WHERE q.account_id = a.id AND q.day = (now() AT TIME ZONE 'UTC')::date
+    """)
+    op.drop_table('account_daily_quotas')
@@ -0,0 +1,89 @@
+"""Add unique proxy url
+
+Revision ID: b8c41e7d9f26
+Revises: a6d2f8e4b153
+Create Date: 2026-10-18 17:05:33.209871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8c41e7d9f26'
+down_revision = 'a6d2f8e4b153'
+branch_labels = None
+depends_on = None
+
+
+# Для каждого URL остаётся самый старый прокси, аккаунты дубликатов переводятся на него
+DUPLICATES_CTE = """
+    WITH ranked AS (
+        SELECT id, first_value(id) OVER (PARTITION BY url ORDER BY created_at, id) AS keep_id
+        FROM proxies
+    )
+"""
+
+
+# assigned_accounts дубликатов объединяются в оставшемся прокси (его читает ProxyManager)
+MERGE_ASSIGNED_SQL = DUPLICATES_CTE + """
+    , merged AS (
+        SELECT ranked.keep_id, json_agg(DISTINCT account_id) AS assigned
+        FROM ranked
+        JOIN proxies ON proxies.id = ranked.id
+        CROSS JOIN LATERAL json_array_elements_text(
+            CASE WHEN json_typeof(proxies.assigned_accounts) = 'array'
+                 THEN proxies.assigned_accounts ELSE '[]'::json END
+        ) AS account_id
+        GROUP BY ranked.keep_id
+        HAVING count(DISTINCT ranked.id) > 1
+    )
+    UPDATE proxies SET assigned_accounts = merged.assigned
+    FROM merged
+    WHERE proxies.id = merged.keep_id
+"""
+
+
+def _normalize_urls() -> None:
+    """
+    Привести существующие URL к каноничному виду, как при импорте
+
+    Иначе прокси, добавленный раньше в другой записи, не совпадёт с
+    импортируемым и уникальный индекс не защитит от дубликата.
+    Строки, которые не разбираются, остаются как есть.
+    """
+    from app.models.proxy import ProxyType
+    from app.services.proxy_importer import normalize_proxy_url
+
+    connection = op.get_bind()
+    rows = connection.execute(sa.text("SELECT id, url, type FROM proxies")).all()
+    for proxy_id, url, proxy_type in rows:
+        try:
+            normalized, _ = normalize_proxy_url(url, ProxyType[proxy_type])
+        except (ValueError, KeyError):
+            continue
+        if normalized != url:
+            connection.execute(
+                sa.text("UPDATE proxies SET url = :url WHERE id = :id"),
+                {"url": normalized, "id": proxy_id}
+            )
+
+
+def upgrade() -> None:
+    _normalize_urls()
+    op.execute(MERGE_ASSIGNED_SQL)
+    op.execute(DUPLICATES_CTE + """
+        UPDATE accounts SET proxy_id = ranked.keep_id
+        FROM ranked
+        WHERE accounts.proxy_id = ranked.id AND ranked.id <> ranked.keep_id
+    """)
+    op.execute(DUPLICATES_CTE + """
+        DELETE FROM proxies
+        USING ranked
+        WHERE proxies.id = ranked.id AND ranked.id <> ranked.keep_id
+    """)
+    op.create_index(op.f('ix_proxies_url'), 'proxies', ['url'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_proxies_url'), table_name='proxies')
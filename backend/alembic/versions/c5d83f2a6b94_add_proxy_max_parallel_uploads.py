@@ -0,0 +1,24 @@
+"""Add proxy max_parallel_uploads
+
+Revision ID: c5d83f2a6b94
+Revises: b7e2c94f1a08
+Create Date: 2026-10-18 13:47:30.602814
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d83f2a6b94'
+down_revision = 'b7e2c94f1a08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('proxies', sa.Column('max_parallel_uploads', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('proxies', 'max_parallel_uploads')
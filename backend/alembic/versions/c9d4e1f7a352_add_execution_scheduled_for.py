@@ -0,0 +1,24 @@
+"""Add execution scheduled_for
+
+Revision ID: c9d4e1f7a352
+Revises: b8c41e7d9f26
+Create Date: 2026-10-18 19:12:05.431867
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9d4e1f7a352'
+down_revision = 'b8c41e7d9f26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('post_executions', sa.Column('scheduled_for', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('post_executions', 'scheduled_for')
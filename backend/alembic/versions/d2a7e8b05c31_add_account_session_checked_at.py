@@ -0,0 +1,24 @@
+"""Add account session_checked_at
+
+Revision ID: d2a7e8b05c31
+Revises: c5d83f2a6b94
+Create Date: 2026-10-18 14:31:12.774019
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a7e8b05c31'
+down_revision = 'c5d83f2a6b94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('accounts', sa.Column('session_checked_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('accounts', 'session_checked_at')
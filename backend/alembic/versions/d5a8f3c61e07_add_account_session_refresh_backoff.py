@@ -0,0 +1,26 @@
+"""Add account session refresh backoff
+
+Revision ID: d5a8f3c61e07
+Revises: c9d4e1f7a352
+Create Date: 2026-10-18 19:40:18.206514
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a8f3c61e07'
+down_revision = 'c9d4e1f7a352'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('accounts', sa.Column('session_refresh_after', sa.DateTime(), nullable=True))
+    op.add_column('accounts', sa.Column('session_refresh_failures', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('accounts', 'session_refresh_failures')
+    op.drop_column('accounts', 'session_refresh_after')
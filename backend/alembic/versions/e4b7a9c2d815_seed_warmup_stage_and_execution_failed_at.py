@@ -0,0 +1,34 @@
+"""Seed warmup stage for existing accounts and add execution failed_at
+
+Revision ID: e4b7a9c2d815
+Revises: d5a8f3c61e07
+Create Date: 2026-10-18 23:05:41.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b7a9c2d815'
+down_revision = 'd5a8f3c61e07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # До планировщика прогрева warmup_stage не читался и все аккаунты публиковали
+    # по полному лимиту: существующие аккаунты считаются прогретыми
+    op.execute("UPDATE accounts SET warmup_stage = 3 WHERE warmup_stage IS NULL OR warmup_stage < 3")
+
+    op.add_column('post_executions', sa.Column('failed_at', sa.DateTime(), nullable=True))
+    # Точное время прошлых ошибок неизвестно: берём последнюю известную отметку выполнения
+    op.execute(
+        "UPDATE post_executions SET failed_at = COALESCE(heartbeat_at, queued_at, created_at) "
+        "WHERE status = 'FAILED'"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('post_executions', 'failed_at')
+    # warmup_stage не восстанавливается: прежние значения не читались
@@ -0,0 +1,31 @@
+"""Add posts listing indexes
+
+Revision ID: e8f14b3c7a90
+Revises: d2a7e8b05c31
+Create Date: 2026-10-18 15:02:47.318245
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8f14b3c7a90'
+down_revision = 'd2a7e8b05c31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_posts_created_at_id', 'posts', ['created_at', 'id'], unique=False)
+    op.create_index(
+        'ix_post_executions_post_id_created_at_id',
+        'post_executions',
+        ['post_id', 'created_at', 'id'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_post_executions_post_id_created_at_id', table_name='post_executions')
+    op.drop_index('ix_posts_created_at_id', table_name='posts')
@@ -0,0 +1,43 @@
+"""Add accounts listing indexes
+
+Revision ID: f3b9c6e2d418
+Revises: e8f14b3c7a90
+Create Date: 2026-10-18 15:40:19.582031
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b9c6e2d418'
+down_revision = 'e8f14b3c7a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_accounts_created_at_id', 'accounts', ['created_at', 'id'], unique=False)
+    op.create_index(
+        'ix_accounts_group_id_created_at_id',
+        'accounts',
+        ['group_id', 'created_at', 'id'],
+        unique=False
+    )
+    op.create_index('ix_accounts_proxy_id', 'accounts', ['proxy_id'], unique=False)
+    op.create_index(
+        'ix_accounts_username_trgm',
+        'accounts',
+        ['username'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'username': 'gin_trgm_ops'}
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_accounts_username_trgm', table_name='accounts')
+    op.drop_index('ix_accounts_proxy_id', table_name='accounts')
+    op.drop_index('ix_accounts_group_id_created_at_id', table_name='accounts')
+    op.drop_index('ix_accounts_created_at_id', table_name='accounts')
@@ -0,0 +1,24 @@
+"""Add post posting_started_at
+
+Revision ID: f7c2d94b1e63
+Revises: e4b7a9c2d815
+Create Date: 2026-10-18 23:21:09.574302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7c2d94b1e63'
+down_revision = 'e4b7a9c2d815'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('posts', sa.Column('posting_started_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('posts', 'posting_started_at')
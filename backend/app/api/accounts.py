@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import UUID
@@ -6,13 +6,22 @@ from datetime import datetime
 from pydantic import BaseModel, Field
 import logging
 from app.core.database import get_db
-from app.core.security import encrypt_data, decrypt_data
+from app.core.security import encrypt_data, decrypt_data, encrypt_many
 from app.models.account import Account, AccountStatus
 from app.models.group import Group
 from app.models.user import User
 from app.models.activity_log import ActivityLog, LogStatus
-from app.schemas.account import AccountCreate, AccountUpdate, AccountResponse
+from app.schemas.account import (
+    AccountCreate, AccountUpdate, AccountResponse, AccountBulkDeleteRequest, AccountBulkUpdateRequest,
+)
 from app.api.auth import get_current_user
+from app.api.jobs import job_accepted, operation_response
+from app.services.group_counters import adjust_accounts_count, move_account_between_groups
+from app.utils.pagination import (
+    NEXT_CURSOR_HEADER, TOTAL_ESTIMATE_HEADER,
+    encode_cursor, decode_cursor, keyset_after, estimate_total,
+)
+from app.services.account_filters import account_conditions
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/accounts", tags=["accounts"])
@@ -45,6 +54,7 @@ class SessionImportRequest(BaseModel):
     proxy_id: Optional[UUID] = Field(None, description="ID прокси для привязки")
     group_id: Optional[UUID] = Field(None, description="ID группы для привязки")
     validate_session: bool = Field(False, description="Валидировать сессию после импорта")
+    warmup_stage: int = Field(0, ge=0, le=3, description="Стадия прогрева (3 - аккаунт уже прогрет)")
 
 
 @router.post("/", response_model=AccountResponse, status_code=status.HTTP_201_CREATED)
@@ -98,9 +108,12 @@ def create_account(account: AccountCreate, db: Session = Depends(get_db), curren
         proxy_id=account.proxy_id,
         proxy_url=proxy.url if proxy else None,  # Сохраняем для обратной совместимости
         proxy_type=proxy.type.value if proxy else None,  # Сохраняем для обратной совместимости
-        status=AccountStatus.LOGIN_REQUIRED
+        status=AccountStatus.LOGIN_REQUIRED,
+        warmup_stage=account.warmup_stage
     )
     db.add(db_account)
+    # Счётчик аккаунтов в группе меняется в той же транзакции
+    adjust_accounts_count(db, account.group_id, 1)
     db.commit()
     db.refresh(db_account)
     
@@ -108,34 +121,63 @@ def create_account(account: AccountCreate, db: Session = Depends(get_db), curren
     if not account.proxy_id:
         ProxyManager.assign_proxy_to_account(db, db_account)
     
-    # Обновляем счётчик аккаунтов в группе
-    if account.group_id:
-        group = db.query(Group).filter(Group.id == account.group_id).first()
-        group.accounts_count = len(group.accounts)
-        db.commit()
-    
     db.refresh(db_account)
     return db_account
 
 
 @router.get("/", response_model=List[AccountResponse])
 def list_accounts(
+    response: Response,
     current_user: User = Depends(get_current_user),
-    skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
     group_id: UUID = None,
     status_filter: AccountStatus = None,
+    language: Optional[str] = None,
+    proxy_id: Optional[UUID] = None,
+    warmup_stage: Optional[int] = Query(None, ge=0, le=3),
+    last_post_from: Optional[datetime] = None,
+    last_post_to: Optional[datetime] = None,
+    username: Optional[str] = Query(None, min_length=1, max_length=100),
+    with_total: bool = False,
     db: Session = Depends(get_db)
 ):
-    """Получить список всех аккаунтов"""
-    query = db.query(Account)
+    """
+    Получить список аккаунтов (новые первыми)
+    
+    Пагинация по курсору (created_at, id): курсор следующей страницы приходит
+    в заголовке X-Next-Cursor, его нужно передать в параметре cursor.
+    username - поиск по началу имени без учёта регистра.
+    with_total=true добавляет заголовок X-Total-Estimate с приблизительным
+    общим числом аккаунтов под фильтром.
+    """
+    conditions = account_conditions(
+        group_id=group_id,
+        status=status_filter,
+        language=language,
+        proxy_id=proxy_id,
+        warmup_stage=warmup_stage,
+        last_post_from=last_post_from,
+        last_post_to=last_post_to,
+        username=username,
+    )
+    query = db.query(Account).filter(*conditions)
+    
+    filtered = query
+    position = decode_cursor(cursor)
+    if position:
+        query = query.filter(keyset_after(Account.created_at, Account.id, position))
+    accounts = query.order_by(Account.created_at.desc(), Account.id.desc()).limit(limit + 1).all()
     
-    if group_id:
-        query = query.filter(Account.group_id == group_id)
-    if status_filter:
-        query = query.filter(Account.status == status_filter)
+    if len(accounts) > limit:
+        accounts = accounts[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(accounts[-1].created_at, accounts[-1].id)
+    
+    if with_total:
+        response.headers[TOTAL_ESTIMATE_HEADER] = str(
+            estimate_total(db, filtered, Account.__tablename__, bool(conditions))
+        )
     
-    accounts = query.offset(skip).limit(limit).all()
     return accounts
 
 
@@ -226,21 +268,11 @@ def update_account(account_id: UUID, account_update: AccountUpdate, db: Session
     for field, value in update_data.items():
         setattr(db_account, field, value)
     
+    # Обновляем счётчики в группах
+    move_account_between_groups(db, old_group_id, db_account.group_id)
     db.commit()
     db.refresh(db_account)
     
-    # Обновляем счётчики в группах
-    if old_group_id != db_account.group_id:
-        if old_group_id:
-            old_group = db.query(Group).filter(Group.id == old_group_id).first()
-            if old_group:
-                old_group.accounts_count = len(old_group.accounts)
-        if db_account.group_id:
-            new_group = db.query(Group).filter(Group.id == db_account.group_id).first()
-            if new_group:
-                new_group.accounts_count = len(new_group.accounts)
-        db.commit()
-    
     return db_account
 
 
@@ -254,129 +286,105 @@ def delete_account(account_id: UUID, db: Session = Depends(get_db), current_user
             detail="Аккаунт не найден"
         )
     
-    group_id = db_account.group_id
+    # Обновляем счётчик в группе
+    adjust_accounts_count(db, db_account.group_id, -1)
     db.delete(db_account)
     db.commit()
     
-    # Обновляем счётчик в группе
-    if group_id:
-        group = db.query(Group).filter(Group.id == group_id).first()
-        if group:
-            group.accounts_count = len(group.accounts)
-            db.commit()
-    
     return None
 
 
-@router.post("/{account_id}/login")
-def login_account(
-    account_id: UUID, 
-    request: LoginRequest = LoginRequest(),
-    db: Session = Depends(get_db), 
+@router.post("/bulk-delete")
+def bulk_delete_accounts(
+    request: AccountBulkDeleteRequest,
+    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Авторизоваться в Instagram"""
-    from app.services.instagram import InstagramService
-    from app.utils.logging import log_activity, update_account_status
-    from app.models.activity_log import LogStatus
-    from app.models.proxy import Proxy
-    from datetime import datetime
-    from sqlalchemy.orm import joinedload
+    """
+    Удалить несколько аккаунтов
     
-    # Загружаем аккаунт с прокси
-    db_account = db.query(Account).options(joinedload(Account.proxy)).filter(Account.id == account_id).first()
-    if not db_account:
+    История аккаунтов (выполнения, логи) удаляется каскадно на стороне БД.
+    """
+    from app.services.bulk_operations import delete_accounts
+    
+    result = delete_accounts(db, request.account_ids)
+    logger.info(f"Массовое удаление аккаунтов: удалено {result['deleted']}, не найдено {result['not_found']}")
+    return result
+
+
+@router.post("/bulk-update")
+def bulk_update_accounts(
+    request: AccountBulkUpdateRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Массово изменить аккаунты (группа, язык, статус, этап прогрева, прокси)
+    
+    Аккаунты выбираются списком account_ids или фильтром filter и меняются
+    одним UPDATE. Счётчики групп и назначения прокси обновляются в той же транзакции.
+    """
+    from app.services.bulk_operations import update_accounts
+    
+    changes = request.changes()
+    if not changes and not request.detach_proxies and not request.assign_free_proxies:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Аккаунт не найден"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Не передано ни одного изменения"
         )
     
-    # Если есть proxy_id, но proxy_url не установлен, обновляем из прокси
-    if db_account.proxy_id and not db_account.proxy_url and db_account.proxy:
-        db_account.proxy_url = db_account.proxy.url
-        db_account.proxy_type = db_account.proxy.type.value
-        db.commit()
-        db.refresh(db_account)
+    if changes.get("group_id"):
+        group = db.query(Group.id).filter(Group.id == changes["group_id"]).first()
+        if not group:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Группа не найдена"
+            )
     
-    # Создаём сервис Instagram
-    instagram_service = InstagramService(db_account)
+    conditions = []
+    if request.filter is not None:
+        conditions = account_conditions(**request.filter.dict(exclude_none=True))
+    
+    return update_accounts(
+        db,
+        account_ids=request.account_ids,
+        conditions=conditions,
+        changes=changes,
+        detach_proxies=request.detach_proxies,
+        assign_free_proxies=request.assign_free_proxies,
+    )
+
+
+@router.post("/{account_id}/login")
+def login_account(
+    account_id: UUID, 
+    request: LoginRequest = LoginRequest(),
+    background: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Авторизоваться в Instagram
     
-    # Пытаемся авторизоваться (с 2FA кодом если есть)
-    result = instagram_service.login(verification_code=request.verification_code)
+    С background=true запрос ставится в очередь, ответ - job_id для GET /api/jobs/{job_id}
+    """
+    from app.services import account_operations
     
-        # Логируем результат авторизации для отладки
-    import logging
-    logger = logging.getLogger(__name__)
-    logger.info(f"Результат авторизации для аккаунта {db_account.username}: success={result.get('success')}, message={result.get('message')}")
-    if not result.get("success"):
-        logger.warning(f"Ошибка авторизации для {db_account.username}: {result.get('message')}, тип ошибки: {result.keys()}")
+    if background:
+        from backend.celery_app.tasks.accounts import task_login_account
+        return job_accepted(task_login_account.delay(str(account_id), request.verification_code), current_user)
     
-    if result["success"]:
-        # Сохраняем сессию
-        db_account.session_data = result["session_data"]
-        db_account.device_id = result.get("device_id")
-        db_account.user_agent = result.get("user_agent")
-        db_account.status = AccountStatus.ACTIVE
-        db_account.last_login_at = datetime.utcnow()
-        db_account.failed_attempts = 0
-        db.commit()
-        db.refresh(db_account)
-        
-        # Логируем успешную авторизацию
-        log_activity(
-            db=db,
-            action="login",
-            status=LogStatus.SUCCESS,
-            account_id=account_id,
-            details={"message": result["message"]},
-            duration_ms=result.get("duration_ms")
-        )
-        
-        return {
-            "success": True,
-            "message": result["message"],
-            "account": AccountResponse.from_orm(db_account)
-        }
-    else:
-        # Обновляем статус аккаунта
-        if result.get("requires_2fa"):
-            # Для 2FA не меняем статус, это нормальная ситуация
-            pass
-        else:
-            update_account_status(
-                db=db,
-                account=db_account,
-                new_status=AccountStatus.LOGIN_REQUIRED.value,
-                error_message=result["message"]
-            )
-        
-        # Логируем неудачную попытку
-        log_activity(
-            db=db,
-            action="login",
-            status=LogStatus.FAILED,
-            account_id=account_id,
-            error_message=result["message"]
-        )
-        
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=result["message"]
-        )
+    return operation_response(account_operations.login_account(account_id, request.verification_code))
 
 
 @router.post("/{account_id}/2fa")
 def submit_2fa_code(
     account_id: UUID, 
     request: dict,
-    db: Session = Depends(get_db), 
+    background: bool = False,
     current_user: User = Depends(get_current_user)
 ):
     """Отправить 2FA код для завершения авторизации"""
-    from app.services.instagram import InstagramService
-    from app.utils.logging import log_activity, update_account_status
-    from app.models.activity_log import LogStatus
-    from sqlalchemy.orm import joinedload
+    from app.services import account_operations
     
     # Проверяем наличие кода
     code = request.get("code")
@@ -386,77 +394,11 @@ def submit_2fa_code(
             detail="Не указан 2FA код"
         )
     
-    # Загружаем аккаунт с прокси
-    db_account = db.query(Account).options(joinedload(Account.proxy)).filter(Account.id == account_id).first()
-    if not db_account:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Аккаунт не найден"
-        )
+    if background:
+        from backend.celery_app.tasks.accounts import task_submit_2fa_code
+        return job_accepted(task_submit_2fa_code.delay(str(account_id), code), current_user)
     
-    try:
-        # Создаем сервис Instagram
-        instagram_service = InstagramService(db_account)
-        
-        # Отправляем 2FA код
-        result = instagram_service.submit_2fa_code(code)
-        
-        if result["success"]:
-            # Сохраняем сессию в базу данных
-            db_account.session_data = result["session_data"]
-            db_account.status = AccountStatus.ACTIVE
-            db_account.last_login_at = datetime.utcnow()
-            
-            db.commit()
-            db.refresh(db_account)
-            
-            # Логируем успешную авторизацию
-            log_activity(
-                db=db,
-                action="2fa_login",
-                status=LogStatus.SUCCESS,
-                account_id=account_id,
-                details={"message": result["message"]},
-                duration_ms=result.get("duration_ms")
-            )
-            
-            return {
-                "success": True,
-                "message": result["message"],
-                "account": AccountResponse.from_orm(db_account)
-            }
-        else:
-            # Логируем ошибку
-            log_activity(
-                db=db,
-                action="2fa_login",
-                status=LogStatus.ERROR,
-                account_id=account_id,
-                details={"error": result["message"]},
-                duration_ms=result.get("duration_ms")
-            )
-            
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=result["message"]
-            )
-            
-    except Exception as e:
-        logger.error(f"Ошибка при отправке 2FA кода для аккаунта {account_id}: {str(e)}")
-        
-        # Логируем ошибку
-        log_activity(
-            db=db,
-            action="2fa_login",
-            status=LogStatus.ERROR,
-            account_id=account_id,
-            details={"error": str(e)}
-        )
-        
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Внутренняя ошибка сервера: {str(e)}"
-        )
+    return operation_response(account_operations.submit_2fa_code(account_id, code))
 
 
 @router.delete("/{account_id}/proxy", response_model=AccountResponse)
@@ -481,59 +423,15 @@ def remove_proxy_from_account(account_id: UUID, db: Session = Depends(get_db), c
 
 
 @router.get("/{account_id}/status")
-def get_account_status(account_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_account_status(account_id: UUID, background: bool = False, current_user: User = Depends(get_current_user)):
     """Проверить статус аккаунта в Instagram"""
-    from app.services.instagram import InstagramService
-    from app.utils.logging import log_activity, update_account_status
-    from app.models.activity_log import LogStatus
-    
-    account = db.query(Account).filter(Account.id == account_id).first()
-    if not account:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Аккаунт не найден"
-        )
+    from app.services import account_operations
     
-    # Проверяем статус через Instagram API
-    instagram_service = InstagramService(account)
-    result = instagram_service.check_status()
+    if background:
+        from backend.celery_app.tasks.accounts import task_check_account_status
+        return job_accepted(task_check_account_status.delay(str(account_id)), current_user)
     
-    # Обновляем статус аккаунта, если нужно
-    if result["success"]:
-        if account.status != AccountStatus.ACTIVE:
-            account.status = AccountStatus.ACTIVE
-            account.failed_attempts = 0
-            db.commit()
-        
-        log_activity(
-            db=db,
-            action="check_status",
-            status=LogStatus.SUCCESS,
-            account_id=account_id,
-            details=result,
-            duration_ms=result.get("duration_ms")
-        )
-    else:
-        if result.get("status") == "login_required":
-            update_account_status(
-                db=db,
-                account=account,
-                new_status=AccountStatus.LOGIN_REQUIRED.value,
-                error_message=result.get("message")
-            )
-        
-        log_activity(
-            db=db,
-            action="check_status",
-            status=LogStatus.FAILED,
-            account_id=account_id,
-            error_message=result.get("message")
-        )
-    
-    return {
-        "account": AccountResponse.from_orm(account),
-        "instagram_status": result
-    }
+    return operation_response(account_operations.check_account_status(account_id))
 
 
 class ProfileUpdate(BaseModel):
@@ -545,128 +443,32 @@ class ProfileUpdate(BaseModel):
 
 
 @router.get("/{account_id}/profile")
-def get_account_profile(account_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_account_profile(account_id: UUID, background: bool = False, current_user: User = Depends(get_current_user)):
     """Получить информацию о профиле Instagram аккаунта"""
-    from app.services.instagram import InstagramService
-    from app.utils.logging import log_activity
-    from app.models.activity_log import LogStatus
-    from datetime import datetime
-    
-    account = db.query(Account).filter(Account.id == account_id).first()
-    if not account:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Аккаунт не найден"
-        )
-    
-    # Создаём сервис Instagram
-    instagram_service = InstagramService(account)
+    from app.services import account_operations
     
-    # Получаем информацию о профиле
-    result = instagram_service.get_profile()
+    if background:
+        from backend.celery_app.tasks.accounts import task_get_account_profile
+        return job_accepted(task_get_account_profile.delay(str(account_id)), current_user)
     
-    if result["success"]:
-        # Логируем успех
-        log_activity(
-            db=db,
-            action="get_profile",
-            status=LogStatus.SUCCESS,
-            account_id=account_id,
-            duration_ms=result.get("duration_ms")
-        )
-        return result
-    else:
-        # Логируем ошибку
-        log_activity(
-            db=db,
-            action="get_profile",
-            status=LogStatus.FAILED,
-            account_id=account_id,
-            error_message=result.get("message")
-        )
-        
-        # Обновляем статус аккаунта при необходимости
-        if result.get("requires_login"):
-            from app.utils.logging import update_account_status
-            update_account_status(
-                db=db,
-                account=account,
-                new_status=AccountStatus.LOGIN_REQUIRED.value,
-                error_message="Требуется повторная авторизация"
-            )
-        
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=result.get("message", "Ошибка получения профиля")
-        )
+    return operation_response(account_operations.get_account_profile(account_id))
 
 
 @router.put("/{account_id}/profile")
 def update_account_profile(
     account_id: UUID,
     profile_update: ProfileUpdate,
-    db: Session = Depends(get_db),
+    background: bool = False,
     current_user: User = Depends(get_current_user)
 ):
     """Обновить информацию профиля Instagram аккаунта"""
-    from app.services.instagram import InstagramService
-    from app.utils.logging import log_activity, update_account_status
-    from app.models.activity_log import LogStatus
-    from datetime import datetime
+    from app.services import account_operations
     
-    account = db.query(Account).filter(Account.id == account_id).first()
-    if not account:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Аккаунт не найден"
-        )
+    if background:
+        from backend.celery_app.tasks.accounts import task_update_account_profile
+        return job_accepted(task_update_account_profile.delay(str(account_id), profile_update.dict()), current_user)
     
-    # Создаём сервис Instagram
-    instagram_service = InstagramService(account)
-    
-    # Обновляем профиль
-    result = instagram_service.update_profile(
-        biography=profile_update.biography,
-        full_name=profile_update.full_name,
-        external_url=profile_update.external_url,
-        phone_number=profile_update.phone_number,
-        email=profile_update.email
-    )
-    
-    if result["success"]:
-        # Логируем успех
-        log_activity(
-            db=db,
-            action="update_profile",
-            status=LogStatus.SUCCESS,
-            account_id=account_id,
-            details={"updated_fields": {k: v for k, v in profile_update.dict().items() if v is not None}},
-            duration_ms=result.get("duration_ms")
-        )
-        return result
-    else:
-        # Логируем ошибку
-        log_activity(
-            db=db,
-            action="update_profile",
-            status=LogStatus.FAILED,
-            account_id=account_id,
-            error_message=result.get("message")
-        )
-        
-        # Обновляем статус аккаунта при необходимости
-        if result.get("requires_login"):
-            update_account_status(
-                db=db,
-                account=account,
-                new_status=AccountStatus.LOGIN_REQUIRED.value,
-                error_message="Требуется повторная авторизация"
-            )
-        
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=result.get("message", "Ошибка обновления профиля")
-        )
+    return operation_response(account_operations.update_account_profile(account_id, profile_update.dict()))
 
 
 class ProfilePrivacyUpdate(BaseModel):
@@ -677,63 +479,17 @@ class ProfilePrivacyUpdate(BaseModel):
 def toggle_profile_privacy(
     account_id: UUID,
     privacy_update: ProfilePrivacyUpdate,
-    db: Session = Depends(get_db),
+    background: bool = False,
     current_user: User = Depends(get_current_user)
 ):
     """Изменить приватность профиля (открыть/закрыть)"""
-    from app.services.instagram import InstagramService
-    from app.utils.logging import log_activity, update_account_status
-    from app.models.activity_log import LogStatus
-    from datetime import datetime
-    
-    account = db.query(Account).filter(Account.id == account_id).first()
-    if not account:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Аккаунт не найден"
-        )
-    
-    # Создаём сервис Instagram
-    logger.warning(f"[DEBUG] toggle_profile_privacy вызван для аккаунта: {account.username}")
-    instagram_service = InstagramService(account)
+    from app.services import account_operations
     
-    # Изменяем приватность профиля
-    result = instagram_service.set_profile_privacy(privacy_update.is_private)
+    if background:
+        from backend.celery_app.tasks.accounts import task_set_profile_privacy
+        return job_accepted(task_set_profile_privacy.delay(str(account_id), privacy_update.is_private), current_user)
     
-    if result["success"]:
-        # Логируем успех
-        log_activity(
-            db=db,
-            action="set_profile_privacy",
-            status=LogStatus.SUCCESS,
-            account_id=account_id,
-            details={"is_private": privacy_update.is_private},
-            duration_ms=result.get("duration_ms")
-        )
-        return result
-    else:
-        # Логируем ошибку
-        log_activity(
-            db=db,
-            action="set_profile_privacy",
-            status=LogStatus.FAILED,
-            account_id=account_id,
-            error_message=result.get("message")
-        )
-        
-        # Обновляем статус аккаунта при необходимости
-        if result.get("requires_login"):
-            update_account_status(
-                db=db,
-                account=account,
-                new_status=AccountStatus.LOGIN_REQUIRED.value,
-                error_message="Требуется повторная авторизация"
-            )
-        
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=result.get("message", "Ошибка изменения приватности")
-        )
+    return operation_response(account_operations.set_profile_privacy(account_id, privacy_update.is_private))
 
 
 class SessionImport(BaseModel):
@@ -758,12 +514,12 @@ def import_session(
     3. Импортируйте через этот endpoint
     4. Аккаунт станет ACTIVE без повторной авторизации
     """
-    from app.services.instagram import InstagramService
+    from app.services.instagram import InstagramService, instagram_account_options
     from app.utils.logging import log_activity
     from app.models.activity_log import LogStatus
     from datetime import datetime
     
-    db_account = db.query(Account).filter(Account.id == account_id).first()
+    db_account = db.query(Account).options(*instagram_account_options()).filter(Account.id == account_id).first()
     if not db_account:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -826,6 +582,7 @@ class BulkImportRequest(BaseModel):
     proxy_id: Optional[UUID] = None
     language: str = "en"
     validate_sessions: bool = False  # Валидировать сессии при импорте (может не работать без прокси)
+    warmup_stage: int = Field(0, ge=0, le=3)  # Стадия прогрева импортируемых аккаунтов
 
 
 @router.post("/bulk-import")
@@ -868,17 +625,22 @@ def bulk_import_accounts(
         else:
             logger.warning(f"Прокси {import_request.proxy_id} не найден")
     
+    # Парсим все строки заранее, чтобы зашифровать пароли одной пачкой
+    parsed_lines = []
     for line in import_request.accounts_data:
+        account_data = parse_account_line(line)
+        if not account_data:
+            results['failed'].append({
+                'line': line[:50],
+                'error': 'Неверный формат строки'
+            })
+            continue
+        parsed_lines.append((line, account_data))
+    
+    encrypted_passwords = encrypt_many([account_data['password'] for _, account_data in parsed_lines])
+    
+    for (line, account_data), encrypted_password in zip(parsed_lines, encrypted_passwords):
         try:
-            # Парсим строку
-            account_data = parse_account_line(line)
-            if not account_data:
-                results['failed'].append({
-                    'line': line[:50],
-                    'error': 'Неверный формат строки'
-                })
-                continue
-            
             username = account_data['username']
             
             # Проверяем, существует ли аккаунт
@@ -907,8 +669,6 @@ def bulk_import_accounts(
                 session_data = create_session_data_from_import(account_data)
             
             # Создаем аккаунт
-            encrypted_password = encrypt_data(account_data['password'])
-            
             new_account = Account(
                 username=username,
                 password=encrypted_password,
@@ -919,13 +679,15 @@ def bulk_import_accounts(
                 device_id=account_data['device_id'],
                 user_agent=account_data['user_agent'],
                 status=AccountStatus.ACTIVE,
-                last_login_at=datetime.utcnow()
+                last_login_at=datetime.utcnow(),
+                warmup_stage=import_request.warmup_stage
             )
             
             if import_request.proxy_id and proxy:
                 new_account.proxy_url = proxy.url
             
             db.add(new_account)
+            adjust_accounts_count(db, import_request.group_id, 1)
             db.commit()
             db.refresh(new_account)
             
@@ -944,19 +706,14 @@ def bulk_import_accounts(
             })
             
         except Exception as e:
+            # Откатываем аккаунт вместе с изменением счётчика группы
+            db.rollback()
             logger.error(f"Ошибка импорта строки {line[:50]}...: {e}", exc_info=True)
             results['failed'].append({
                 'line': line[:50],
                 'error': str(e)
             })
     
-    # Обновляем счетчик в группе
-    if import_request.group_id:
-        group = db.query(Group).filter(Group.id == import_request.group_id).first()
-        if group:
-            group.accounts_count = len(group.accounts)
-            db.commit()
-    
     return {
         'success': True,
         'imported': len(results['success']),
@@ -1056,20 +813,16 @@ def import_session_from_text(
             status=account_status,  # Зависит от результата валидации
             session_data=session_data,  # Сохраняем готовую сессию
             device_id=account_data['device_id'],
-            last_login_at=last_login_at  # None если валидация провалилась
+            last_login_at=last_login_at,  # None если валидация провалилась
+            warmup_stage=import_request.warmup_stage
         )
         
         db.add(new_account)
+        # Обновляем счетчик в группе
+        adjust_accounts_count(db, import_request.group_id, 1)
         db.commit()
         db.refresh(new_account)
         
-        # Обновляем счетчик в группе
-        if import_request.group_id:
-            group = db.query(Group).filter(Group.id == import_request.group_id).first()
-            if group:
-                group.accounts_count = len(group.accounts)
-                db.commit()
-        
         # Логируем
         log_activity(
             db=db,
@@ -6,6 +6,7 @@ from app.core.database import get_db
 from app.core.security import verify_password, get_password_hash, create_access_token, decode_access_token
 from app.core.config import settings
 from app.models.user import User
+from app.services.user_cache import get_cached_user, cache_user
 from pydantic import BaseModel
 from typing import Optional
 
@@ -99,6 +100,11 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     if user_id is None:
         raise credentials_exception
     
+    # Сначала кэш: большинство запросов (в т.ч. поллинг прогресса) не ходят в БД
+    user = get_cached_user(user_id)
+    if user is not None:
+        return user
+    
     user = db.query(User).filter(User.id == user_id).first()
     if user is None:
         raise credentials_exception
@@ -109,6 +115,7 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             detail="Аккаунт деактивирован"
         )
     
+    cache_user(user)
     return user
 
 
@@ -0,0 +1,83 @@
+import logging
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import JSONResponse
+from typing import Dict, Any, Optional
+from redis.exceptions import RedisError
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.models.user import User, UserRole
+from app.api.auth import get_current_user
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+# Владелец фоновой задачи: результат (профиль, сообщения операций) видит только он
+JOB_OWNER_KEY = "jobs:owner:{job_id}"
+
+
+def _job_owner(job_id: str) -> Optional[str]:
+    try:
+        return get_redis().get(JOB_OWNER_KEY.format(job_id=job_id))
+    except RedisError as e:
+        logger.warning(f"Не удалось получить владельца задачи {job_id}: {e}")
+        return None
+
+
+def job_accepted(task, owner: User) -> JSONResponse:
+    """
+    Ответ API на постановку фоновой задачи
+
+    Владелец сохраняется на время хранения результатов Celery (JOB_OWNER_TTL_SEC).
+    """
+    try:
+        get_redis().setex(JOB_OWNER_KEY.format(job_id=task.id), settings.JOB_OWNER_TTL_SEC, str(owner.id))
+    except RedisError as e:
+        logger.warning(f"Не удалось сохранить владельца задачи {task.id}: {e}")
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={"job_id": task.id, "status": "queued"}
+    )
+
+
+def operation_response(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Ответ API по результату операции из app.services.account_operations"""
+    if not result["success"]:
+        raise HTTPException(
+            status_code=result.get("status_code", status.HTTP_400_BAD_REQUEST),
+            detail=result["message"]
+        )
+    return result
+
+
+@router.get("/{job_id}")
+def get_job(job_id: str, current_user: User = Depends(get_current_user)):
+    """
+    Получить статус фоновой задачи
+    
+    Статусы: pending (в очереди или неизвестна), started, success, failure, retry.
+    Для завершённых задач в result - тот же ответ, что вернул бы синхронный endpoint.
+    Задачу видит только поставивший её пользователь (и администратор), для
+    остальных - 404, как для несуществующей.
+    """
+    from celery.result import AsyncResult
+    from backend.celery_app.config import celery_app
+    
+    if current_user.role != UserRole.ADMIN and _job_owner(job_id) != str(current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Задача не найдена"
+        )
+    
+    task = AsyncResult(job_id, app=celery_app)
+    response = {
+        "job_id": job_id,
+        "status": task.state.lower()
+    }
+    
+    if task.successful():
+        response["result"] = task.result
+    elif task.failed():
+        response["error"] = str(task.result)
+    
+    return response
@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional
 from uuid import UUID, uuid4
 from datetime import datetime
 import os
@@ -12,10 +13,15 @@ from app.models.post import Post, PostExecution, MediaType, PostStatus, PostExec
 from app.models.account import Account, AccountStatus
 from app.models.user import User
 from app.api.auth import get_current_user
-from app.schemas.post import PostCreate, PostUpdate, PostResponse, PostExecutionResponse
-from app.services.instagram import InstagramService
-from app.utils.logging import log_activity
-from app.models.activity_log import LogStatus
+from app.api.jobs import job_accepted, operation_response
+from app.services.campaign_targeting import parse_group_ids, count_target_accounts, target_languages
+from app.schemas.post import (
+    PostCreate, PostUpdate, PostResponse, PostExecutionResponse, ExecutionCounts,
+    PostBulkDeleteRequest, PostBulkArchiveRequest,
+)
+from app.utils.pagination import (
+    NEXT_CURSOR_HEADER, TOTAL_ESTIMATE_HEADER, encode_cursor, decode_cursor, keyset_after, estimate_total,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +38,7 @@ async def create_post(
     original_language: str = Form("ru"),
     target_groups: str = Form(None),  # JSON строка с массивом UUID
     media_type: MediaType = Form(MediaType.PHOTO),
+    scheduled_at: Optional[datetime] = Form(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -44,8 +51,10 @@ async def create_post(
         original_language: Язык исходного текста
         target_groups: JSON строка с массивом UUID групп
         media_type: Тип медиа (photo, video, carousel)
+        scheduled_at: Желаемое время публикации - используется при publish без параметра
     """
     import json
+    from app.services.post_scheduler import to_utc_naive
     
     logger.info(f"Создание поста: files={len(files) if files else 0}, caption={bool(caption)}, media_type={media_type}")
     
@@ -100,7 +109,8 @@ async def create_post(
         caption_original=caption,
         original_language=original_language,
         target_groups=[str(gid) for gid in group_ids],
-        status=PostStatus.DRAFT
+        status=PostStatus.DRAFT,
+        scheduled_at=to_utc_naive(scheduled_at) if scheduled_at else None
     )
     
     db.add(db_post)
@@ -110,11 +120,81 @@ async def create_post(
     return db_post
 
 
+def _execution_counts(db: Session, post_ids: List[UUID]) -> Dict[UUID, ExecutionCounts]:
+    """
+    Счётчики выполнений по статусам для набора постов одним GROUP BY запросом
+    """
+    if not post_ids:
+        return {}
+    rows = db.query(
+        PostExecution.post_id,
+        func.count().label("total"),
+        func.count().filter(PostExecution.status == PostExecutionStatus.QUEUED).label("queued"),
+        func.count().filter(PostExecution.status == PostExecutionStatus.POSTING).label("posting"),
+        func.count().filter(PostExecution.status == PostExecutionStatus.SUCCESS).label("success"),
+        func.count().filter(PostExecution.status == PostExecutionStatus.FAILED).label("failed"),
+    ).filter(
+        PostExecution.post_id.in_(post_ids)
+    ).group_by(PostExecution.post_id).all()
+    return {
+        row.post_id: ExecutionCounts(
+            total=row.total,
+            queued=row.queued,
+            posting=row.posting,
+            success=row.success,
+            failed=row.failed
+        )
+        for row in rows
+    }
+
+
+def _with_counts(db: Session, posts: List[Post]) -> List[PostResponse]:
+    """Сериализовать посты вместе со счётчиками выполнений"""
+    counts = _execution_counts(db, [post.id for post in posts])
+    items = []
+    for post in posts:
+        item = PostResponse.from_orm(post)
+        item.execution_counts = counts.get(post.id, ExecutionCounts())
+        items.append(item)
+    return items
+
+
 @router.get("/", response_model=List[PostResponse])
-def list_posts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    """Получить список всех постов"""
-    posts = db.query(Post).order_by(Post.created_at.desc()).offset(skip).limit(limit).all()
-    return posts
+def list_posts(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    include_archived: bool = False,
+    with_total: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Получить список постов (новые первыми)
+    
+    Пагинация по курсору (created_at, id): курсор следующей страницы
+    приходит в заголовке X-Next-Cursor, его нужно передать в параметре cursor.
+    Вместо списка выполнений у каждого поста только счётчики по статусам.
+    Архивные посты скрыты, если не передан include_archived=true.
+    with_total=true добавляет заголовок X-Total-Estimate с приблизительным числом постов.
+    """
+    query = db.query(Post)
+    if not include_archived:
+        query = query.filter(Post.archived_at.is_(None))
+    if with_total:
+        response.headers[TOTAL_ESTIMATE_HEADER] = str(
+            estimate_total(db, query, Post.__tablename__, not include_archived)
+        )
+    position = decode_cursor(cursor)
+    if position:
+        query = query.filter(keyset_after(Post.created_at, Post.id, position))
+    posts = query.order_by(Post.created_at.desc(), Post.id.desc()).limit(limit + 1).all()
+    
+    if len(posts) > limit:
+        posts = posts[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(posts[-1].created_at, posts[-1].id)
+    
+    return _with_counts(db, posts)
 
 
 @router.get("/{post_id}", response_model=PostResponse)
@@ -126,17 +206,82 @@ def get_post(post_id: UUID, db: Session = Depends(get_db), current_user: User =
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Пост не найден"
         )
-    return post
+    return _with_counts(db, [post])[0]
+
+
+@router.delete("/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_post(post_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """Удалить пост (выполнения удаляются каскадно на стороне БД)"""
+    from app.services.bulk_operations import delete_posts
+    
+    post = db.query(Post).filter(Post.id == post_id).first()
+    if not post:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Пост не найден"
+        )
+    
+    result = delete_posts(db, [post_id])
+    if result["skipped"]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Нельзя удалить пост во время публикации"
+        )
+    return None
+
+
+@router.post("/bulk-delete")
+def bulk_delete_posts(
+    request: PostBulkDeleteRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Удалить несколько постов
+    
+    Посты в статусе POSTING пропускаются и возвращаются в skipped.
+    """
+    from app.services.bulk_operations import delete_posts
+    
+    return delete_posts(db, request.post_ids)
+
+
+@router.post("/bulk-archive")
+def bulk_archive_posts(
+    request: PostBulkArchiveRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Перенести посты в архив (archived=false - вернуть из архива)
+    
+    Архивные посты скрыты из списка и не запускаются планировщиком.
+    """
+    from app.services.bulk_operations import archive_posts
+    
+    return archive_posts(db, request.post_ids, request.archived)
 
 
 @router.post("/{post_id}/publish")
-def publish_post(post_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def publish_post(
+    post_id: UUID,
+    scheduled_at: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
     """
     Запустить публикацию поста на все аккаунты в выбранных группах
     
-    Создаёт Celery задачу task_batch_post, которая создаст задачи для каждого аккаунта
-    с задержками между публикациями.
+    Сначала медиа готовятся один раз (task_prepare_post_media), затем task_batch_post
+    создаёт задачи для каждого аккаунта с задержками между публикациями.
+    
+    Если передан scheduled_at в будущем, пост только планируется (PENDING) -
+    его запустит планировщик незадолго до слота. Без параметра используется
+    сохранённый в посте scheduled_at; время в прошлом - публикация сразу.
+    Запланированный пост можно перенести (/schedule) или отменить (/cancel-schedule).
     """
+    from celery import chain
+    from backend.celery_app.tasks.media import task_prepare_post_media
     from backend.celery_app.tasks.posting import task_batch_post
     
     post = db.query(Post).filter(Post.id == post_id).first()
@@ -152,6 +297,12 @@ def publish_post(post_id: UUID, db: Session = Depends(get_db), current_user: Use
             detail=f"Пост уже опубликован или находится в процессе публикации (статус: {post.status})"
         )
     
+    if post.archived_at:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Пост в архиве"
+        )
+    
     # Проверяем наличие медиа
     if not post.media_paths:
         raise HTTPException(
@@ -166,18 +317,8 @@ def publish_post(post_id: UUID, db: Session = Depends(get_db), current_user: Use
             detail="Не выбраны группы для публикации"
         )
     
-    # Получаем аккаунты из выбранных групп для проверки
-    from app.models.group import Group
-    
-    accounts_count = 0
-    for group_id_str in post.target_groups:
-        try:
-            group_id = UUID(group_id_str)
-            group = db.query(Group).filter(Group.id == group_id).first()
-            if group:
-                accounts_count += len([acc for acc in group.accounts if acc.status == AccountStatus.ACTIVE])
-        except Exception:
-            continue
+    # Проверяем наличие активных аккаунтов в выбранных группах (один COUNT)
+    accounts_count = count_target_accounts(db, parse_group_ids(post.target_groups))
     
     if accounts_count == 0:
         raise HTTPException(
@@ -185,11 +326,34 @@ def publish_post(post_id: UUID, db: Session = Depends(get_db), current_user: Use
             detail="Не найдено активных аккаунтов в выбранных группах"
         )
     
-    # Запускаем Celery задачу
-    task = task_batch_post.delay(str(post_id))
+    if scheduled_at:
+        from app.services.post_scheduler import to_utc_naive
+        scheduled_at = to_utc_naive(scheduled_at)
+    else:
+        scheduled_at = post.scheduled_at
+    
+    if scheduled_at and scheduled_at > datetime.utcnow():
+        post.scheduled_at = scheduled_at
+        post.status = PostStatus.PENDING
+        db.commit()
+        
+        return {
+            "message": "Публикация запланирована",
+            "post_id": str(post_id),
+            "scheduled_at": scheduled_at.isoformat(),
+            "accounts_count": accounts_count,
+            "status": "pending"
+        }
     
-    # Обновляем статус поста
+    # Запускаем Celery задачи: подготовка медиа (очередь media), затем рассылка по аккаунтам
+    task = chain(
+        task_prepare_post_media.si(str(post_id)),
+        task_batch_post.si(str(post_id))
+    ).delay()
+    
+    # Обновляем статус поста (без scheduled_at, иначе его повторно запустит планировщик)
     post.status = PostStatus.PENDING
+    post.scheduled_at = None
     db.commit()
     
     return {
@@ -201,10 +365,97 @@ def publish_post(post_id: UUID, db: Session = Depends(get_db), current_user: Use
     }
 
 
-@router.get("/{post_id}/executions")
-def get_post_executions(post_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    """Получить статус публикации по аккаунтам"""
-    from collections import Counter
+def _get_scheduled_post(db: Session, post_id: UUID) -> Post:
+    """Запланированный пост, который планировщик ещё не запустил (PENDING с scheduled_at)"""
+    post = db.query(Post).filter(Post.id == post_id).first()
+    if not post:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Пост не найден"
+        )
+    
+    if post.status != PostStatus.PENDING or post.scheduled_at is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Пост не запланирован или уже запускается (статус: {post.status})"
+        )
+    return post
+
+
+def _update_scheduled_post(db: Session, post_id: UUID, **values) -> None:
+    """
+    Изменить запланированный пост условным UPDATE
+    
+    Планировщик забирает пост под блокировкой и переводит в POSTING -
+    если он успел раньше, изменение не применяется (400).
+    """
+    result = db.query(Post).filter(
+        Post.id == post_id,
+        Post.status == PostStatus.PENDING,
+        Post.scheduled_at.isnot(None)
+    ).update(values, synchronize_session=False)
+    db.commit()
+    
+    if result == 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Публикация поста уже запущена"
+        )
+
+
+@router.post("/{post_id}/schedule")
+def reschedule_post(
+    post_id: UUID,
+    scheduled_at: datetime,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Перенести запланированную публикацию на другое время (в будущем)"""
+    from app.services.post_scheduler import to_utc_naive
+    
+    _get_scheduled_post(db, post_id)
+    
+    scheduled_at = to_utc_naive(scheduled_at)
+    if scheduled_at <= datetime.utcnow():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Время публикации должно быть в будущем"
+        )
+    
+    _update_scheduled_post(db, post_id, scheduled_at=scheduled_at)
+    
+    return {
+        "message": "Публикация перенесена",
+        "post_id": str(post_id),
+        "scheduled_at": scheduled_at.isoformat(),
+        "status": "pending"
+    }
+
+
+@router.post("/{post_id}/cancel-schedule")
+def cancel_scheduled_post(post_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """Отменить запланированную публикацию: пост возвращается в черновики"""
+    _get_scheduled_post(db, post_id)
+    _update_scheduled_post(db, post_id, status=PostStatus.DRAFT, scheduled_at=None)
+    
+    return {
+        "message": "Публикация отменена",
+        "post_id": str(post_id),
+        "status": "draft"
+    }
+
+
+@router.post("/{post_id}/retry-failed")
+def retry_failed_executions(post_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """
+    Повторить публикацию только на аккаунтах с неудачными выполнениями
+    
+    В очередь снова попадают FAILED выполнения с исчерпанными попытками и
+    зависшие QUEUED с уже сохранённым переводом подписи. Успешные аккаунты не затрагиваются,
+    переводы и перефразирование не выполняются.
+    """
+    from backend.celery_app.tasks.posting import task_retry_failed_executions
+    from app.services.execution_lease import retryable_condition
     
     post = db.query(Post).filter(Post.id == post_id).first()
     if not post:
@@ -213,32 +464,85 @@ def get_post_executions(post_id: UUID, db: Session = Depends(get_db), current_us
             detail="Пост не найден"
         )
     
-    executions = db.query(PostExecution).filter(PostExecution.post_id == post_id).all()
+    if post.status == PostStatus.DRAFT:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Пост ещё не публиковался"
+        )
+    
+    executions_count = db.query(PostExecution).filter(
+        PostExecution.post_id == post_id,
+        retryable_condition(datetime.utcnow())
+    ).count()
+    
+    if executions_count == 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Нет неудачных выполнений для повтора"
+        )
+    
+    task = task_retry_failed_executions.delay(str(post_id))
+    
+    return {
+        "message": "Повторная публикация запущена",
+        "post_id": str(post_id),
+        "task_id": task.id,
+        "executions_count": executions_count,
+        "status": "posting"
+    }
+
+
+@router.get("/{post_id}/executions")
+def get_post_executions(
+    post_id: UUID,
+    limit: int = Query(500, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    execution_status: Optional[PostExecutionStatus] = Query(None, alias="status"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Получить статус публикации по аккаунтам
+    
+    Выполнения отдаются страницами по курсору (created_at, id), next_cursor
+    равен None на последней странице. Статистика считается по всем выполнениям поста.
+    """
+    post = db.query(Post).filter(Post.id == post_id).first()
+    if not post:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Пост не найден"
+        )
     
-    # Загружаем аккаунты для получения username
-    account_ids = [e.account_id for e in executions]
-    accounts = {acc.id: acc for acc in db.query(Account).filter(Account.id.in_(account_ids)).all()}
+    query = db.query(PostExecution, Account.username).outerjoin(
+        Account, Account.id == PostExecution.account_id
+    ).filter(PostExecution.post_id == post_id)
+    if execution_status:
+        query = query.filter(PostExecution.status == execution_status)
+    position = decode_cursor(cursor)
+    if position:
+        query = query.filter(keyset_after(PostExecution.created_at, PostExecution.id, position))
+    rows = query.order_by(PostExecution.created_at.desc(), PostExecution.id.desc()).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0]
+        next_cursor = encode_cursor(last.created_at, last.id)
     
     # Формируем ответы с username
     executions_data = []
-    for e in executions:
-        account = accounts.get(e.account_id)
-        exec_dict = PostExecutionResponse.from_orm(e).dict()
-        exec_dict['account_username'] = account.username if account else None
+    for execution, username in rows:
+        exec_dict = PostExecutionResponse.from_orm(execution).dict()
+        exec_dict['account_username'] = username
         executions_data.append(exec_dict)
     
-    # Подсчитываем статистику
-    status_counts = Counter(e.status.value for e in executions)
+    statistics = _execution_counts(db, [post_id]).get(post_id, ExecutionCounts())
     
     return {
         "executions": executions_data,
-        "statistics": {
-            "total": len(executions),
-            "success": status_counts.get("success", 0),
-            "failed": status_counts.get("failed", 0),
-            "queued": status_counts.get("queued", 0),
-            "posting": status_counts.get("posting", 0)
-        }
+        "next_cursor": next_cursor,
+        "statistics": statistics.dict()
     }
 
 
@@ -250,7 +554,6 @@ def get_post_translations(post_id: UUID, db: Session = Depends(get_db), current_
     Используется для предпросмотра переводов перед публикацией.
     """
     from app.services.translator import translator_service
-    from app.models.group import Group
     
     post = db.query(Post).filter(Post.id == post_id).first()
     if not post:
@@ -259,18 +562,8 @@ def get_post_translations(post_id: UUID, db: Session = Depends(get_db), current_
             detail="Пост не найден"
         )
     
-    # Собираем уникальные языки из аккаунтов в выбранных группах
-    languages = set()
-    for group_id_str in post.target_groups:
-        try:
-            group_id = UUID(group_id_str)
-            group = db.query(Group).filter(Group.id == group_id).first()
-            if group:
-                for account in group.accounts:
-                    if account.status == AccountStatus.ACTIVE:
-                        languages.add(account.language)
-        except Exception:
-            continue
+    # Собираем уникальные языки из аккаунтов в выбранных группах (SELECT DISTINCT)
+    languages = set(target_languages(db, parse_group_ids(post.target_groups)))
     
     # Добавляем исходный язык, если его нет
     languages.add(post.original_language)
@@ -304,106 +597,19 @@ def get_post_translations(post_id: UUID, db: Session = Depends(get_db), current_
 def test_post_to_account(
     post_id: UUID,
     account_id: UUID,
-    db: Session = Depends(get_db),
+    background: bool = False,
     current_user: User = Depends(get_current_user)
 ):
     """
     Тестовая публикация поста на один аккаунт
     
-    Используется для проверки работы Instagram API перед массовой публикацией
+    Используется для проверки работы Instagram API перед массовой публикацией.
+    С background=true запрос ставится в очередь, ответ - job_id для GET /api/jobs/{job_id}
     """
-    post = db.query(Post).filter(Post.id == post_id).first()
-    if not post:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Пост не найден"
-        )
-    
-    account = db.query(Account).filter(Account.id == account_id).first()
-    if not account:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Аккаунт не найден"
-        )
+    from app.services import account_operations
     
-    if account.status != AccountStatus.ACTIVE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Аккаунт не активен (статус: {account.status})"
-        )
+    if background:
+        from backend.celery_app.tasks.accounts import task_test_post
+        return job_accepted(task_test_post.delay(str(post_id), str(account_id)), current_user)
     
-    if not post.media_paths:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="У поста нет медиа файлов"
-        )
-    
-    # Создаём сервис Instagram
-    instagram_service = InstagramService(account)
-    
-    # Публикуем (пока только фото)
-    if post.media_type == MediaType.PHOTO:
-        media_path = post.media_paths[0]
-        if not os.path.exists(media_path):
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Файл не найден: {media_path}"
-            )
-        
-        result = instagram_service.post_photo(media_path, post.caption_original)
-    elif post.media_type == MediaType.VIDEO:
-        media_path = post.media_paths[0]
-        if not os.path.exists(media_path):
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Файл не найден: {media_path}"
-            )
-        
-        result = instagram_service.post_video(media_path, post.caption_original)
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Тип медиа {post.media_type} пока не поддерживается для тестовой публикации"
-        )
-    
-    # Логируем результат
-    log_activity(
-        db=db,
-        action="test_post",
-        status=LogStatus.SUCCESS if result["success"] else LogStatus.FAILED,
-        account_id=account_id,
-        details=result,
-        error_message=None if result["success"] else result.get("message"),
-        duration_ms=result.get("duration_ms")
-    )
-    
-    if result["success"]:
-        # Обновляем счётчик постов
-        account.posts_count_today += 1
-        account.last_post_at = datetime.utcnow()
-        db.commit()
-        
-        return {
-            "success": True,
-            "message": result["message"],
-            "media_id": result.get("media_id"),
-            "account": account.username
-        }
-    else:
-        # Обновляем статус аккаунта при ошибках
-        if result.get("requires_login"):
-            account.status = AccountStatus.LOGIN_REQUIRED
-        elif result.get("rate_limited"):
-            account.status = AccountStatus.COOLDOWN
-        elif result.get("proxy_error"):
-            # Пробуем ротировать прокси
-            from app.services.proxy_manager import ProxyManager
-            ProxyManager.rotate_proxy_for_account(db, account, reason="proxy_error_in_post")
-        
-        db.commit()
-        
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=result["message"]
-        )
-
+    return operation_response(account_operations.test_post(post_id, account_id))
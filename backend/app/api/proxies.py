@@ -1,42 +1,139 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, UploadFile, File, Form
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List
 from uuid import UUID
 from app.core.database import get_db
-from app.models.proxy import Proxy, ProxyStatus
+from app.models.proxy import Proxy, ProxyStatus, ProxyType
 from app.models.user import User
-from app.schemas.proxy import ProxyCreate, ProxyUpdate, ProxyResponse, ProxyCheckResponse
+from app.schemas.proxy import (
+    ProxyCreate, ProxyUpdate, ProxyResponse, ProxyCheckResponse, ProxyConcurrencyResponse, ProxyImportResponse,
+)
 from app.services.proxy_manager import ProxyManager
 from app.api.auth import get_current_user
 
 router = APIRouter(prefix="/api/proxies", tags=["proxies"])
 
 
+def _duplicate_url_error(url: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Прокси с URL '{url}' уже существует"
+    )
+
+
+def _normalized_url(url: str, proxy_type: ProxyType) -> str:
+    """URL в каноничном виде, как при массовом импорте (400 при ошибке разбора)"""
+    from app.services.proxy_importer import normalize_proxy_url
+    
+    try:
+        return normalize_proxy_url(url, proxy_type)[0]
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Некорректный URL прокси: {e}"
+        )
+
+
+def _commit_unique_url(db: Session, url: str) -> None:
+    """Commit с проверкой уникального индекса URL: параллельный запрос мог успеть первым"""
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise _duplicate_url_error(url)
+
+
 @router.post("/", response_model=ProxyResponse, status_code=status.HTTP_201_CREATED)
 def create_proxy(proxy: ProxyCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     """Добавить новый прокси"""
+    # URL хранится в каноничном виде, как при массовом импорте
+    proxy.url = _normalized_url(proxy.url, proxy.type)
+    
     # Проверка на уникальность URL
     existing = db.query(Proxy).filter(Proxy.url == proxy.url).first()
     if existing:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Прокси с URL '{proxy.url}' уже существует"
-        )
+        raise _duplicate_url_error(proxy.url)
     
     db_proxy = Proxy(
         url=proxy.url,
         type=proxy.type,
         country=proxy.country,
         status=ProxyStatus.CHECKING,
-        assigned_accounts=[]
+        assigned_accounts=[],
+        max_parallel_uploads=proxy.max_parallel_uploads
     )
     db.add(db_proxy)
-    db.commit()
+    _commit_unique_url(db, proxy.url)
     db.refresh(db_proxy)
     
     return db_proxy
 
 
+@router.post("/import", response_model=ProxyImportResponse)
+def import_proxies(
+    file: UploadFile = File(None),
+    text: str = Form(None),
+    type: ProxyType = Form(ProxyType.HTTP),
+    country: str = Form(None),
+    max_parallel_uploads: int = Form(None, ge=1),
+    check: bool = Form(True),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Массовый импорт прокси из текста или CSV файла
+    
+    Строки нормализуются (см. proxy_importer), дубликаты внутри списка
+    отбрасываются, уже существующие URL пропускаются (INSERT ... ON CONFLICT DO NOTHING).
+    Новые прокси создаются в статусе CHECKING; при check=true их первая проверка
+    запускается в фоне пачками (задачи instagram_cf.check_proxies).
+    
+    Обычный def, а не async: вставка в БД и отправка задач блокирующие и
+    выполняются в пуле потоков, не останавливая event loop.
+    
+    Args:
+        file: Файл со списком (txt/csv)
+        text: Список текстом (если файл не передан)
+        type: Тип для строк без схемы (http/socks5)
+        country: Страна по умолчанию
+    """
+    from app.core.config import settings
+    from app.services.proxy_importer import parse_proxy_list, insert_new_proxies
+    from backend.celery_app.tasks.proxies import schedule_proxy_checks
+    
+    if file is not None:
+        raw = file.file.read(settings.PROXY_IMPORT_MAX_BYTES + 1)
+        if len(raw) > settings.PROXY_IMPORT_MAX_BYTES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail="Файл слишком большой"
+            )
+        content = raw.decode("utf-8-sig", errors="replace")
+    elif text:
+        content = text
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Передайте файл или текст со списком прокси"
+        )
+    
+    parsed = parse_proxy_list(content, default_type=type, default_country=country)
+    inserted_ids = insert_new_proxies(db, parsed["rows"], max_parallel_uploads=max_parallel_uploads)
+    
+    check_tasks = schedule_proxy_checks(inserted_ids) if check and inserted_ids else []
+    
+    return ProxyImportResponse(
+        valid=len(parsed["rows"]),
+        inserted=len(inserted_ids),
+        already_exists=len(parsed["rows"]) - len(inserted_ids),
+        duplicates_in_list=parsed["duplicates"],
+        invalid=parsed["invalid"][:100],
+        invalid_count=len(parsed["invalid"]),
+        check_task_ids=check_tasks
+    )
+
+
 @router.get("/", response_model=List[ProxyResponse])
 def list_proxies(
     current_user: User = Depends(get_current_user),
@@ -97,22 +194,20 @@ def update_proxy(proxy_id: UUID, proxy_update: ProxyUpdate, db: Session = Depend
     
     update_data = proxy_update.dict(exclude_unset=True)
     
-    # Проверка на уникальность URL, если меняется
-    if "url" in update_data:
+    # Проверка на уникальность URL, если меняется (в каноничном виде, как при создании)
+    if update_data.get("url"):
+        update_data["url"] = _normalized_url(update_data["url"], update_data.get("type") or db_proxy.type)
         existing = db.query(Proxy).filter(
             Proxy.url == update_data["url"],
             Proxy.id != proxy_id
         ).first()
         if existing:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Прокси с URL '{update_data['url']}' уже существует"
-            )
+            raise _duplicate_url_error(update_data["url"])
     
     for field, value in update_data.items():
         setattr(db_proxy, field, value)
     
-    db.commit()
+    _commit_unique_url(db, db_proxy.url)
     db.refresh(db_proxy)
     return db_proxy
 
@@ -190,6 +285,35 @@ def get_available_proxies(db: Session = Depends(get_db), current_user: User = De
     return available_proxies
 
 
+@router.get("/{proxy_id}/concurrency", response_model=ProxyConcurrencyResponse)
+def get_proxy_concurrency(proxy_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """Загрузка прокси: занятые слоты загрузки, статистика ожидания слотов и состояние circuit breaker"""
+    from redis.exceptions import RedisError
+    from app.services.proxy_limiter import get_proxy_slot_metrics, proxy_parallelism
+    from app.services.circuit_breaker import KIND_PROXY, get_circuit_state
+    
+    proxy = db.query(Proxy).filter(Proxy.id == proxy_id).first()
+    if not proxy:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Прокси не найден"
+        )
+    
+    try:
+        metrics = get_proxy_slot_metrics(proxy.id)
+    except RedisError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Redis недоступен: {str(e)}"
+        )
+    
+    return {
+        "max_parallel_uploads": proxy_parallelism(proxy.max_parallel_uploads),
+        "circuit_state": get_circuit_state(KIND_PROXY, proxy.id),
+        **metrics
+    }
+
+
 @router.get("/{proxy_id}/accounts")
 def get_proxy_accounts(proxy_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     """Получить список аккаунтов, использующих этот прокси"""
@@ -1,3 +1,4 @@
+from contextlib import contextmanager
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -6,8 +7,8 @@ from app.core.config import settings
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -23,3 +24,20 @@ def get_db():
     finally:
         db.close()
 
+
+@contextmanager
+def session_scope(**kwargs):
+    """
+    Короткая сессия БД для фоновых задач (закрывается при выходе из блока)
+    
+    kwargs передаются в SessionLocal, например expire_on_commit=False,
+    чтобы объекты остались доступны после commit и закрытия сессии.
+    """
+    db = SessionLocal(**kwargs)
+    try:
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,12 @@
+import redis
+from app.core.config import settings
+
+_redis_client = None
+
+
+def get_redis() -> redis.Redis:
+    """Получение клиента Redis (один пул соединений на процесс)"""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _redis_client
@@ -1,10 +1,12 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from functools import lru_cache
+from typing import Optional, List
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet, InvalidToken
 from app.core.config import settings
 import base64
+import hashlib
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -40,10 +42,8 @@ def decode_access_token(token: str) -> Optional[dict]:
         return None
 
 
-def get_encryption_key() -> bytes:
-    """Получение ключа шифрования для Fernet (base64-encoded строка)"""
-    key = settings.ENCRYPTION_KEY
-    
+def _derive_fernet_key(key: str) -> bytes:
+    """Привести строку ключа к формату Fernet (base64-encoded 32 байта)"""
     # Если ключ уже в base64 формате (44 символа для 32 байт)
     if len(key) == 44:
         try:
@@ -57,21 +57,72 @@ def get_encryption_key() -> bytes:
     
     # Если ключ не в правильном формате, создаём правильный ключ из строки
     # Используем хеш SHA256 для получения 32 байт
-    import hashlib
     key_hash = hashlib.sha256(key.encode()).digest()
     # Fernet требует base64-encoded ключ (44 символа)
     encoded_key = base64.urlsafe_b64encode(key_hash).decode()
     return encoded_key.encode()
 
 
+@lru_cache(maxsize=1)
+def get_encryption_key() -> bytes:
+    """Получение ключа шифрования для Fernet (base64-encoded строка)"""
+    return _derive_fernet_key(settings.ENCRYPTION_KEY)
+
+
+@lru_cache(maxsize=1)
+def get_primary_cipher() -> Fernet:
+    """Получение Fernet для текущего ключа (создаётся один раз на процесс)"""
+    return Fernet(get_encryption_key())
+
+
+@lru_cache(maxsize=1)
+def get_cipher() -> MultiFernet:
+    """
+    Получение объекта шифрования (создаётся один раз на процесс)
+    
+    Первый ключ - текущий ENCRYPTION_KEY, им шифруются новые данные.
+    Ключи из ENCRYPTION_KEYS_OLD используются только для расшифровки
+    и ротации ранее зашифрованных данных.
+    """
+    keys = [get_primary_cipher()]
+    for old_key in settings.ENCRYPTION_KEYS_OLD.split(","):
+        old_key = old_key.strip()
+        if old_key:
+            keys.append(Fernet(_derive_fernet_key(old_key)))
+    return MultiFernet(keys)
+
+
 def encrypt_data(data: str) -> str:
     """Шифрование данных (для паролей Instagram, прокси)"""
-    f = Fernet(get_encryption_key())
-    return f.encrypt(data.encode()).decode()
+    return get_cipher().encrypt(data.encode()).decode()
 
 
 def decrypt_data(encrypted_data: str) -> str:
     """Расшифровка данных"""
-    f = Fernet(get_encryption_key())
-    return f.decrypt(encrypted_data.encode()).decode()
+    return get_cipher().decrypt(encrypted_data.encode()).decode()
+
+
+def encrypt_many(values: List[str]) -> List[str]:
+    """Пакетное шифрование (для массового импорта)"""
+    cipher = get_cipher()
+    return [cipher.encrypt(value.encode()).decode() for value in values]
+
+
+def decrypt_many(values: List[str]) -> List[str]:
+    """Пакетная расшифровка (для экспорта)"""
+    cipher = get_cipher()
+    return [cipher.decrypt(value.encode()).decode() for value in values]
+
+
+def is_encrypted_with_current_key(encrypted_data: str) -> bool:
+    """Проверить, зашифрованы ли данные текущим ключом (ротация не нужна)"""
+    try:
+        get_primary_cipher().decrypt(encrypted_data.encode())
+        return True
+    except InvalidToken:
+        return False
+
 
+def rotate_encrypted_data(encrypted_data: str) -> str:
+    """Перешифровать данные текущим ключом (данные могут быть зашифрованы старым ключом)"""
+    return get_cipher().rotate(encrypted_data.encode()).decode()
@@ -2,7 +2,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from backend.app.core.config import settings
 from backend.app.core.database import engine, Base
-from backend.app.api import groups, accounts, posts, proxies, translations, auth
+from backend.app.api import groups, accounts, posts, proxies, translations, auth, jobs
 import os
 
 # Создание таблиц (в продакшене используем миграции)
@@ -47,6 +47,7 @@ app.include_router(accounts.router)
 app.include_router(posts.router)
 app.include_router(proxies.router)
 app.include_router(translations.router)
+app.include_router(jobs.router)
 
 
 @app.get("/")
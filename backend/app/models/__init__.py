@@ -1,4 +1,4 @@
-from app.models.account import Account
+from app.models.account import Account, AccountDailyQuota
 from app.models.group import Group
 from app.models.post import Post, PostExecution
 from app.models.proxy import Proxy
@@ -8,6 +8,7 @@ from app.models.activity_log import ActivityLog
 
 __all__ = [
     "Account",
+    "AccountDailyQuota",
     "Group",
     "Post",
     "PostExecution",
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Enum, JSON
+from sqlalchemy import Column, String, Integer, Date, DateTime, ForeignKey, Enum, JSON, Index, select, func, cast
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, column_property, deferred
 from datetime import datetime
 import uuid
 import enum
@@ -15,15 +15,51 @@ class AccountStatus(str, enum.Enum):
     PROXY_ERROR = "proxy_error"
 
 
+def utc_today():
+    """Текущая дата UTC на стороне БД (ключ дневных счётчиков)"""
+    return cast(func.timezone("UTC", func.now()), Date)
+
+
+class AccountDailyQuota(Base):
+    """
+    Дневной счётчик публикаций аккаунта
+
+    Одна строка на (аккаунт, день UTC): новый день начинается с нового ключа,
+    поэтому счётчики не нужно сбрасывать глобальным UPDATE.
+    """
+    __tablename__ = "account_daily_quotas"
+
+    account_id = Column(UUID(as_uuid=True), ForeignKey("accounts.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    posts_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<AccountDailyQuota(account_id={self.account_id}, day={self.day}, posts_count={self.posts_count})>"
+
+
 class Account(Base):
     __tablename__ = "accounts"
+    __table_args__ = (
+        # Курсорная пагинация списка аккаунтов (created_at DESC, id DESC), в т.ч. внутри группы
+        Index("ix_accounts_created_at_id", "created_at", "id"),
+        Index("ix_accounts_group_id_created_at_id", "group_id", "created_at", "id"),
+        Index("ix_accounts_proxy_id", "proxy_id"),
+        # Поиск по префиксу/подстроке username без учёта регистра (pg_trgm)
+        Index(
+            "ix_accounts_username_trgm",
+            "username",
+            postgresql_using="gin",
+            postgresql_ops={"username": "gin_trgm_ops"},
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     username = Column(String(100), unique=True, nullable=False, index=True)
-    password = Column(String(500), nullable=False)  # encrypted
+    # Тяжёлые/секретные колонки загружаются только для InstagramService (см. instagram_account_options)
+    password = deferred(Column(String(500), nullable=False), group="credentials")  # encrypted
     email = Column(String(255), nullable=True)  # Email для восстановления аккаунта (опционально)
-    session_data = Column(JSON, nullable=True)
-    group_id = Column(UUID(as_uuid=True), ForeignKey("groups.id"), nullable=True)
+    session_data = deferred(Column(JSON, nullable=True), group="credentials")
+    group_id = Column(UUID(as_uuid=True), ForeignKey("groups.id", ondelete="CASCADE"), nullable=True)
     language = Column(String(10), nullable=False, default="en")
     proxy_id = Column(UUID(as_uuid=True), ForeignKey("proxies.id"), nullable=True)
     proxy_url = Column(String(500), nullable=True)  # Deprecated, используем proxy_id
@@ -31,7 +67,10 @@ class Account(Base):
     status = Column(Enum(AccountStatus), default=AccountStatus.LOGIN_REQUIRED, nullable=False)
     last_post_at = Column(DateTime, nullable=True)
     last_login_at = Column(DateTime, nullable=True)
-    posts_count_today = Column(Integer, default=0)
+    session_checked_at = Column(DateTime, nullable=True)  # Последний успешный запрос с сессией (keep-alive)
+    # Keep-alive/перелогин не планируется раньше этого времени (запланирован или неудача с backoff)
+    session_refresh_after = Column(DateTime, nullable=True)
+    session_refresh_failures = Column(Integer, default=0, nullable=False, server_default="0")
     failed_attempts = Column(Integer, default=0)
     device_id = Column(String(100), nullable=True)
     user_agent = Column(String(500), nullable=True)
@@ -40,11 +79,20 @@ class Account(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Публикации за сегодня: поиск по первичному ключу дневного счётчика
+    posts_count_today = column_property(
+        select(func.coalesce(func.max(AccountDailyQuota.posts_count), 0))
+        .where(AccountDailyQuota.account_id == id, AccountDailyQuota.day == utc_today())
+        .correlate_except(AccountDailyQuota)
+        .scalar_subquery()
+    )
+
     # Relationships
     group = relationship("Group", back_populates="accounts")
     proxy = relationship("Proxy", foreign_keys=[proxy_id])
-    post_executions = relationship("PostExecution", back_populates="account", cascade="all, delete-orphan")
-    activity_logs = relationship("ActivityLog", back_populates="account", cascade="all, delete-orphan")
+    # Удаление истории выполняет БД (ON DELETE CASCADE), ORM не загружает её перед DELETE
+    post_executions = relationship("PostExecution", back_populates="account", cascade="all, delete-orphan", passive_deletes=True)
+    activity_logs = relationship("ActivityLog", back_populates="account", cascade="all, delete-orphan", passive_deletes=True)
 
     @property
     def account_age_days(self) -> int:
@@ -16,7 +16,7 @@ class ActivityLog(Base):
     __tablename__ = "activity_logs"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    account_id = Column(UUID(as_uuid=True), ForeignKey("accounts.id"), nullable=True)
+    account_id = Column(UUID(as_uuid=True), ForeignKey("accounts.id", ondelete="CASCADE"), nullable=True, index=True)
     action = Column(String(50), nullable=False, index=True)  # login, post, check_status, etc.
     status = Column(Enum(LogStatus), nullable=False)
     details = Column(JSON, nullable=True)  # запрос/ответ
@@ -16,7 +16,8 @@ class Group(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
-    accounts = relationship("Account", back_populates="group", cascade="all, delete-orphan")
+    # Аккаунты группы удаляет БД (ON DELETE CASCADE)
+    accounts = relationship("Account", back_populates="group", cascade="all, delete-orphan", passive_deletes=True)
 
     def __repr__(self):
         return f"<Group(id={self.id}, name={self.name})>"
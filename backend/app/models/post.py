@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Enum, Integer, JSON
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Enum, Integer, JSON, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -31,6 +31,10 @@ class PostExecutionStatus(str, enum.Enum):
 
 class Post(Base):
     __tablename__ = "posts"
+    __table_args__ = (
+        # Курсорная пагинация списка постов (created_at DESC, id DESC)
+        Index("ix_posts_created_at_id", "created_at", "id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     media_paths = Column(JSON, nullable=False)  # массив путей к медиа
@@ -39,12 +43,16 @@ class Post(Base):
     original_language = Column(String(10), nullable=False)
     target_groups = Column(JSON, nullable=False)  # массив group_id
     status = Column(Enum(PostStatus), default=PostStatus.DRAFT, nullable=False)
-    scheduled_at = Column(DateTime, nullable=True)
+    scheduled_at = Column(DateTime, nullable=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     posted_at = Column(DateTime, nullable=True)
+    # Переведён в POSTING: пост без выполнений дольше POST_DISPATCH_TIMEOUT_SEC считается потерянным
+    posting_started_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, nullable=True)  # архивные посты скрыты из списка
 
     # Relationships
-    executions = relationship("PostExecution", back_populates="post", cascade="all, delete-orphan")
+    # Выполнения удаляет БД (ON DELETE CASCADE)
+    executions = relationship("PostExecution", back_populates="post", cascade="all, delete-orphan", passive_deletes=True)
 
     def __repr__(self):
         return f"<Post(id={self.id}, status={self.status})>"
@@ -52,22 +60,44 @@ class Post(Base):
 
 class PostExecution(Base):
     __tablename__ = "post_executions"
+    __table_args__ = (
+        # Счётчики по посту и курсорная пагинация выполнений поста
+        Index("ix_post_executions_post_id_created_at_id", "post_id", "created_at", "id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    post_id = Column(UUID(as_uuid=True), ForeignKey("posts.id"), nullable=False)
-    account_id = Column(UUID(as_uuid=True), ForeignKey("accounts.id"), nullable=False)
+    post_id = Column(UUID(as_uuid=True), ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
+    account_id = Column(UUID(as_uuid=True), ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False, index=True)
     caption_translated = Column(Text, nullable=False)
     instagram_media_id = Column(String(100), nullable=True)
     status = Column(Enum(PostExecutionStatus), default=PostExecutionStatus.QUEUED, nullable=False)
     error_message = Column(Text, nullable=True)
     retry_count = Column(Integer, default=0)
     posted_at = Column(DateTime, nullable=True)
+    failed_at = Column(DateTime, nullable=True)  # Последняя ошибка (окно недавних ошибок планировщика)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Идемпотентность: одно выполнение на пару (пост, аккаунт)
+    idempotency_key = Column(String(80), nullable=True, index=True, unique=True)
+    # Захват выполнения воркером (compare-and-set по статусу + аренда)
+    claim_token = Column(String(32), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True, index=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    # Когда выполнение последний раз поставлено в очередь (для поиска потерянных задач)
+    queued_at = Column(DateTime, nullable=True, default=datetime.utcnow)
+    # Плановое время запуска задачи (отложенные задачи ждут в Redis часами) - от него считается "зависание"
+    scheduled_for = Column(DateTime, nullable=True)
+    # Загрузка начата, но результат неизвестен - перед повтором проверить Instagram
+    upload_started_at = Column(DateTime, nullable=True)
 
     # Relationships
     post = relationship("Post", back_populates="executions")
     account = relationship("Account", back_populates="post_executions")
 
+    @staticmethod
+    def make_idempotency_key(post_id, account_id) -> str:
+        """Ключ идемпотентности для пары (пост, аккаунт)"""
+        return f"{post_id}:{account_id}"
+
     def __repr__(self):
         return f"<PostExecution(id={self.id}, status={self.status})>"
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Enum, Float, DateTime, JSON
+from sqlalchemy import Column, String, Enum, Float, Integer, DateTime, JSON
 from sqlalchemy.dialects.postgresql import UUID
 from datetime import datetime
 import uuid
@@ -21,13 +21,14 @@ class Proxy(Base):
     __tablename__ = "proxies"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    url = Column(String(500), nullable=False)
+    url = Column(String(500), nullable=False, unique=True, index=True)  # каноничный URL (proxy_importer)
     type = Column(Enum(ProxyType), nullable=False)
     country = Column(String(50), nullable=True)
     status = Column(Enum(ProxyStatus), default=ProxyStatus.ACTIVE, nullable=False)
     last_check_at = Column(DateTime, nullable=True)
     success_rate = Column(Float, default=1.0)
     assigned_accounts = Column(JSON, default=list)
+    max_parallel_uploads = Column(Integer, nullable=True)  # None = PROXY_MAX_PARALLEL_UPLOADS
     created_at = Column(DateTime, default=datetime.utcnow)
 
     def __repr__(self):
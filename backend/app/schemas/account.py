@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, root_validator
+from typing import List, Optional
 from datetime import datetime
 from uuid import UUID
 from app.models.account import AccountStatus
@@ -14,6 +14,7 @@ class AccountBase(BaseModel):
 
 class AccountCreate(AccountBase):
     password: str = Field(..., min_length=1)
+    warmup_stage: int = Field(0, ge=0, le=3)  # 3 - аккаунт уже прогрет (например, "взрослый" аккаунт)
 
 
 class AccountUpdate(BaseModel):
@@ -23,6 +24,7 @@ class AccountUpdate(BaseModel):
     group_id: Optional[UUID] = None
     proxy_id: Optional[UUID] = None
     status: Optional[AccountStatus] = None
+    warmup_stage: Optional[int] = Field(None, ge=0, le=3)
 
 
 class AccountResponse(AccountBase):
@@ -40,3 +42,49 @@ class AccountResponse(AccountBase):
     class Config:
         orm_mode = True
 
+
+
+class AccountBulkDeleteRequest(BaseModel):
+    account_ids: List[UUID] = Field(..., min_items=1, max_items=5000)
+
+
+class AccountBulkFilter(BaseModel):
+    group_id: Optional[UUID] = None
+    status: Optional[AccountStatus] = None
+    language: Optional[str] = Field(None, max_length=10)
+    proxy_id: Optional[UUID] = None
+    warmup_stage: Optional[int] = Field(None, ge=0, le=3)
+    username: Optional[str] = Field(None, min_length=1, max_length=100)  # начало username
+
+
+class AccountBulkUpdateRequest(BaseModel):
+    """
+    Массовое изменение аккаунтов: выбор по account_ids или по filter
+
+    Меняются только переданные поля; group_id=null - убрать аккаунты из группы.
+    """
+    account_ids: Optional[List[UUID]] = Field(None, min_items=1, max_items=5000)
+    filter: Optional[AccountBulkFilter] = None
+    group_id: Optional[UUID] = None
+    language: Optional[str] = Field(None, max_length=10)
+    status: Optional[AccountStatus] = None
+    warmup_stage: Optional[int] = Field(None, ge=0, le=3)
+    detach_proxies: bool = False
+    assign_free_proxies: bool = False  # свободный прокси каждому аккаунту без прокси
+
+    @root_validator(skip_on_failure=True)
+    def check_selection_and_changes(cls, values):
+        has_ids = values.get("account_ids") is not None
+        account_filter = values.get("filter")
+        if has_ids == (account_filter is not None):
+            raise ValueError("Нужно передать либо account_ids, либо filter")
+        if account_filter is not None and not account_filter.dict(exclude_none=True):
+            raise ValueError("Пустой filter выбирает все аккаунты - укажите хотя бы одно условие")
+        if values.get("detach_proxies") and values.get("assign_free_proxies"):
+            raise ValueError("detach_proxies и assign_free_proxies нельзя передавать вместе")
+        return values
+
+    def changes(self) -> dict:
+        """Переданные изменения полей аккаунта (null допустим только для group_id)"""
+        changes = self.dict(include={"group_id", "language", "status", "warmup_stage"}, exclude_unset=True)
+        return {field: value for field, value in changes.items() if value is not None or field == "group_id"}
@@ -39,6 +39,14 @@ class PostExecutionResponse(BaseModel):
         orm_mode = True
 
 
+class ExecutionCounts(BaseModel):
+    total: int = 0
+    queued: int = 0
+    posting: int = 0
+    success: int = 0
+    failed: int = 0
+
+
 class PostResponse(PostBase):
     id: UUID
     media_paths: List[str]
@@ -47,8 +55,19 @@ class PostResponse(PostBase):
     scheduled_at: Optional[datetime]
     created_at: datetime
     posted_at: Optional[datetime]
-    executions: Optional[List[PostExecutionResponse]] = None
+    archived_at: Optional[datetime] = None
+    # Выполнения отдаются только через GET /api/posts/{id}/executions (с пагинацией)
+    execution_counts: Optional[ExecutionCounts] = None
 
     class Config:
         orm_mode = True
 
+
+
+class PostBulkDeleteRequest(BaseModel):
+    post_ids: List[UUID] = Field(..., min_items=1, max_items=1000)
+
+
+class PostBulkArchiveRequest(BaseModel):
+    post_ids: List[UUID] = Field(..., min_items=1, max_items=1000)
+    archived: bool = True  # False - вернуть из архива
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, validator
-from typing import Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from uuid import UUID
 from app.models.proxy import ProxyType, ProxyStatus
@@ -19,7 +19,7 @@ class ProxyBase(BaseModel):
 
 
 class ProxyCreate(ProxyBase):
-    pass
+    max_parallel_uploads: Optional[int] = Field(None, ge=1)
 
 
 class ProxyUpdate(BaseModel):
@@ -27,6 +27,7 @@ class ProxyUpdate(BaseModel):
     type: Optional[ProxyType] = None
     country: Optional[str] = Field(None, max_length=50)
     status: Optional[ProxyStatus] = None
+    max_parallel_uploads: Optional[int] = Field(None, ge=1)
 
 
 class ProxyResponse(ProxyBase):
@@ -35,6 +36,7 @@ class ProxyResponse(ProxyBase):
     last_check_at: Optional[datetime]
     success_rate: float
     assigned_accounts: list
+    max_parallel_uploads: Optional[int]
     created_at: datetime
 
     class Config:
@@ -47,3 +49,23 @@ class ProxyCheckResponse(BaseModel):
     response_time_ms: Optional[int] = None
     error: Optional[str] = None
 
+
+
+class ProxyConcurrencyResponse(BaseModel):
+    max_parallel_uploads: int
+    in_use: int
+    waits: int
+    timeouts: int
+    avg_wait_ms: int
+    max_wait_ms: int
+    circuit_state: str
+
+
+class ProxyImportResponse(BaseModel):
+    valid: int  # уникальных корректных строк
+    inserted: int
+    already_exists: int
+    duplicates_in_list: int
+    invalid: List[Dict[str, str]]  # первые 100 некорректных строк
+    invalid_count: int
+    check_task_ids: List[str]
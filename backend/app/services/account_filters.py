@@ -0,0 +1,44 @@
+"""
+Фильтры аккаунтов для списка и массовых операций
+"""
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+from app.models.account import Account, AccountStatus
+from app.services.post_scheduler import to_utc_naive
+from app.utils.pagination import escape_like
+
+
+def account_conditions(
+    group_id: Optional[UUID] = None,
+    status: Optional[AccountStatus] = None,
+    language: Optional[str] = None,
+    proxy_id: Optional[UUID] = None,
+    warmup_stage: Optional[int] = None,
+    last_post_from: Optional[datetime] = None,
+    last_post_to: Optional[datetime] = None,
+    username: Optional[str] = None,
+) -> List:
+    """
+    Условия WHERE для заданных фильтров (None - фильтр не применяется)
+
+    username - начало имени без учёта регистра (индекс pg_trgm).
+    """
+    conditions = []
+    if group_id:
+        conditions.append(Account.group_id == group_id)
+    if status:
+        conditions.append(Account.status == status)
+    if language:
+        conditions.append(Account.language == language)
+    if proxy_id:
+        conditions.append(Account.proxy_id == proxy_id)
+    if warmup_stage is not None:
+        conditions.append(Account.warmup_stage == warmup_stage)
+    if last_post_from:
+        conditions.append(Account.last_post_at >= to_utc_naive(last_post_from))
+    if last_post_to:
+        conditions.append(Account.last_post_at < to_utc_naive(last_post_to))
+    if username:
+        conditions.append(Account.username.ilike(f"{escape_like(username)}%", escape="\\"))
+    return conditions
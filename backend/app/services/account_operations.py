@@ -0,0 +1,518 @@
+"""
+Операции с Instagram-аккаунтами, которые ходят в сеть (логин, 2FA, профиль, тестовый пост)
+
+Каждая операция выполняется в три фазы:
+1. Короткая сессия БД: загрузить аккаунт (с прокси) и отвязать его от сессии
+2. Сетевой запрос через instagrapi - без открытой сессии и соединения с БД
+3. Новая короткая сессия БД: сохранить результат и залогировать
+
+Функции используются и синхронными endpoints, и Celery задачами (фоновый режим).
+Результат - словарь с ключом "success"; при ошибке дополнительно "message"
+и "status_code" (HTTP код для API).
+"""
+import json
+import os
+import logging
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any
+from uuid import UUID
+from sqlalchemy.orm import joinedload
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.account import Account, AccountStatus
+from app.models.post import Post, MediaType
+from app.models.activity_log import LogStatus
+from app.schemas.account import AccountResponse
+from app.services.instagram import InstagramService, instagram_account_options
+from app.services.quota import record_post
+from app.utils.logging import log_activity, update_account_status
+
+logger = logging.getLogger(__name__)
+
+
+def _not_found(message: str = "Аккаунт не найден") -> Dict[str, Any]:
+    return {"success": False, "message": message, "status_code": 404}
+
+
+def _account_payload(account: Account) -> Dict[str, Any]:
+    """Сериализация аккаунта в JSON-совместимый словарь (для API и результата задачи)"""
+    return json.loads(AccountResponse.from_orm(account).json())
+
+
+def load_detached_account(account_id: UUID) -> Optional[Account]:
+    """
+    Загрузить аккаунт вместе с прокси и сессионными данными и закрыть сессию БД
+
+    Атрибуты остаются загруженными, поэтому объект можно передать
+    в InstagramService после закрытия сессии.
+    """
+    db = SessionLocal()
+    try:
+        account = db.query(Account).options(*instagram_account_options()).filter(Account.id == account_id).first()
+        return account
+    finally:
+        db.close()
+
+
+def _handle_requires_login(db, account_id: UUID, result: Dict[str, Any]):
+    """Перевести аккаунт в LOGIN_REQUIRED, если Instagram потребовал авторизацию"""
+    if not result.get("requires_login"):
+        return
+    account = db.query(Account).filter(Account.id == account_id).first()
+    if account:
+        update_account_status(
+            db=db,
+            account=account,
+            new_status=AccountStatus.LOGIN_REQUIRED.value,
+            error_message="Требуется повторная авторизация"
+        )
+
+
+def login_account(account_id: UUID, verification_code: Optional[str] = None) -> Dict[str, Any]:
+    """Авторизоваться в Instagram"""
+    account = load_detached_account(account_id)
+    if not account:
+        return _not_found()
+
+    instagram_service = InstagramService(account)
+    result = instagram_service.login(verification_code=verification_code)
+
+    logger.info(f"Результат авторизации для аккаунта {account.username}: success={result.get('success')}, message={result.get('message')}")
+
+    db = SessionLocal()
+    try:
+        db_account = db.query(Account).options(joinedload(Account.proxy)).filter(Account.id == account_id).first()
+        if not db_account:
+            return _not_found()
+
+        if result["success"]:
+            # Если есть proxy_id, но proxy_url не установлен, обновляем из прокси
+            if db_account.proxy_id and not db_account.proxy_url and db_account.proxy:
+                db_account.proxy_url = db_account.proxy.url
+                db_account.proxy_type = db_account.proxy.type.value
+
+            # Сохраняем сессию
+            db_account.session_data = result["session_data"]
+            db_account.device_id = result.get("device_id")
+            db_account.user_agent = result.get("user_agent")
+            db_account.status = AccountStatus.ACTIVE
+            db_account.last_login_at = datetime.utcnow()
+            db_account.session_checked_at = db_account.last_login_at
+            db_account.failed_attempts = 0
+            db.commit()
+            db.refresh(db_account)
+
+            log_activity(
+                db=db,
+                action="login",
+                status=LogStatus.SUCCESS,
+                account_id=account_id,
+                details={"message": result["message"]},
+                duration_ms=result.get("duration_ms")
+            )
+
+            return {
+                "success": True,
+                "message": result["message"],
+                "account": _account_payload(db_account)
+            }
+
+        logger.warning(f"Ошибка авторизации для {db_account.username}: {result.get('message')}")
+
+        # Для 2FA не меняем статус, это нормальная ситуация
+        if not result.get("requires_2fa"):
+            update_account_status(
+                db=db,
+                account=db_account,
+                new_status=AccountStatus.LOGIN_REQUIRED.value,
+                error_message=result["message"]
+            )
+
+        log_activity(
+            db=db,
+            action="login",
+            status=LogStatus.FAILED,
+            account_id=account_id,
+            error_message=result["message"]
+        )
+
+        return {
+            "success": False,
+            "message": result["message"],
+            "requires_2fa": result.get("requires_2fa", False),
+            "status_code": 400
+        }
+    finally:
+        db.close()
+
+
+def submit_2fa_code(account_id: UUID, code: str) -> Dict[str, Any]:
+    """Отправить 2FA код для завершения авторизации"""
+    account = load_detached_account(account_id)
+    if not account:
+        return _not_found()
+
+    instagram_service = InstagramService(account)
+    result = instagram_service.submit_2fa_code(code)
+
+    db = SessionLocal()
+    try:
+        db_account = db.query(Account).filter(Account.id == account_id).first()
+        if not db_account:
+            return _not_found()
+
+        if result["success"]:
+            db_account.session_data = result["session_data"]
+            db_account.status = AccountStatus.ACTIVE
+            db_account.last_login_at = datetime.utcnow()
+            db.commit()
+            db.refresh(db_account)
+
+            log_activity(
+                db=db,
+                action="2fa_login",
+                status=LogStatus.SUCCESS,
+                account_id=account_id,
+                details={"message": result["message"]},
+                duration_ms=result.get("duration_ms")
+            )
+
+            return {
+                "success": True,
+                "message": result["message"],
+                "account": _account_payload(db_account)
+            }
+
+        log_activity(
+            db=db,
+            action="2fa_login",
+            status=LogStatus.FAILED,
+            account_id=account_id,
+            details={"error": result["message"]},
+            duration_ms=result.get("duration_ms")
+        )
+
+        return {"success": False, "message": result["message"], "status_code": 400}
+    finally:
+        db.close()
+
+
+def session_needs_relogin(account: Account) -> bool:
+    """Сессия отсутствует или близка к INSTAGRAM_SESSION_LIFETIME_DAYS - перелогиниваемся заранее"""
+    if not account.session_data or not account.last_login_at:
+        return True
+    relogin_after = timedelta(days=settings.INSTAGRAM_SESSION_LIFETIME_DAYS - settings.SESSION_RELOGIN_MARGIN_DAYS)
+    return datetime.utcnow() - account.last_login_at >= relogin_after
+
+
+def keep_alive_session(account_id: UUID) -> Dict[str, Any]:
+    """
+    Поддержать сессию аккаунта: лёгкий запрос через его прокси или перелогин
+
+    Перелогин выполняется, если сессия устарела (по last_login_at) или
+    Instagram ответил LoginRequired на keep-alive запрос. Результат попытки
+    (успех или неудача с backoff) сохраняется для планировщика.
+    """
+    from app.services.session_keeper import record_refresh_result
+
+    result = _refresh_session(account_id)
+    if result.get("status_code") != 404:
+        db = SessionLocal()
+        try:
+            record_refresh_result(db, account_id, result["success"])
+        finally:
+            db.close()
+    return result
+
+
+def _refresh_session(account_id: UUID) -> Dict[str, Any]:
+    """Keep-alive запрос или перелогин (см. keep_alive_session)"""
+    account = load_detached_account(account_id)
+    if not account:
+        return _not_found()
+
+    if session_needs_relogin(account):
+        logger.info(f"Проактивный перелогин {account.username}: сессия отсутствует или устарела")
+        return login_account(account_id)
+
+    result = InstagramService(account).keep_alive()
+
+    if result.get("requires_login"):
+        logger.info(f"Сессия {account.username} истекла, выполняем перелогин")
+        return login_account(account_id)
+
+    if not result["success"]:
+        return {"success": False, "message": result["message"], "status_code": 502}
+
+    db = SessionLocal()
+    try:
+        db_account = db.query(Account).filter(Account.id == account_id).first()
+        if not db_account:
+            return _not_found()
+
+        # Сохраняем обновлённые cookies, чтобы публикации стартовали со свежей сессией
+        db_account.session_data = result["session_data"]
+        db_account.session_checked_at = datetime.utcnow()
+        db.commit()
+
+        return {"success": True, "message": result["message"]}
+    finally:
+        db.close()
+
+
+def check_account_status(account_id: UUID) -> Dict[str, Any]:
+    """Проверить статус аккаунта в Instagram и обновить его в БД"""
+    account = load_detached_account(account_id)
+    if not account:
+        return _not_found()
+
+    instagram_service = InstagramService(account)
+    result = instagram_service.check_status()
+
+    db = SessionLocal()
+    try:
+        db_account = db.query(Account).filter(Account.id == account_id).first()
+        if not db_account:
+            return _not_found()
+
+        if result["success"]:
+            if db_account.status != AccountStatus.ACTIVE:
+                db_account.status = AccountStatus.ACTIVE
+                db_account.failed_attempts = 0
+                db.commit()
+
+            log_activity(
+                db=db,
+                action="check_status",
+                status=LogStatus.SUCCESS,
+                account_id=account_id,
+                details=result,
+                duration_ms=result.get("duration_ms")
+            )
+        else:
+            if result.get("status") == "login_required":
+                update_account_status(
+                    db=db,
+                    account=db_account,
+                    new_status=AccountStatus.LOGIN_REQUIRED.value,
+                    error_message=result.get("message")
+                )
+
+            log_activity(
+                db=db,
+                action="check_status",
+                status=LogStatus.FAILED,
+                account_id=account_id,
+                error_message=result.get("message")
+            )
+
+        db.refresh(db_account)
+
+        # Проверка статуса всегда "успешна" для API: ответ Instagram лежит в instagram_status
+        return {
+            "success": True,
+            "account": _account_payload(db_account),
+            "instagram_status": result
+        }
+    finally:
+        db.close()
+
+
+def get_account_profile(account_id: UUID) -> Dict[str, Any]:
+    """Получить информацию о профиле Instagram аккаунта"""
+    account = load_detached_account(account_id)
+    if not account:
+        return _not_found()
+
+    instagram_service = InstagramService(account)
+    result = instagram_service.get_profile()
+
+    db = SessionLocal()
+    try:
+        if result["success"]:
+            log_activity(
+                db=db,
+                action="get_profile",
+                status=LogStatus.SUCCESS,
+                account_id=account_id,
+                duration_ms=result.get("duration_ms")
+            )
+            return result
+
+        log_activity(
+            db=db,
+            action="get_profile",
+            status=LogStatus.FAILED,
+            account_id=account_id,
+            error_message=result.get("message")
+        )
+        _handle_requires_login(db, account_id, result)
+
+        return {**result, "message": result.get("message", "Ошибка получения профиля"), "status_code": 400}
+    finally:
+        db.close()
+
+
+def update_account_profile(account_id: UUID, profile_update: Dict[str, Any]) -> Dict[str, Any]:
+    """Обновить информацию профиля Instagram аккаунта"""
+    account = load_detached_account(account_id)
+    if not account:
+        return _not_found()
+
+    instagram_service = InstagramService(account)
+    result = instagram_service.update_profile(
+        biography=profile_update.get("biography"),
+        full_name=profile_update.get("full_name"),
+        external_url=profile_update.get("external_url"),
+        phone_number=profile_update.get("phone_number"),
+        email=profile_update.get("email")
+    )
+
+    db = SessionLocal()
+    try:
+        if result["success"]:
+            log_activity(
+                db=db,
+                action="update_profile",
+                status=LogStatus.SUCCESS,
+                account_id=account_id,
+                details={"updated_fields": {k: v for k, v in profile_update.items() if v is not None}},
+                duration_ms=result.get("duration_ms")
+            )
+            return result
+
+        log_activity(
+            db=db,
+            action="update_profile",
+            status=LogStatus.FAILED,
+            account_id=account_id,
+            error_message=result.get("message")
+        )
+        _handle_requires_login(db, account_id, result)
+
+        return {**result, "message": result.get("message", "Ошибка обновления профиля"), "status_code": 400}
+    finally:
+        db.close()
+
+
+def set_profile_privacy(account_id: UUID, is_private: bool) -> Dict[str, Any]:
+    """Изменить приватность профиля (открыть/закрыть)"""
+    account = load_detached_account(account_id)
+    if not account:
+        return _not_found()
+
+    instagram_service = InstagramService(account)
+    result = instagram_service.set_profile_privacy(is_private)
+
+    db = SessionLocal()
+    try:
+        if result["success"]:
+            log_activity(
+                db=db,
+                action="set_profile_privacy",
+                status=LogStatus.SUCCESS,
+                account_id=account_id,
+                details={"is_private": is_private},
+                duration_ms=result.get("duration_ms")
+            )
+            return result
+
+        log_activity(
+            db=db,
+            action="set_profile_privacy",
+            status=LogStatus.FAILED,
+            account_id=account_id,
+            error_message=result.get("message")
+        )
+        _handle_requires_login(db, account_id, result)
+
+        return {**result, "message": result.get("message", "Ошибка изменения приватности"), "status_code": 400}
+    finally:
+        db.close()
+
+
+def test_post(post_id: UUID, account_id: UUID) -> Dict[str, Any]:
+    """Тестовая публикация поста на один аккаунт"""
+    db = SessionLocal()
+    try:
+        post = db.query(Post).filter(Post.id == post_id).first()
+        if not post:
+            return _not_found("Пост не найден")
+
+        account = db.query(Account).options(*instagram_account_options()).filter(Account.id == account_id).first()
+        if not account:
+            return _not_found()
+
+        media_paths = list(post.media_paths or [])
+        media_type = post.media_type
+        caption = post.caption_original
+    finally:
+        db.close()
+
+    if account.status != AccountStatus.ACTIVE:
+        return {"success": False, "message": f"Аккаунт не активен (статус: {account.status})", "status_code": 400}
+
+    if not media_paths:
+        return {"success": False, "message": "У поста нет медиа файлов", "status_code": 400}
+
+    if media_type not in (MediaType.PHOTO, MediaType.VIDEO):
+        return {
+            "success": False,
+            "message": f"Тип медиа {media_type} пока не поддерживается для тестовой публикации",
+            "status_code": 400
+        }
+
+    media_path = media_paths[0]
+    if not os.path.exists(media_path):
+        return _not_found(f"Файл не найден: {media_path}")
+
+    instagram_service = InstagramService(account)
+    if media_type == MediaType.PHOTO:
+        result = instagram_service.post_photo(media_path, caption)
+    else:
+        result = instagram_service.post_video(media_path, caption)
+
+    db = SessionLocal()
+    try:
+        log_activity(
+            db=db,
+            action="test_post",
+            status=LogStatus.SUCCESS if result["success"] else LogStatus.FAILED,
+            account_id=account_id,
+            details=result,
+            error_message=None if result["success"] else result.get("message"),
+            duration_ms=result.get("duration_ms")
+        )
+
+        db_account = db.query(Account).filter(Account.id == account_id).first()
+        if not db_account:
+            return _not_found()
+
+        if result["success"]:
+            # Обновляем дневной счётчик постов
+            record_post(db, db_account.id)
+            db_account.last_post_at = datetime.utcnow()
+            db.commit()
+
+            return {
+                "success": True,
+                "message": result["message"],
+                "media_id": result.get("media_id"),
+                "account": db_account.username
+            }
+
+        # Обновляем статус аккаунта при ошибках
+        if result.get("requires_login"):
+            db_account.status = AccountStatus.LOGIN_REQUIRED
+        elif result.get("rate_limited"):
+            db_account.status = AccountStatus.COOLDOWN
+        elif result.get("proxy_error"):
+            # Пробуем ротировать прокси
+            from app.services.proxy_manager import ProxyManager
+            ProxyManager.rotate_proxy_for_account(db, db_account, reason="proxy_error_in_post")
+
+        db.commit()
+
+        return {"success": False, "message": result["message"], "status_code": 400}
+    finally:
+        db.close()
@@ -0,0 +1,228 @@
+"""
+Массовые операции над аккаунтами и постами
+
+Каждая операция - несколько SQL-запросов по списку id или фильтру. Связанные
+строки (выполнения, логи, дневные счётчики) удаляет БД по ON DELETE CASCADE,
+поэтому стоимость не зависит от объёма накопленной истории.
+"""
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+from sqlalchemy import and_, delete, exists, select, update
+from sqlalchemy.orm import Session
+from app.models.account import Account
+from app.models.post import Post, PostStatus
+from app.models.proxy import Proxy, ProxyStatus
+from app.services.group_counters import apply_group_deltas, count_group_deltas
+
+logger = logging.getLogger(__name__)
+
+
+def delete_accounts(db: Session, account_ids: List[UUID]) -> Dict[str, Any]:
+    """
+    Удалить аккаунты одним DELETE
+
+    Returns:
+        {"deleted": int, "not_found": int}
+    """
+    rows = db.execute(
+        delete(Account)
+        .where(Account.id.in_(account_ids))
+        .returning(Account.id, Account.group_id, Account.proxy_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    apply_group_deltas(db, count_group_deltas((row.group_id for row in rows), sign=-1))
+    _unassign_proxies(db, [(row.id, row.proxy_id) for row in rows])
+    db.commit()
+    return {"deleted": len(rows), "not_found": len(set(account_ids)) - len(rows)}
+
+
+def _sync_assigned_accounts(proxy: Proxy, add: List[str] = (), remove: List[str] = ()) -> None:
+    """Обновить устаревший список Proxy.assigned_accounts (его использует ProxyManager)"""
+    remove = set(remove)
+    assigned = [account_id for account_id in (proxy.assigned_accounts or []) if account_id not in remove]
+    assigned.extend(account_id for account_id in add if account_id not in assigned)
+    proxy.assigned_accounts = assigned
+
+
+def _unassign_proxies(db: Session, rows) -> int:
+    """
+    Убрать аккаунты из assigned_accounts их бывших прокси
+
+    Args:
+        rows: [(account_id, old_proxy_id), ...]
+
+    Returns:
+        int: Количество отвязанных аккаунтов
+    """
+    by_proxy = {}
+    for account_id, proxy_id in rows:
+        if proxy_id:
+            by_proxy.setdefault(proxy_id, []).append(str(account_id))
+    if by_proxy:
+        for proxy in db.query(Proxy).filter(Proxy.id.in_(list(by_proxy))).all():
+            _sync_assigned_accounts(proxy, remove=by_proxy[proxy.id])
+    return sum(len(ids) for ids in by_proxy.values())
+
+
+def _assign_free_proxies(db: Session, selection) -> Dict[str, int]:
+    """
+    Назначить каждому выбранному аккаунту без прокси отдельный свободный ACTIVE прокси
+
+    Свободный - не привязан ни к одному аккаунту (один прокси на аккаунт, как в PUT /accounts/{id}).
+    Прокси блокируются SKIP LOCKED, поэтому параллельные вызовы не выдадут один прокси дважды.
+    """
+    account_ids = [
+        row.id for row in db.query(Account.id)
+        .filter(selection, Account.proxy_id.is_(None))
+        .order_by(Account.created_at, Account.id)
+        .all()
+    ]
+    if not account_ids:
+        return {"assigned": 0, "without_proxy": 0}
+
+    proxies = (
+        db.query(Proxy)
+        .filter(
+            Proxy.status == ProxyStatus.ACTIVE,
+            ~exists().where(Account.proxy_id == Proxy.id)
+        )
+        .order_by(Proxy.success_rate.desc(), Proxy.id)
+        .limit(len(account_ids))
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    pairs = list(zip(account_ids, proxies))
+    if pairs:
+        # Bulk UPDATE по первичному ключу (executemany)
+        db.execute(update(Account), [
+            {"id": account_id, "proxy_id": proxy.id, "proxy_url": proxy.url, "proxy_type": proxy.type.value}
+            for account_id, proxy in pairs
+        ])
+        for account_id, proxy in pairs:
+            _sync_assigned_accounts(proxy, add=[str(account_id)])
+
+    return {"assigned": len(pairs), "without_proxy": len(account_ids) - len(pairs)}
+
+
+def update_accounts(
+    db: Session,
+    account_ids: Optional[List[UUID]],
+    conditions: List,
+    changes: Dict[str, Any],
+    detach_proxies: bool = False,
+    assign_free_proxies: bool = False,
+) -> Dict[str, Any]:
+    """
+    Изменить выбранные аккаунты одним UPDATE
+
+    Аккаунты, выбранные фильтром, фиксируются списком id до изменений: обе
+    операции (UPDATE и назначение прокси) работают с одним набором.
+    Старые group_id/proxy_id берутся из той же команды (UPDATE ... FROM
+    выборки с FOR UPDATE ... RETURNING), по ним в той же транзакции
+    корректируются счётчики групп и списки назначений прокси.
+
+    Args:
+        account_ids: Явный список аккаунтов (или None - выбор по conditions)
+        conditions: Условия фильтра (account_filters.account_conditions)
+        changes: {поле: значение} - group_id, language, status, warmup_stage
+        detach_proxies: Отвязать прокси
+        assign_free_proxies: Назначить свободные прокси аккаунтам без прокси
+
+    Returns:
+        {"updated": int, "groups_changed": int, "proxies_detached": int,
+         "proxies_assigned": int, "without_proxy": int}
+    """
+    result = {"updated": 0, "groups_changed": 0, "proxies_detached": 0, "proxies_assigned": 0, "without_proxy": 0}
+    if account_ids is None:
+        # Выбор по фильтру фиксируется один раз (с блокировкой строк): иначе назначение
+        # прокси после смены группы/статуса заново вычислит фильтр и возьмёт другие аккаунты
+        account_ids = db.execute(select(Account.id).where(and_(*conditions)).with_for_update()).scalars().all()
+        if not account_ids:
+            db.rollback()
+            return result
+    selection = Account.id.in_(account_ids)
+
+    values = dict(changes)
+    if detach_proxies:
+        values.update(proxy_id=None, proxy_url=None, proxy_type=None)
+
+    if values:
+        old = (
+            select(Account.id, Account.group_id.label("old_group_id"), Account.proxy_id.label("old_proxy_id"))
+            .where(selection)
+            .with_for_update()
+            .subquery()
+        )
+        rows = db.execute(
+            update(Account)
+            .where(Account.id == old.c.id)
+            .values(**values)
+            .returning(old.c.id, old.c.old_group_id, old.c.old_proxy_id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        result["updated"] = len(rows)
+
+        if "group_id" in changes:
+            new_group_id = changes["group_id"]
+            moved = [row.old_group_id for row in rows if row.old_group_id != new_group_id]
+            deltas = Counter(count_group_deltas(moved, sign=-1))
+            if new_group_id and moved:
+                deltas[new_group_id] += len(moved)
+            apply_group_deltas(db, deltas)
+            result["groups_changed"] = len(moved)
+
+        if detach_proxies:
+            result["proxies_detached"] = _unassign_proxies(db, [(row.id, row.old_proxy_id) for row in rows])
+
+    if assign_free_proxies:
+        assigned = _assign_free_proxies(db, selection)
+        result["proxies_assigned"] = assigned["assigned"]
+        result["without_proxy"] = assigned["without_proxy"]
+
+    db.commit()
+    logger.info(f"Массовое изменение аккаунтов: {result}")
+    return result
+
+
+def delete_posts(db: Session, post_ids: List[UUID]) -> Dict[str, Any]:
+    """
+    Удалить посты одним DELETE (кроме публикуемых прямо сейчас)
+
+    Returns:
+        {"deleted": int, "skipped": [post_id, ...]} - skipped: посты в статусе POSTING
+    """
+    deleted = db.execute(
+        delete(Post)
+        .where(Post.id.in_(post_ids), Post.status != PostStatus.POSTING)
+        .returning(Post.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    skipped = db.query(Post.id).filter(
+        Post.id.in_(post_ids), Post.status == PostStatus.POSTING
+    ).all()
+    db.commit()
+    return {"deleted": len(deleted), "skipped": [str(row.id) for row in skipped]}
+
+
+def archive_posts(db: Session, post_ids: List[UUID], archived: bool = True) -> Dict[str, Any]:
+    """
+    Перенести посты в архив (или вернуть из архива) одним UPDATE
+
+    Публикуемые посты не архивируются; запланированные (PENDING) в архиве
+    не забираются планировщиком.
+
+    Returns:
+        {"updated": int}
+    """
+    query = update(Post).where(Post.id.in_(post_ids))
+    if archived:
+        query = query.where(Post.archived_at.is_(None), Post.status != PostStatus.POSTING)
+        query = query.values(archived_at=datetime.utcnow())
+    else:
+        query = query.where(Post.archived_at.isnot(None)).values(archived_at=None)
+    result = db.execute(query.execution_options(synchronize_session=False))
+    db.commit()
+    return {"updated": result.rowcount}
@@ -0,0 +1,62 @@
+"""
+Целевые аккаунты кампании (поста)
+
+Пост публикуется на ACTIVE аккаунты из post.target_groups. Все выборки
+здесь - один запрос по group_id IN (...) без загрузки групп и их аккаунтов.
+"""
+import logging
+from typing import Iterable, List
+from uuid import UUID
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models.account import Account, AccountStatus
+
+logger = logging.getLogger(__name__)
+
+
+def parse_group_ids(target_groups: Iterable) -> List[UUID]:
+    """Привести post.target_groups (строки из JSON) к UUID, некорректные id пропускаются"""
+    group_ids = []
+    for value in target_groups or []:
+        try:
+            group_ids.append(UUID(str(value)))
+        except ValueError:
+            logger.warning(f"Некорректный id группы в target_groups: {value}")
+    return group_ids
+
+
+def _active_in_groups(db: Session, query_entity, group_ids: List[UUID]):
+    return db.query(query_entity).filter(
+        Account.group_id.in_(group_ids),
+        Account.status == AccountStatus.ACTIVE
+    )
+
+
+def count_target_accounts(db: Session, group_ids: List[UUID]) -> int:
+    """Количество ACTIVE аккаунтов в группах (COUNT на стороне БД)"""
+    if not group_ids:
+        return 0
+    return _active_in_groups(db, func.count(Account.id), group_ids).scalar()
+
+
+def target_languages(db: Session, group_ids: List[UUID]) -> List[str]:
+    """Языки ACTIVE аккаунтов в группах (SELECT DISTINCT)"""
+    if not group_ids:
+        return []
+    rows = _active_in_groups(db, Account.language, group_ids).distinct().all()
+    return [row.language for row in rows]
+
+
+def load_target_accounts(db: Session, group_ids: List[UUID]) -> List[Account]:
+    """
+    ACTIVE аккаунты групп одним запросом (порядок стабильный - по дате создания)
+
+    Пароль и session_data не загружаются (отложенные колонки).
+    """
+    if not group_ids:
+        return []
+    return (
+        _active_in_groups(db, Account, group_ids)
+        .order_by(Account.created_at, Account.id)
+        .all()
+    )
@@ -0,0 +1,147 @@
+"""
+Планирование пропускной способности аккаунтов с учётом прогрева
+
+Правила прогрева (TZ.md, 3.2):
+- первые 3 дня - 1-2 поста в день
+- затем постепенное увеличение до 10 постов в день
+
+Источник истины - Account.warmup_stage. created_at - дата добавления в систему, а не
+возраст аккаунта Instagram, поэтому по нему стадия не считается: "взрослым" аккаунтам
+стадию задают при импорте или вручную, новым её повышает advance_warmup_stages по
+числу дней с публикациями. Аккаунты, существовавшие до планировщика, миграция
+перевела в стадию 3. Недавние ошибки (по failed_at) снижают лимит.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List
+from uuid import UUID
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.account import Account, AccountDailyQuota
+from app.models.post import PostExecution, PostExecutionStatus
+from app.services.quota import get_posts_today_many
+
+# Стадия прогрева -> постов в день
+WARMUP_DAILY_LIMITS = {0: 2, 1: 4, 2: 7, 3: 10}
+
+# (минимум дней с публикациями, стадия) по убыванию стадии
+WARMUP_STAGE_BY_POSTING_DAYS = ((14, 3), (7, 2), (3, 1))
+
+# Окно, в котором учитываются ошибки публикации
+RECENT_FAILURES_WINDOW = timedelta(hours=24)
+
+
+def warmup_stage_for(account: Account) -> int:
+    """Стадия прогрева аккаунта (0-3)"""
+    return account.warmup_stage or 0
+
+
+def advance_warmup_stages(db: Session) -> int:
+    """
+    Повысить warmup_stage аккаунтам, набравшим нужное число дней с публикациями (без commit)
+
+    Стадия только повышается: заданная вручную или при импорте не понижается.
+
+    Returns:
+        int: Количество повышенных аккаунтов
+    """
+    posting_days = (
+        select(func.count())
+        .where(AccountDailyQuota.account_id == Account.id, AccountDailyQuota.posts_count > 0)
+        .correlate(Account)
+        .scalar_subquery()
+    )
+
+    advanced = 0
+    for min_days, stage in WARMUP_STAGE_BY_POSTING_DAYS:
+        result = db.execute(
+            update(Account)
+            .where(func.coalesce(Account.warmup_stage, 0) < stage, posting_days >= min_days)
+            .values(warmup_stage=stage)
+            .execution_options(synchronize_session=False)
+        )
+        advanced += result.rowcount
+    return advanced
+
+
+def daily_limit(account: Account, recent_failures: int = 0) -> int:
+    """
+    Допустимое количество постов в день для аккаунта
+
+    Минимум из лимита стадии прогрева, posts_limit_per_day аккаунта и
+    MAX_POSTS_PER_DAY_PER_ACCOUNT; каждые 2 недавние ошибки снижают лимит на 1.
+    """
+    limit = min(
+        WARMUP_DAILY_LIMITS[min(warmup_stage_for(account), 3)],
+        account.posts_limit_per_day or settings.MAX_POSTS_PER_DAY_PER_ACCOUNT,
+        settings.MAX_POSTS_PER_DAY_PER_ACCOUNT
+    )
+    return max(0, limit - recent_failures // 2)
+
+
+def plan_post_slots(db: Session, accounts: Iterable[Account], exclude_post_id: UUID = None) -> Dict[UUID, Dict]:
+    """
+    Рассчитать слоты публикации для набора аккаунтов (константное число запросов)
+
+    Args:
+        db: Сессия БД
+        accounts: Аккаунты
+        exclude_post_id: Пост, для которого планируем (его выполнения не считаются занятыми слотами)
+
+    Returns:
+        dict: {account_id: {
+            "daily_limit": int,
+            "remaining": int - сколько ещё постов можно поставить сегодня,
+            "not_before": datetime - не раньше (минимальная задержка и уже стоящие в очереди посты)
+        }}
+    """
+    accounts: List[Account] = list(accounts)
+    account_ids = [account.id for account in accounts]
+    if not account_ids:
+        return {}
+
+    now = datetime.utcnow()
+    posts_today = get_posts_today_many(db, account_ids)
+
+    in_flight = PostExecution.status.in_([PostExecutionStatus.QUEUED, PostExecutionStatus.POSTING])
+    if exclude_post_id is not None:
+        in_flight = in_flight & (PostExecution.post_id != exclude_post_id)
+
+    stats = {
+        row.account_id: row
+        for row in db.query(
+            PostExecution.account_id,
+            func.count().filter(
+                (PostExecution.status == PostExecutionStatus.FAILED) &
+                (PostExecution.failed_at >= now - RECENT_FAILURES_WINDOW)
+            ).label("recent_failures"),
+            func.count().filter(in_flight).label("in_flight")
+        )
+        .filter(PostExecution.account_id.in_(account_ids))
+        .group_by(PostExecution.account_id)
+        .all()
+    }
+
+    min_delay = timedelta(seconds=settings.MIN_DELAY_BETWEEN_POSTS_SEC)
+    plan = {}
+    for account in accounts:
+        row = stats.get(account.id)
+        recent_failures = row.recent_failures if row else 0
+        queued = row.in_flight if row else 0
+
+        limit = daily_limit(account, recent_failures)
+        remaining = max(0, limit - posts_today.get(account.id, 0) - queued)
+
+        # Не раньше минимальной задержки после последнего поста и после уже стоящих в очереди
+        not_before = now
+        if account.last_post_at:
+            not_before = max(not_before, account.last_post_at + min_delay)
+        not_before += min_delay * queued
+
+        plan[account.id] = {
+            "daily_limit": limit,
+            "remaining": remaining,
+            "not_before": not_before
+        }
+
+    return plan
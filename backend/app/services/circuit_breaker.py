@@ -0,0 +1,162 @@
+"""
+Circuit breaker для прокси и аккаунтов (общий для всех воркеров через Redis)
+
+Состояния:
+- closed    - работаем как обычно, ошибки копятся в скользящем окне
+- open      - ошибок в окне >= порога: задачи сразу откладываются, без обращения к Instagram
+- half_open - время open истекло: пропускается одна пробная задача,
+              её успех закрывает breaker, ошибка - снова открывает
+"""
+import logging
+import time
+import uuid
+from typing import Dict, Any
+from uuid import UUID
+from redis.exceptions import RedisError
+from app.core.config import settings
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+KIND_PROXY = "proxy"
+KIND_ACCOUNT = "account"
+
+FAILURES_KEY = "circuit:{kind}:{entity_id}:failures"
+OPEN_KEY = "circuit:{kind}:{entity_id}:open"
+TRIPPED_KEY = "circuit:{kind}:{entity_id}:tripped"
+PROBE_KEY = "circuit:{kind}:{entity_id}:probe"
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+# Удалить пробу, только если она всё ещё наша (после TTL её могла взять другая задача)
+_RELEASE_PROBE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_release_probe_script = None
+
+
+def _get_release_probe_script():
+    global _release_probe_script
+    if _release_probe_script is None:
+        _release_probe_script = get_redis().register_script(_RELEASE_PROBE_SCRIPT)
+    return _release_probe_script
+
+
+def _keys(kind: str, entity_id: UUID) -> Dict[str, str]:
+    return {
+        "failures": FAILURES_KEY.format(kind=kind, entity_id=entity_id),
+        "open": OPEN_KEY.format(kind=kind, entity_id=entity_id),
+        "tripped": TRIPPED_KEY.format(kind=kind, entity_id=entity_id),
+        "probe": PROBE_KEY.format(kind=kind, entity_id=entity_id)
+    }
+
+
+def get_circuit_state(kind: str, entity_id: UUID) -> str:
+    """Текущее состояние breaker'а (без захвата пробы)"""
+    keys = _keys(kind, entity_id)
+    try:
+        client = get_redis()
+        if client.exists(keys["open"]):
+            return STATE_OPEN
+        if client.exists(keys["tripped"]):
+            return STATE_HALF_OPEN
+    except RedisError as e:
+        logger.warning(f"Circuit breaker недоступен: {e}")
+    return STATE_CLOSED
+
+
+def check_circuit(kind: str, entity_id: UUID) -> Dict[str, Any]:
+    """
+    Можно ли выполнять задачу для прокси/аккаунта
+
+    В состоянии half_open разрешение получает только одна задача (проба).
+    Если проба не дойдёт до Instagram, её нужно вернуть через release_probe.
+
+    Returns:
+        dict: {"allowed": bool, "state": str, "retry_after": int (если не разрешено),
+               "probe": str (токен пробы в half_open)}
+    """
+    keys = _keys(kind, entity_id)
+    try:
+        client = get_redis()
+
+        retry_after = client.ttl(keys["open"])
+        if retry_after and retry_after > 0:
+            return {"allowed": False, "state": STATE_OPEN, "retry_after": retry_after}
+
+        if not client.exists(keys["tripped"]):
+            return {"allowed": True, "state": STATE_CLOSED}
+
+        # Одна проба на время task_time_limit; остальные ждут её результата
+        probe = uuid.uuid4().hex
+        if client.set(keys["probe"], probe, nx=True, ex=settings.CIRCUIT_PROBE_TTL_SEC):
+            logger.info(f"Circuit breaker {kind}:{entity_id}: пробная задача")
+            return {"allowed": True, "state": STATE_HALF_OPEN, "probe": probe}
+
+        probe_ttl = client.ttl(keys["probe"])
+        return {
+            "allowed": False,
+            "state": STATE_HALF_OPEN,
+            "retry_after": probe_ttl if probe_ttl and probe_ttl > 0 else settings.CIRCUIT_OPEN_SEC
+        }
+    except RedisError as e:
+        logger.warning(f"Circuit breaker недоступен, задача выполняется: {e}")
+        return {"allowed": True, "state": STATE_CLOSED}
+
+
+def release_probe(kind: str, entity_id: UUID, probe: str) -> None:
+    """Вернуть неиспользованную пробу half_open, чтобы её могла взять другая задача"""
+    try:
+        _get_release_probe_script()(keys=[PROBE_KEY.format(kind=kind, entity_id=entity_id)], args=[probe])
+    except RedisError as e:
+        logger.warning(f"Circuit breaker недоступен: {e}")
+
+
+def record_failure(kind: str, entity_id: UUID) -> None:
+    """Учесть ошибку; при достижении порога в окне (или ошибке пробы) открыть breaker"""
+    keys = _keys(kind, entity_id)
+    now = time.time()
+    window = settings.CIRCUIT_WINDOW_SEC
+    try:
+        client = get_redis()
+        pipe = client.pipeline()
+        pipe.zadd(keys["failures"], {uuid.uuid4().hex: now})
+        pipe.zremrangebyscore(keys["failures"], "-inf", now - window)
+        pipe.zcard(keys["failures"])
+        pipe.expire(keys["failures"], window)
+        pipe.exists(keys["tripped"])
+        results = pipe.execute()
+        failures, half_open = results[2], results[4]
+
+        if half_open or failures >= settings.CIRCUIT_FAILURE_THRESHOLD:
+            pipe = client.pipeline()
+            pipe.set(keys["open"], int(now), ex=settings.CIRCUIT_OPEN_SEC)
+            # tripped живёт дольше open: после open наступает half_open
+            pipe.set(keys["tripped"], int(now), ex=settings.CIRCUIT_OPEN_SEC + window)
+            pipe.delete(keys["probe"])
+            pipe.execute()
+            logger.warning(
+                f"Circuit breaker {kind}:{entity_id} открыт на {settings.CIRCUIT_OPEN_SEC} сек "
+                f"({failures} ошибок за {window} сек)"
+            )
+    except RedisError as e:
+        logger.warning(f"Circuit breaker недоступен: {e}")
+
+
+def record_success(kind: str, entity_id: UUID) -> None:
+    """Успешная операция закрывает breaker и очищает окно ошибок"""
+    keys = _keys(kind, entity_id)
+    try:
+        client = get_redis()
+        if client.delete(keys["tripped"], keys["open"], keys["probe"]):
+            logger.info(f"Circuit breaker {kind}:{entity_id} закрыт")
+        client.delete(keys["failures"])
+    except RedisError as e:
+        logger.warning(f"Circuit breaker недоступен: {e}")
@@ -0,0 +1,239 @@
+"""
+Захват выполнений публикации воркерами (exactly-once)
+
+Выполнение переводится в POSTING одним UPDATE с проверкой статуса (compare-and-set),
+вместе с токеном захвата и сроком аренды. Повторная доставка той же задачи или
+дубликат в очереди не пройдут проверку и не загрузят пост второй раз.
+Если воркер упал, аренда истекает и выполнение может захватить другой воркер.
+"""
+import logging
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import update, or_, and_, func
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import session_scope
+from app.models.post import PostExecution, PostExecutionStatus
+
+logger = logging.getLogger(__name__)
+
+# Максимум попыток публикации одного выполнения
+MAX_EXECUTION_ATTEMPTS = 3
+
+
+def lease_deadline() -> datetime:
+    """Срок окончания аренды, отсчитанный от текущего момента"""
+    return datetime.utcnow() + timedelta(seconds=settings.POST_EXECUTION_LEASE_SEC)
+
+
+def claimable_condition(now: datetime):
+    """
+    Условие, при котором выполнение можно захватить:
+    - QUEUED
+    - FAILED, если не исчерпаны попытки
+    - POSTING с истёкшей арендой (воркер упал)
+    и пост ещё не опубликован (нет instagram_media_id)
+    """
+    return and_(
+        PostExecution.instagram_media_id.is_(None),
+        or_(
+            PostExecution.status == PostExecutionStatus.QUEUED,
+            and_(
+                PostExecution.status == PostExecutionStatus.FAILED,
+                PostExecution.retry_count < MAX_EXECUTION_ATTEMPTS
+            ),
+            and_(
+                PostExecution.status == PostExecutionStatus.POSTING,
+                or_(
+                    PostExecution.lease_expires_at.is_(None),
+                    PostExecution.lease_expires_at < now
+                )
+            )
+        )
+    )
+
+
+def expired_lease_condition(now: datetime):
+    """Выполнения в POSTING, чья аренда истекла (воркер убит по time limit, OOM, деплой)"""
+    return and_(
+        PostExecution.status == PostExecutionStatus.POSTING,
+        PostExecution.instagram_media_id.is_(None),
+        or_(
+            PostExecution.lease_expires_at.is_(None),
+            PostExecution.lease_expires_at < now
+        )
+    )
+
+
+def stale_queued_condition(now: datetime):
+    """
+    QUEUED выполнения, чья задача потеряна брокером или воркером
+
+    Отсчёт идёт от планового времени запуска (scheduled_for), а не от постановки
+    в очередь: задачи с паузами планировщика ждут в хранилище отложенных задач
+    часами и зависшими не считаются, пока не прошёл их срок плюс
+    POST_EXECUTION_STALE_QUEUED_SEC.
+    """
+    stale_before = now - timedelta(seconds=settings.POST_EXECUTION_STALE_QUEUED_SEC)
+    # GREATEST игнорирует NULL: у старых записей scheduled_for не заполнен
+    queued_until = func.coalesce(
+        func.greatest(PostExecution.scheduled_for, PostExecution.queued_at),
+        PostExecution.created_at
+    )
+    return and_(
+        PostExecution.status == PostExecutionStatus.QUEUED,
+        queued_until < stale_before
+    )
+
+
+def is_stale_queued(execution: PostExecution, now: datetime) -> bool:
+    """То же, что stale_queued_condition, для загруженного выполнения"""
+    if execution.status != PostExecutionStatus.QUEUED:
+        return False
+    marks = [mark for mark in (execution.scheduled_for, execution.queued_at) if mark is not None]
+    queued_until = max(marks) if marks else execution.created_at
+    if queued_until is None:
+        return False
+    return queued_until < now - timedelta(seconds=settings.POST_EXECUTION_STALE_QUEUED_SEC)
+
+
+def exhausted_failed_condition():
+    """
+    FAILED выполнения с исчерпанными попытками
+
+    FAILED с retry_count < MAX_EXECUTION_ATTEMPTS ещё ждёт автоматического повтора
+    (задача в хранилище отложенных) и итогом не считается.
+    """
+    return and_(
+        PostExecution.status == PostExecutionStatus.FAILED,
+        PostExecution.retry_count >= MAX_EXECUTION_ATTEMPTS
+    )
+
+
+def retryable_condition(now: datetime):
+    """
+    Выполнения, которые режим "повторить неудачные" ставит в очередь заново:
+    - FAILED с исчерпанными попытками (у остальных уже запланирован автоповтор)
+    - зависшие QUEUED (см. stale_queued_condition)
+    """
+    return and_(
+        PostExecution.instagram_media_id.is_(None),
+        or_(
+            exhausted_failed_condition(),
+            stale_queued_condition(now)
+        )
+    )
+
+
+def mark_scheduled(execution_id: UUID, run_at: datetime) -> None:
+    """Сохранить плановое время запуска отложенной задачи выполнения"""
+    with session_scope() as db:
+        db.execute(
+            update(PostExecution)
+            .where(PostExecution.id == execution_id)
+            .values(scheduled_for=run_at)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+
+def claim_execution(db: Session, execution_id: UUID) -> Optional[str]:
+    """
+    Атомарно захватить выполнение (перевести в POSTING)
+
+    Returns:
+        str: токен захвата или None, если выполнение уже захвачено/опубликовано
+    """
+    now = datetime.utcnow()
+    token = uuid.uuid4().hex
+
+    result = db.execute(
+        update(PostExecution)
+        .where(PostExecution.id == execution_id, claimable_condition(now))
+        .values(
+            status=PostExecutionStatus.POSTING,
+            claim_token=token,
+            lease_expires_at=lease_deadline(),
+            heartbeat_at=now
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+    if result.rowcount == 0:
+        return None
+    return token
+
+
+def release_execution(db: Session, execution_id: UUID, claim_token: str, clear_upload_marker: bool = False) -> bool:
+    """
+    Вернуть захваченное выполнение в очередь (QUEUED) без попытки публикации
+
+    clear_upload_marker: сбросить upload_started_at, если загрузка так и не начиналась
+    """
+    values = {
+        "status": PostExecutionStatus.QUEUED,
+        "claim_token": None,
+        "lease_expires_at": None,
+        "queued_at": datetime.utcnow()
+    }
+    if clear_upload_marker:
+        values["upload_started_at"] = None
+
+    result = db.execute(
+        update(PostExecution)
+        .where(PostExecution.id == execution_id, PostExecution.claim_token == claim_token)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount > 0
+
+
+def extend_lease(execution_id: UUID, claim_token: str) -> bool:
+    """Продлить аренду, если выполнение всё ещё принадлежит этому захвату"""
+    with session_scope() as db:
+        result = db.execute(
+            update(PostExecution)
+            .where(PostExecution.id == execution_id, PostExecution.claim_token == claim_token)
+            .values(heartbeat_at=datetime.utcnow(), lease_expires_at=lease_deadline())
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return result.rowcount > 0
+
+
+class LeaseHeartbeat:
+    """
+    Периодическое продление аренды, пока идёт загрузка в Instagram
+
+    Под gevent воркером threading пропатчен, и поток становится гринлетом.
+    """
+
+    def __init__(self, execution_id: UUID, claim_token: str, interval: Optional[int] = None):
+        self.execution_id = execution_id
+        self.claim_token = claim_token
+        self.interval = interval or settings.POST_EXECUTION_HEARTBEAT_SEC
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join(timeout=5)
+        return False
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if not extend_lease(self.execution_id, self.claim_token):
+                    logger.warning(f"Аренда выполнения {self.execution_id} перехвачена другим воркером")
+                    return
+            except Exception as e:
+                logger.warning(f"Не удалось продлить аренду выполнения {self.execution_id}: {e}")
@@ -0,0 +1,90 @@
+"""
+Счётчик аккаунтов в группе (Group.accounts_count)
+
+Счётчик меняется атомарным UPDATE accounts_count = accounts_count ± n в той же
+транзакции, что и изменение аккаунтов, - без загрузки аккаунтов группы.
+Возможный дрейф (ручные правки в БД, прерванные операции) исправляет
+периодическая сверка reconcile_group_counts.
+"""
+from collections import Counter
+from typing import Dict, Iterable, Optional
+from uuid import UUID
+from sqlalchemy import case, func, select, update
+from sqlalchemy.orm import Session
+from app.models.account import Account
+from app.models.group import Group
+
+
+def adjust_accounts_count(db: Session, group_id: Optional[UUID], delta: int) -> None:
+    """Изменить счётчик одной группы на delta (без commit)"""
+    if not group_id or not delta:
+        return
+    apply_group_deltas(db, {group_id: delta})
+
+
+def move_account_between_groups(db: Session, old_group_id: Optional[UUID], new_group_id: Optional[UUID]) -> None:
+    """Учесть перенос аккаунта из одной группы в другую (без commit)"""
+    if old_group_id == new_group_id:
+        return
+    deltas = Counter()
+    if old_group_id:
+        deltas[old_group_id] -= 1
+    if new_group_id:
+        deltas[new_group_id] += 1
+    apply_group_deltas(db, deltas)
+
+
+def count_group_deltas(group_ids: Iterable[Optional[UUID]], sign: int = 1) -> Dict[UUID, int]:
+    """Сгруппировать изменения по группам: [g1, g1, g2] -> {g1: 2*sign, g2: sign}"""
+    deltas = Counter()
+    for group_id in group_ids:
+        if group_id:
+            deltas[group_id] += sign
+    return deltas
+
+
+def apply_group_deltas(db: Session, deltas: Dict[UUID, int]) -> None:
+    """
+    Применить изменения счётчиков нескольких групп одним UPDATE (без commit)
+
+    Args:
+        deltas: {group_id: delta}
+    """
+    deltas = {group_id: delta for group_id, delta in deltas.items() if group_id and delta}
+    if not deltas:
+        return
+    db.execute(
+        update(Group)
+        .where(Group.id.in_(list(deltas)))
+        .values(accounts_count=func.coalesce(Group.accounts_count, 0) + case(deltas, value=Group.id, else_=0))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def reconcile_group_counts(db: Session, group_ids: Optional[Iterable[UUID]] = None) -> int:
+    """
+    Пересчитать счётчики по фактическому числу аккаунтов (без commit)
+
+    Обновляются только расходящиеся строки.
+
+    Args:
+        group_ids: Группы для сверки (None - все)
+
+    Returns:
+        int: Количество исправленных групп
+    """
+    actual = (
+        select(func.count(Account.id))
+        .where(Account.group_id == Group.id)
+        .scalar_subquery()
+    )
+    query = update(Group).where(Group.accounts_count.is_distinct_from(actual))
+    if group_ids is not None:
+        group_ids = [group_id for group_id in set(group_ids) if group_id]
+        if not group_ids:
+            return 0
+        query = query.where(Group.id.in_(group_ids))
+    result = db.execute(
+        query.values(accounts_count=actual).execution_options(synchronize_session=False)
+    )
+    return result.rowcount
@@ -13,6 +13,7 @@ from instagrapi.exceptions import (
     RateLimitError,
     UserNotFound,
 )
+from sqlalchemy.orm import joinedload, undefer_group
 from app.core.security import decrypt_data
 from app.models.account import Account, AccountStatus
 from app.models.activity_log import ActivityLog, LogStatus
@@ -20,6 +21,17 @@ from app.models.activity_log import ActivityLog, LogStatus
 logger = logging.getLogger(__name__)
 
 
+def instagram_account_options():
+    """
+    Опции загрузки Account для InstagramService
+
+    Пароль и session_data отложены (группа "credentials") и в обычных
+    запросах не читаются. Здесь они загружаются вместе с прокси одним
+    запросом, чтобы объект можно было передать в сервис после закрытия сессии БД.
+    """
+    return (joinedload(Account.proxy), undefer_group("credentials"))
+
+
 class InstagramService:
     """Сервис для работы с Instagram через instagrapi"""
     
@@ -453,54 +465,9 @@ class InstagramService:
         start_time = datetime.utcnow()
         
         try:
-            # Конвертируем и изменяем размер изображения, если нужно
-            from PIL import Image
-            import os
-            
-            # Открываем изображение
-            img = Image.open(photo_path)
-            
-            # Конвертируем в RGB (на случай если PNG с прозрачностью)
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # Проверяем и исправляем соотношение сторон
-            width, height = img.size
-            aspect_ratio = width / height
-            
-            # Instagram принимает:
-            # - Квадрат: 1:1 (0.8 - 1.91)
-            # - Вертикальное: 4:5 (0.8 - 1.0)
-            # - Горизонтальное: 1.91:1 (1.91 - 1.0)
-            # Минимальное соотношение: 0.8, максимальное: 1.91
-            
-            if aspect_ratio < 0.8:
-                # Слишком узкое (высокое) - обрезаем до 4:5
-                new_width = int(height * 0.8)
-                left = (width - new_width) // 2
-                img = img.crop((left, 0, left + new_width, height))
-                logger.info(f"Изображение обрезано до соотношения 4:5 (было {aspect_ratio:.2f})")
-            elif aspect_ratio > 1.91:
-                # Слишком широкое - обрезаем до 1.91:1
-                new_height = int(width / 1.91)
-                top = (height - new_height) // 2
-                img = img.crop((0, top, width, top + new_height))
-                logger.info(f"Изображение обрезано до соотношения 1.91:1 (было {aspect_ratio:.2f})")
-            
-            # Проверяем формат файла и конвертируем в JPG, если нужно
-            file_ext = os.path.splitext(photo_path)[1].lower()
-            if file_ext not in ['.jpg', '.jpeg']:
-                logger.info(f"Конвертация изображения {photo_path} в JPG")
-                # Создаём временный файл JPG
-                jpg_path = os.path.splitext(photo_path)[0] + '.jpg'
-                img.save(jpg_path, 'JPEG', quality=95)
-                photo_path = jpg_path
-                logger.info(f"Изображение сохранено как {photo_path}")
-            else:
-                # Сохраняем обратно, если изменили размер
-                if aspect_ratio < 0.8 or aspect_ratio > 1.91:
-                    img.save(photo_path, 'JPEG', quality=95)
-                    logger.info(f"Изображение сохранено с исправленным соотношением сторон")
+            # Подготовка изображения (обычно уже сделана задачей очереди media - тогда это no-op)
+            from app.services.media import prepare_photo
+            photo_path = prepare_photo(photo_path)
             
             # Публикуем фото
             media = self.client.photo_upload(photo_path, caption)
@@ -609,6 +576,70 @@ class InstagramService:
                 "message": f"Ошибка публикации: {str(e)}"
             }
     
+    def keep_alive(self) -> Dict[str, Any]:
+        """
+        Лёгкий авторизованный запрос для поддержания сессии
+
+        Returns:
+            dict: {
+                "success": bool,
+                "session_data": dict (обновлённые cookies, если успешно),
+                "requires_login": bool
+            }
+        """
+        start_time = datetime.utcnow()
+
+        try:
+            self.client.account_info()
+
+            return {
+                "success": True,
+                "message": "Сессия активна",
+                "session_data": self.client.get_settings(),
+                "duration_ms": int((datetime.utcnow() - start_time).total_seconds() * 1000)
+            }
+
+        except LoginRequired:
+            return {
+                "success": False,
+                "message": "Сессия истекла, требуется повторная авторизация",
+                "requires_login": True
+            }
+
+        except Exception as e:
+            logger.warning(f"Ошибка keep-alive для {self.account.username}: {e}")
+            return {
+                "success": False,
+                "message": f"Ошибка проверки сессии: {str(e)}"
+            }
+
+    def find_recent_media(self, caption: str, amount: int = 5) -> Dict[str, Any]:
+        """
+        Поиск среди последних публикаций аккаунта поста с указанной подписью
+
+        Используется перед повторной загрузкой, если предыдущая попытка
+        прервалась и неизвестно, дошёл ли пост до Instagram.
+
+        Returns:
+            dict: {
+                "success": bool (удалось ли проверить),
+                "media_id": str или None (если пост найден)
+            }
+        """
+        try:
+            medias = self.client.user_medias(self.client.user_id, amount=amount)
+            expected = (caption or "").strip()
+
+            for media in medias:
+                if (media.caption_text or "").strip() == expected:
+                    return {"success": True, "media_id": str(media.id)}
+
+            return {"success": True, "media_id": None}
+
+        except Exception as e:
+            logger.error(f"Ошибка при проверке последних публикаций {self.account.username}: {e}", exc_info=True)
+            return {"success": False, "media_id": None, "message": str(e)}
+
     def get_session_data(self) -> Dict[str, Any]:
         """Получить текущие данные сессии"""
         try:
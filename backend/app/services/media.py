@@ -0,0 +1,63 @@
+import os
+import logging
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Допустимые соотношения сторон Instagram:
+# - Вертикальное: 4:5 (0.8)
+# - Горизонтальное: 1.91:1
+MIN_ASPECT_RATIO = 0.8
+MAX_ASPECT_RATIO = 1.91
+
+
+def prepare_photo(photo_path: str) -> str:
+    """
+    Подготовить фото к публикации в Instagram (CPU-операция)
+
+    Приводит соотношение сторон к допустимому и конвертирует в JPG.
+    Уже подготовленный файл (JPG с допустимым соотношением сторон) не перекодируется,
+    поэтому повторный вызов почти бесплатный - читается только заголовок файла.
+
+    Args:
+        photo_path: Путь к файлу фото
+
+    Returns:
+        str: Путь к подготовленному JPG файлу
+    """
+    img = Image.open(photo_path)
+
+    width, height = img.size
+    aspect_ratio = width / height
+    file_ext = os.path.splitext(photo_path)[1].lower()
+    is_jpeg = file_ext in ['.jpg', '.jpeg']
+    needs_crop = aspect_ratio < MIN_ASPECT_RATIO or aspect_ratio > MAX_ASPECT_RATIO
+
+    if is_jpeg and not needs_crop and img.mode == 'RGB':
+        return photo_path
+
+    # Конвертируем в RGB (на случай если PNG с прозрачностью)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+
+    if aspect_ratio < MIN_ASPECT_RATIO:
+        # Слишком узкое (высокое) - обрезаем до 4:5
+        new_width = int(height * MIN_ASPECT_RATIO)
+        left = (width - new_width) // 2
+        img = img.crop((left, 0, left + new_width, height))
+        logger.info(f"Изображение обрезано до соотношения 4:5 (было {aspect_ratio:.2f})")
+    elif aspect_ratio > MAX_ASPECT_RATIO:
+        # Слишком широкое - обрезаем до 1.91:1
+        new_height = int(width / MAX_ASPECT_RATIO)
+        top = (height - new_height) // 2
+        img = img.crop((0, top, width, top + new_height))
+        logger.info(f"Изображение обрезано до соотношения 1.91:1 (было {aspect_ratio:.2f})")
+
+    if not is_jpeg:
+        logger.info(f"Конвертация изображения {photo_path} в JPG")
+        photo_path = os.path.splitext(photo_path)[0] + '.jpg'
+
+    img.save(photo_path, 'JPEG', quality=95)
+    logger.info(f"Изображение сохранено как {photo_path}")
+
+    return photo_path
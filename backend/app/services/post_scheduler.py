@@ -0,0 +1,86 @@
+"""
+Планирование постов
+
+Запланированный пост - PENDING с заполненным scheduled_at. Планировщик (celery beat)
+забирает посты, чей слот наступит в пределах SCHEDULER_PREWARM_SEC, и запускает
+подготовку медиа и рассылку заранее, чтобы к слоту выполнения уже стояли в очереди.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Tuple
+from uuid import UUID
+from sqlalchemy import exists, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.post import Post, PostExecution, PostStatus
+
+logger = logging.getLogger(__name__)
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    """Привести время к naive UTC (так хранятся даты в БД)"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def claim_due_posts(db: Session, limit: int = None) -> List[Tuple[UUID, datetime]]:
+    """
+    Забрать посты, которым пора готовиться к публикации
+
+    SKIP LOCKED: несколько экземпляров планировщика не заберут один пост дважды.
+    Забранные посты переводятся в POSTING в той же транзакции.
+
+    Returns:
+        list: [(post_id, scheduled_at), ...]
+    """
+    horizon = datetime.utcnow() + timedelta(seconds=settings.SCHEDULER_PREWARM_SEC)
+
+    posts = (
+        db.query(Post)
+        .filter(
+            Post.status == PostStatus.PENDING,
+            Post.archived_at.is_(None),
+            Post.scheduled_at.isnot(None),
+            Post.scheduled_at <= horizon
+        )
+        .order_by(Post.scheduled_at)
+        .limit(limit or settings.SCHEDULER_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+    now = datetime.utcnow()
+    due = []
+    for post in posts:
+        post.status = PostStatus.POSTING
+        post.posting_started_at = now
+        due.append((post.id, post.scheduled_at))
+
+    db.commit()
+    return due
+
+
+def has_no_executions():
+    """Условие: у поста ещё нет выполнений (рассылка не началась)"""
+    return ~exists().where(PostExecution.post_id == Post.id)
+
+
+def release_undispatched_post(db: Session, post_id: UUID) -> bool:
+    """
+    Вернуть забранный планировщиком пост в PENDING, если рассылка не началась
+
+    Следующий проход планировщика заберёт его снова. Пост, у которого уже есть
+    выполнения, не трогается: его итог подводит обслуживание публикаций.
+
+    Returns:
+        bool: Пост возвращён
+    """
+    result = db.execute(
+        update(Post)
+        .where(Post.id == post_id, Post.status == PostStatus.POSTING, has_no_executions())
+        .values(status=PostStatus.PENDING, posting_started_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount > 0
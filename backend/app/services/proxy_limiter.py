@@ -0,0 +1,132 @@
+"""
+Ограничение параллельных загрузок через один прокси (распределённый семафор в Redis)
+
+Семафор - sorted set, где участник - токен держателя, score - срок его аренды.
+Упавший воркер не блокирует прокси навсегда: просроченные держатели удаляются
+при следующей попытке захвата. Время ожидания пишется в метрики прокси.
+"""
+import logging
+import time
+import uuid
+from typing import Dict, Any, Iterable, Optional
+from uuid import UUID
+from redis.exceptions import RedisError
+from app.core.config import settings
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+SEMAPHORE_KEY = "proxy:slots:{proxy_id}"
+METRICS_KEY = "proxy:slots:metrics:{proxy_id}"
+
+# Чистит просроченных держателей и занимает слот, если он есть (атомарно)
+_ACQUIRE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('ZADD', KEYS[1], ARGV[3], ARGV[4])
+    redis.call('EXPIRE', KEYS[1], ARGV[5])
+    return 1
+end
+return 0
+"""
+
+# Сигнал о том, что семафор не использовался (Redis недоступен)
+SLOT_UNAVAILABLE = ""
+
+_acquire_script = None
+
+
+def _get_acquire_script():
+    global _acquire_script
+    if _acquire_script is None:
+        _acquire_script = get_redis().register_script(_ACQUIRE_SCRIPT)
+    return _acquire_script
+
+
+def proxy_parallelism(max_parallel_uploads: Optional[int]) -> int:
+    """Допустимое число параллельных загрузок через прокси"""
+    return max_parallel_uploads or settings.PROXY_MAX_PARALLEL_UPLOADS
+
+
+def _record_wait(proxy_id: UUID, wait_ms: int, acquired: bool) -> None:
+    """Сохранить время ожидания слота в метриках прокси"""
+    key = METRICS_KEY.format(proxy_id=proxy_id)
+    try:
+        client = get_redis()
+        pipe = client.pipeline()
+        pipe.hincrby(key, "waits", 1)
+        pipe.hincrby(key, "wait_ms_total", wait_ms)
+        if not acquired:
+            pipe.hincrby(key, "timeouts", 1)
+        pipe.hget(key, "wait_ms_max")
+        current_max = pipe.execute()[-1]
+
+        # Максимум без Lua: гонка может занизить его на одно значение, для метрики это допустимо
+        if current_max is None or wait_ms > int(current_max):
+            client.hset(key, "wait_ms_max", wait_ms)
+    except RedisError as e:
+        logger.warning(f"Не удалось сохранить метрики прокси {proxy_id}: {e}")
+
+
+def acquire_proxy_slot(proxy_id: UUID, limit: int, wait_sec: Optional[int] = None) -> Optional[str]:
+    """
+    Занять слот загрузки через прокси, ожидая до wait_sec секунд
+
+    Returns:
+        str: токен слота (передаётся в release_proxy_slot)
+        SLOT_UNAVAILABLE: Redis недоступен - загрузка идёт без ограничения
+        None: слот не освободился за время ожидания
+    """
+    wait_sec = settings.PROXY_SLOT_WAIT_SEC if wait_sec is None else wait_sec
+    key = SEMAPHORE_KEY.format(proxy_id=proxy_id)
+    token = uuid.uuid4().hex
+    started = time.monotonic()
+
+    try:
+        while True:
+            now = time.time()
+            acquired = bool(_get_acquire_script()(
+                keys=[key],
+                args=[now, limit, now + settings.PROXY_SLOT_TTL_SEC, token, settings.PROXY_SLOT_TTL_SEC]
+            ))
+            waited = time.monotonic() - started
+            if acquired or waited >= wait_sec:
+                break
+            time.sleep(settings.PROXY_SLOT_POLL_SEC)
+    except RedisError as e:
+        logger.warning(f"Семафор прокси недоступен, загрузка без ограничения: {e}")
+        return SLOT_UNAVAILABLE
+
+    _record_wait(proxy_id, int(waited * 1000), acquired)
+    if not acquired:
+        logger.info(f"Нет свободного слота прокси {proxy_id} за {wait_sec} сек (лимит {limit})")
+        return None
+    return token
+
+
+def release_proxy_slot(proxy_id: UUID, token: str) -> None:
+    """Освободить слот загрузки"""
+    if not token:
+        return
+    try:
+        get_redis().zrem(SEMAPHORE_KEY.format(proxy_id=proxy_id), token)
+    except RedisError as e:
+        logger.warning(f"Не удалось освободить слот прокси {proxy_id}: {e}")
+
+
+def get_proxy_slot_metrics(proxy_id: UUID) -> Dict[str, Any]:
+    """Текущая загрузка семафора прокси и статистика ожиданий"""
+    client = get_redis()
+    key = SEMAPHORE_KEY.format(proxy_id=proxy_id)
+    client.zremrangebyscore(key, "-inf", time.time())
+    in_use = client.zcard(key)
+    metrics = client.hgetall(METRICS_KEY.format(proxy_id=proxy_id))
+
+    waits = int(metrics.get("waits", 0))
+    return {
+        "in_use": in_use,
+        "waits": waits,
+        "timeouts": int(metrics.get("timeouts", 0)),
+        "avg_wait_ms": int(metrics.get("wait_ms_total", 0)) // waits if waits else 0,
+        "max_wait_ms": int(metrics.get("wait_ms_max", 0))
+    }
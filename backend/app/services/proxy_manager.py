@@ -197,7 +197,8 @@ class ProxyManager:
     def update_proxy_status(
         db: Session,
         proxy: Proxy,
-        check_result: Dict[str, Any]
+        check_result: Dict[str, Any],
+        commit: bool = True
     ):
         """
         Обновить статус прокси на основе результата проверки
@@ -206,6 +207,7 @@ class ProxyManager:
             db: Сессия БД
             proxy: Прокси
             check_result: Результат проверки от check_proxy()
+            commit: Сохранить сразу (False - при пакетной проверке коммитит вызывающий)
         """
         proxy.last_check_at = datetime.utcnow()
         
@@ -225,5 +227,6 @@ class ProxyManager:
                 proxy.status = ProxyStatus.FAILED
                 logger.warning(f"Прокси {proxy.url} помечен как failed (success_rate: {proxy.success_rate:.2f})")
         
-        db.commit()
+        if commit:
+            db.commit()
 
@@ -0,0 +1,51 @@
+"""
+Учёт дневных лимитов публикаций
+
+Счётчики хранятся по ключу (account_id, день UTC) в account_daily_quotas:
+проверка - чтение одной строки по первичному ключу, увеличение - один upsert,
+сброс происходит сам со сменой даты.
+"""
+from typing import Dict, Iterable
+from uuid import UUID
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.models.account import AccountDailyQuota, utc_today
+
+
+def get_posts_today(db: Session, account_id: UUID) -> int:
+    """Количество публикаций аккаунта за сегодня"""
+    count = db.query(AccountDailyQuota.posts_count).filter(
+        AccountDailyQuota.account_id == account_id,
+        AccountDailyQuota.day == utc_today()
+    ).scalar()
+    return count or 0
+
+
+def get_posts_today_many(db: Session, account_ids: Iterable[UUID]) -> Dict[UUID, int]:
+    """Публикации за сегодня для набора аккаунтов (один запрос)"""
+    account_ids = list(account_ids)
+    if not account_ids:
+        return {}
+
+    rows = db.query(AccountDailyQuota.account_id, AccountDailyQuota.posts_count).filter(
+        AccountDailyQuota.account_id.in_(account_ids),
+        AccountDailyQuota.day == utc_today()
+    ).all()
+    return dict(rows)
+
+
+def record_post(db: Session, account_id: UUID) -> None:
+    """
+    Учесть публикацию в счётчике за сегодня (атомарный upsert, без commit)
+    """
+    stmt = pg_insert(AccountDailyQuota).values(
+        account_id=account_id,
+        day=utc_today(),
+        posts_count=1
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[AccountDailyQuota.account_id, AccountDailyQuota.day],
+            set_={"posts_count": AccountDailyQuota.posts_count + 1}
+        )
+    )
@@ -0,0 +1,140 @@
+"""
+Поддержание свежести сессий Instagram
+
+Планировщик (celery beat) выбирает аккаунты, которым нужен keep-alive или перелогин:
+- активные аккаунты, чья сессия не проверялась дольше SESSION_KEEPALIVE_HOURS
+- сессии, близкие к INSTAGRAM_SESSION_LIFETIME_DAYS (перелогин заранее)
+- аккаунты групп, в которые скоро выйдут запланированные посты: проверка
+  не старше SESSION_PREFLIGHT_MAX_AGE_MIN, аккаунты LOGIN_REQUIRED пробуем перелогинить
+
+Попытка отмечается в session_refresh_after при планировании, поэтому следующие
+проходы планировщика не ставят для аккаунта дубликаты. После неудачи следующая
+попытка откладывается с экспоненциальным backoff: частые перелогины через
+один прокси приводят к блокировке аккаунта.
+"""
+from datetime import datetime, timedelta
+from typing import List
+from uuid import UUID
+from sqlalchemy import or_, and_, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.account import Account, AccountStatus
+from app.models.post import Post, PostStatus
+
+
+def upcoming_campaign_group_ids(db: Session, now: datetime) -> List[UUID]:
+    """Группы запланированных постов, слот которых наступит в ближайшие SESSION_PREFLIGHT_HOURS"""
+    horizon = now + timedelta(hours=settings.SESSION_PREFLIGHT_HOURS)
+    rows = db.query(Post.target_groups).filter(
+        Post.status == PostStatus.PENDING,
+        Post.scheduled_at.isnot(None),
+        Post.scheduled_at <= horizon
+    ).all()
+
+    group_ids = set()
+    for (target_groups,) in rows:
+        for group_id in target_groups or []:
+            try:
+                group_ids.add(UUID(str(group_id)))
+            except ValueError:
+                continue
+    return list(group_ids)
+
+
+def select_sessions_to_refresh(db: Session, limit: int = None) -> List[UUID]:
+    """
+    Аккаунты для keep-alive/перелогина, сначала давно не проверявшиеся
+
+    Returns:
+        list: UUID аккаунтов
+    """
+    now = datetime.utcnow()
+    stale_check = now - timedelta(hours=settings.SESSION_KEEPALIVE_HOURS)
+    relogin_login_before = now - timedelta(
+        days=settings.INSTAGRAM_SESSION_LIFETIME_DAYS - settings.SESSION_RELOGIN_MARGIN_DAYS
+    )
+
+    conditions = [
+        and_(
+            Account.status == AccountStatus.ACTIVE,
+            or_(
+                Account.session_checked_at.is_(None),
+                Account.session_checked_at < stale_check,
+                Account.last_login_at.is_(None),
+                Account.last_login_at < relogin_login_before
+            )
+        )
+    ]
+
+    campaign_groups = upcoming_campaign_group_ids(db, now)
+    if campaign_groups:
+        preflight_check = now - timedelta(minutes=settings.SESSION_PREFLIGHT_MAX_AGE_MIN)
+        conditions.append(and_(
+            Account.group_id.in_(campaign_groups),
+            Account.status.in_([AccountStatus.ACTIVE, AccountStatus.LOGIN_REQUIRED]),
+            or_(Account.session_checked_at.is_(None), Account.session_checked_at < preflight_check)
+        ))
+
+    rows = (
+        db.query(Account.id)
+        .filter(
+            or_(*conditions),
+            or_(Account.session_refresh_after.is_(None), Account.session_refresh_after <= now)
+        )
+        .order_by(Account.session_checked_at.asc().nullsfirst())
+        .limit(limit or settings.SESSION_REFRESH_BATCH)
+        .all()
+    )
+    return [row[0] for row in rows]
+
+
+def refresh_backoff(failures: int) -> timedelta:
+    """Пауза перед следующей попыткой после failures неудач подряд"""
+    seconds = settings.SESSION_REFRESH_BACKOFF_BASE_SEC * 2 ** max(failures - 1, 0)
+    return timedelta(seconds=min(seconds, settings.SESSION_REFRESH_BACKOFF_MAX_SEC))
+
+
+def mark_refresh_scheduled(db: Session, account_ids: List[UUID], run_within_sec: int) -> None:
+    """
+    Отметить запланированные попытки: аккаунты не выбираются снова, пока задача не выполнена
+
+    Если задача потеряется, аккаунт вернётся в выборку через два окна планирования.
+    """
+    if not account_ids:
+        return
+    db.execute(
+        update(Account)
+        .where(Account.id.in_(account_ids))
+        .values(session_refresh_after=datetime.utcnow() + timedelta(seconds=2 * run_within_sec))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def record_refresh_result(db: Session, account_id: UUID, success: bool) -> None:
+    """Сбросить backoff после успеха или отложить следующую попытку после неудачи"""
+    if success:
+        db.execute(
+            update(Account)
+            .where(Account.id == account_id)
+            .values(session_refresh_after=None, session_refresh_failures=0)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return
+
+    failures = db.execute(
+        update(Account)
+        .where(Account.id == account_id)
+        .values(session_refresh_failures=Account.session_refresh_failures + 1)
+        .returning(Account.session_refresh_failures)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    if failures is not None:
+        db.execute(
+            update(Account)
+            .where(Account.id == account_id)
+            .values(session_refresh_after=datetime.utcnow() + refresh_backoff(failures))
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
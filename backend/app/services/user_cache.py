@@ -0,0 +1,183 @@
+"""
+Кэш пользователя для get_current_user (Redis, AUTH_USER_CACHE_TTL_SEC)
+
+Инвалидация:
+- изменения кэшируемых полей и удаление User через ORM-сессию сбрасывают кэш после commit
+  (after_commit): сброс при flush не помогает - параллельный запрос успеет
+  прочитать и закэшировать старую строку до commit;
+- после сброса на время TTL ставится маркер, и запрос, прочитавший строку
+  до commit, не сможет записать её в кэш (проверка и запись - один Lua скрипт);
+- массовые query(User).update()/delete() сбрасывают кэш всех пользователей.
+Core UPDATE users в обход ORM-сессии кэш не видит: после такого запроса
+нужно вызвать invalidate_user_cache(user_id) или invalidate_all_user_cache().
+"""
+import json
+import logging
+from typing import Optional
+from uuid import UUID
+from redis.exceptions import RedisError
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.models.user import User, UserRole
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_KEY = "auth:user:{user_id}"
+USER_INVALIDATED_KEY = "auth:user_invalidated:{user_id}"
+ALL_USERS_INVALIDATED_KEY = "auth:user_invalidated:all"
+
+# Поля User, которые хранятся в кэше (см. cache_user)
+CACHED_FIELDS = ("id", "username", "email", "role", "is_active")
+
+# ID пользователей для сброса кэша после commit (в Session.info)
+_PENDING_KEY = "user_cache_invalidate"
+_ALL = "*"
+
+# Записать пользователя, только если его кэш не сбрасывался последние TTL секунд
+_CACHE_IF_VALID_SCRIPT = """
+if redis.call('EXISTS', KEYS[2], KEYS[3]) > 0 then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return 1
+"""
+
+_cache_if_valid_script = None
+
+
+def _get_cache_if_valid_script():
+    global _cache_if_valid_script
+    if _cache_if_valid_script is None:
+        _cache_if_valid_script = get_redis().register_script(_CACHE_IF_VALID_SCRIPT)
+    return _cache_if_valid_script
+
+
+def get_cached_user(user_id: str) -> Optional[User]:
+    """
+    Получить пользователя из кэша Redis без запроса к БД
+    
+    Возвращает объект User, не привязанный к сессии БД,
+    или None, если в кэше нет записи (или Redis недоступен).
+    """
+    if settings.AUTH_USER_CACHE_TTL_SEC <= 0:
+        return None
+    
+    try:
+        cached = get_redis().get(USER_CACHE_KEY.format(user_id=user_id))
+    except RedisError as e:
+        logger.warning(f"Кэш пользователей недоступен: {e}")
+        return None
+    
+    if not cached:
+        return None
+    
+    data = json.loads(cached)
+    return User(
+        id=UUID(data["id"]),
+        username=data["username"],
+        email=data["email"],
+        role=UserRole(data["role"]),
+        is_active=data["is_active"]
+    )
+
+
+def cache_user(user: User):
+    """Сохранить пользователя в кэш на AUTH_USER_CACHE_TTL_SEC секунд"""
+    if settings.AUTH_USER_CACHE_TTL_SEC <= 0:
+        return
+    
+    data = {
+        "id": str(user.id),
+        "username": user.username,
+        "email": user.email,
+        "role": user.role.value,
+        "is_active": user.is_active
+    }
+    try:
+        _get_cache_if_valid_script()(
+            keys=[
+                USER_CACHE_KEY.format(user_id=user.id),
+                USER_INVALIDATED_KEY.format(user_id=user.id),
+                ALL_USERS_INVALIDATED_KEY
+            ],
+            args=[json.dumps(data), settings.AUTH_USER_CACHE_TTL_SEC]
+        )
+    except RedisError as e:
+        logger.warning(f"Не удалось сохранить пользователя в кэш: {e}")
+
+
+def invalidate_user_cache(user_id):
+    """Удалить пользователя из кэша (при деактивации, смене роли и т.д.) и запретить запись на TTL"""
+    try:
+        pipe = get_redis().pipeline()
+        pipe.delete(USER_CACHE_KEY.format(user_id=user_id))
+        pipe.setex(USER_INVALIDATED_KEY.format(user_id=user_id), max(settings.AUTH_USER_CACHE_TTL_SEC, 1), 1)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Не удалось инвалидировать кэш пользователя {user_id}: {e}")
+
+
+def invalidate_all_user_cache():
+    """Сбросить кэш всех пользователей (после массовых UPDATE/DELETE users)"""
+    try:
+        redis_client = get_redis()
+        redis_client.setex(ALL_USERS_INVALIDATED_KEY, max(settings.AUTH_USER_CACHE_TTL_SEC, 1), 1)
+        for key in redis_client.scan_iter(match=USER_CACHE_KEY.format(user_id="*"), count=500):
+            invalidate_user_cache(key.rsplit(":", 1)[-1])
+    except RedisError as e:
+        logger.warning(f"Не удалось сбросить кэш пользователей: {e}")
+
+
+def _defer_invalidation(session: Session, user_id) -> None:
+    session.info.setdefault(_PENDING_KEY, set()).add(user_id)
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_on_update(mapper, connection, target):
+    """
+    Изменение кэшируемых полей (в т.ч. деактивация) сбрасывает кэш после commit
+
+    Остальные поля в кэш не попадают: last_login_at, который пишется при каждом
+    входе, не должен ставить маркер и отключать кэш пользователя на TTL.
+    """
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in CACHED_FIELDS):
+        _defer_invalidation(Session.object_session(target), target.id)
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_on_delete(mapper, connection, target):
+    _defer_invalidation(Session.object_session(target), target.id)
+
+
+@event.listens_for(Session, "after_bulk_update")
+def _invalidate_on_bulk_update(update_context):
+    """query(User).update(...): затронутые строки неизвестны - сбрасываем всех"""
+    if update_context.mapper.class_ is User:
+        _defer_invalidation(update_context.session, _ALL)
+
+
+@event.listens_for(Session, "after_bulk_delete")
+def _invalidate_on_bulk_delete(delete_context):
+    if delete_context.mapper.class_ is User:
+        _defer_invalidation(delete_context.session, _ALL)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    if _ALL in pending:
+        invalidate_all_user_cache()
+        return
+    for user_id in pending:
+        invalidate_user_cache(user_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_after_rollback(session, previous_transaction):
+    """Откаченные изменения не трогают кэш"""
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,82 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+from uuid import UUID
+from fastapi import HTTPException, status
+from sqlalchemy import func, text, tuple_
+from sqlalchemy.orm import Session
+
+
+# Заголовок с курсором следующей страницы для списков, которые отдаются массивом
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, row_id: UUID) -> str:
+    """
+    Закодировать позицию keyset-пагинации (created_at, id) в непрозрачный курсор
+    """
+    raw = json.dumps([created_at.isoformat(), str(row_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, UUID]]:
+    """
+    Разобрать курсор из encode_cursor
+
+    Returns:
+        (created_at, id) или None, если курсор не передан
+
+    Raises:
+        HTTPException 400: курсор повреждён
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), UUID(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор пагинации"
+        )
+
+
+def keyset_after(created_at_column, id_column, cursor: Tuple[datetime, UUID]):
+    """
+    Условие "строго после курсора" для сортировки (created_at DESC, id DESC)
+    """
+    return tuple_(created_at_column, id_column) < tuple_(*cursor)
+
+
+# Выше этого порога отфильтрованный список не досчитывается (X-Total-Estimate = порог)
+ESTIMATE_COUNT_CAP = 10000
+
+# Заголовок с приблизительным общим числом строк
+TOTAL_ESTIMATE_HEADER = "X-Total-Estimate"
+
+
+def estimate_total(db: Session, query, table_name: str, filtered: bool, cap: int = ESTIMATE_COUNT_CAP) -> int:
+    """
+    Дешёвая оценка общего числа строк списка
+
+    Без фильтров берётся статистика планировщика (pg_class.reltuples) - без
+    сканирования таблицы. С фильтрами считается не больше cap строк, поэтому
+    стоимость ограничена и не растёт вместе с таблицей.
+    """
+    if not filtered:
+        reltuples = db.execute(
+            text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:name)"),
+            {"name": table_name}
+        ).scalar()
+        # -1: таблица ещё не анализировалась
+        if reltuples is not None and reltuples >= 0:
+            return int(reltuples)
+    capped = query.order_by(None).limit(cap).subquery()
+    return db.query(func.count()).select_from(capped).scalar()
+
+
+def escape_like(value: str) -> str:
+    """Экранировать спецсимволы LIKE (для шаблона с escape="\\")"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
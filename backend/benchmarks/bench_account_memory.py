@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк памяти при загрузке аккаунтов (листинг и fan-out по группам)
+
+Сравнивает загрузку Account с отложенными колонками (пароль, session_data -
+как сейчас) и с принудительно загруженными (как было до отложенной загрузки).
+
+Использование:
+    python bench_account_memory.py --limit 5000
+    python bench_account_memory.py --group-id <uuid> --group-id <uuid>
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from uuid import UUID
+
+# Добавляем путь к проекту
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(script_dir, '..'))
+
+from sqlalchemy.orm import undefer_group
+from app.core.database import SessionLocal
+from app.models.account import Account, AccountStatus
+
+
+def measure(label: str, build_query) -> None:
+    """Выполнить запрос в новой сессии, вывести время и пик памяти Python"""
+    db = SessionLocal()
+    try:
+        tracemalloc.start()
+        start = time.perf_counter()
+        rows = build_query(db).all()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:<40} строк: {len(rows):>6}  время: {elapsed * 1000:8.1f} мс  пик: {peak / 1024 / 1024:7.2f} МБ")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк памяти загрузки аккаунтов')
+    parser.add_argument('--limit', type=int, default=5000, help='Размер страницы листинга')
+    parser.add_argument('--group-id', action='append', default=[], help='Группа для fan-out (можно несколько)')
+
+    args = parser.parse_args()
+    group_ids = [UUID(value) for value in args.group_id]
+
+    def listing(db):
+        return db.query(Account).order_by(Account.created_at.desc(), Account.id.desc()).limit(args.limit)
+
+    def fanout(db):
+        query = db.query(Account).filter(Account.status == AccountStatus.ACTIVE)
+        if group_ids:
+            query = query.filter(Account.group_id.in_(group_ids))
+        return query
+
+    for name, build in (("листинг", listing), ("fan-out", fanout)):
+        # "До": пароль и session_data читаются в каждом запросе
+        measure(f"{name}, с session_data (до)", lambda db: build(db).options(undefer_group("credentials")))
+        measure(f"{name}, отложенные колонки (после)", build)
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк авторизации: запросов в секунду до и после кэша пользователя
+
+Режимы (оба печатают таблицу "до/после" за один запуск):
+
+1. In-process - зависимость get_current_user напрямую, кэш выключается и
+   включается через settings (нужны БД и Redis из .env):
+       python bench_auth.py --in-process --username admin
+
+2. HTTP - GET /api/auth/me на двух экземплярах API: --baseline-url запущен
+   с AUTH_USER_CACHE_TTL_SEC=0 (до), --url - с кэшем (после):
+       python bench_auth.py --url http://localhost:8009 --baseline-url http://localhost:8010 \\
+           --username admin --password secret
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Добавляем путь к проекту
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(script_dir, '..'))
+
+
+def login(base_url: str, username: str, password: str) -> str:
+    """Получить JWT токен"""
+    import httpx
+
+    response = httpx.post(
+        f"{base_url}/api/auth/login",
+        json={"username": username, "password": password},
+        timeout=10
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def worker(base_url: str, token: str, requests_count: int) -> int:
+    """Выполнить requests_count запросов, вернуть количество ошибок"""
+    import httpx
+
+    errors = 0
+    headers = {"Authorization": f"Bearer {token}"}
+    with httpx.Client(base_url=base_url, headers=headers, timeout=10) as client:
+        for _ in range(requests_count):
+            response = client.get("/api/auth/me")
+            if response.status_code != 200:
+                errors += 1
+    return errors
+
+
+def run_http(base_url: str, token: str, total: int, concurrency: int) -> dict:
+    """Прогон по HTTP: RPS и количество ошибок"""
+    per_worker = total // concurrency
+
+    # Прогрев (первый запрос заполняет кэш)
+    worker(base_url, token, 10)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        errors = sum(executor.map(
+            lambda _: worker(base_url, token, per_worker),
+            range(concurrency)
+        ))
+    elapsed = time.perf_counter() - start
+    return {"requests": per_worker * concurrency, "errors": errors, "elapsed": elapsed}
+
+
+def run_in_process(username: str, total: int, cache_ttl: int) -> dict:
+    """Вызовы get_current_user с заданным AUTH_USER_CACHE_TTL_SEC (0 - кэш выключен)"""
+    from app.api.auth import get_current_user
+    from app.core.config import settings
+    from app.core.database import SessionLocal
+    from app.core.security import create_access_token
+    from app.core.redis import get_redis
+    from app.models.user import User
+    from app.services.user_cache import USER_CACHE_KEY, USER_INVALIDATED_KEY, ALL_USERS_INVALIDATED_KEY
+
+    settings.AUTH_USER_CACHE_TTL_SEC = cache_ttl
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == username).first()
+        if user is None:
+            raise SystemExit(f"Пользователь {username} не найден")
+        token = create_access_token({"sub": str(user.id)})
+        # Пустой кэш и без маркеров сброса от прошлых изменений: прогрев заполнит кэш
+        get_redis().delete(
+            USER_CACHE_KEY.format(user_id=user.id),
+            USER_INVALIDATED_KEY.format(user_id=user.id),
+            ALL_USERS_INVALIDATED_KEY
+        )
+
+        get_current_user(token, db)  # прогрев
+        start = time.perf_counter()
+        for _ in range(total):
+            get_current_user(token, db)
+        elapsed = time.perf_counter() - start
+    finally:
+        db.close()
+    return {"requests": total, "errors": 0, "elapsed": elapsed}
+
+
+def print_report(before: dict, after: dict) -> None:
+    """Таблица до/после"""
+    print(f"{'':<16}{'запросов':>10}{'ошибок':>8}{'время, с':>10}{'RPS':>10}")
+    for label, result in (("до (без кэша)", before), ("после (кэш)", after)):
+        rps = result["requests"] / result["elapsed"]
+        print(f"{label:<16}{result['requests']:>10}{result['errors']:>8}{result['elapsed']:>10.2f}{rps:>10.1f}")
+    speedup = before["elapsed"] / after["elapsed"] * after["requests"] / before["requests"]
+    print(f"Ускорение: x{speedup:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк авторизованного endpoint')
+    parser.add_argument('--url', default='http://localhost:8009', help='API с кэшем (после)')
+    parser.add_argument('--baseline-url', help='API с AUTH_USER_CACHE_TTL_SEC=0 (до)')
+    parser.add_argument('--in-process', action='store_true', help='Замер get_current_user без HTTP')
+    parser.add_argument('--username', required=True, help='Имя пользователя')
+    parser.add_argument('--password', help='Пароль пользователя (HTTP режим)')
+    parser.add_argument('--requests', type=int, default=2000, help='Всего запросов')
+    parser.add_argument('--concurrency', type=int, default=20, help='Параллельных клиентов (HTTP режим)')
+
+    args = parser.parse_args()
+
+    if args.in_process:
+        from app.core.config import settings
+        cache_ttl = settings.AUTH_USER_CACHE_TTL_SEC or 60
+        before = run_in_process(args.username, args.requests, cache_ttl=0)
+        after = run_in_process(args.username, args.requests, cache_ttl=cache_ttl)
+        print_report(before, after)
+        return 0
+
+    if not args.baseline_url or not args.password:
+        parser.error("HTTP режим: нужны --baseline-url и --password (или используйте --in-process)")
+
+    before = run_http(args.baseline_url, login(args.baseline_url, args.username, args.password),
+                      args.requests, args.concurrency)
+    after = run_http(args.url, login(args.url, args.username, args.password),
+                     args.requests, args.concurrency)
+    print_report(before, after)
+
+    return 0 if before["errors"] == 0 and after["errors"] == 0 else 1
+
+
+if __name__ == "__main__":
+    exit(main())
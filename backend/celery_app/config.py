@@ -1,6 +1,27 @@
 from celery import Celery
+from kombu import Queue
 import os
 from app.core.config import settings
+from backend.celery_app.routing import route_task, shard_queue_names
+
+
+def _patch_psycopg_for_gevent():
+    """
+    Сделать psycopg2 кооперативным, если воркер запущен с -P gevent
+    
+    Celery патчит stdlib до импорта приложения, поэтому здесь уже видно,
+    что socket пропатчен. Без этого запросы к БД блокируют все гринлеты воркера.
+    """
+    try:
+        from gevent import monkey
+    except ImportError:
+        return
+    if monkey.is_module_patched("socket"):
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+
+
+_patch_psycopg_for_gevent()
 
 # Используем переменные окружения напрямую, если они есть, иначе из settings
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", settings.CELERY_BROKER_URL)
@@ -10,9 +31,30 @@ celery_app = Celery(
     "instagram_cf",
     broker=CELERY_BROKER_URL,
     backend=CELERY_RESULT_BACKEND,
-    include=["backend.celery_app.tasks.posting"]
+    include=[
+        "backend.celery_app.tasks.posting",
+        "backend.celery_app.tasks.maintenance",
+        "backend.celery_app.tasks.accounts",
+        "backend.celery_app.tasks.media",
+        "backend.celery_app.tasks.scheduler",
+        "backend.celery_app.tasks.proxies",
+    ]
 )
 
+# Очереди:
+#   fanout      - task_batch_post (переводы, создание выполнений) и повтор неудачных, не должна задерживать публикации
+#   post        - task_post_to_instagram и отправка отложенных задач (сетевой I/O, gevent воркер)
+#   media       - подготовка медиа (CPU, prefork воркер)
+#   accounts    - операции с аккаунтами из API (логин, профиль, тестовый пост), проверка прокси
+#   maintenance - служебные задачи (ротация ключей, обслуживание)
+#   post.<i>    - при POST_QUEUE_SHARDS > 0: task_post_to_instagram по account_id (см. routing.py)
+TASK_QUEUES = ("fanout", "post", "media", "accounts", "maintenance")
+
+# Приоритеты (Redis: 0 - наивысший, 9 - наименьший)
+TASK_PRIORITY_HIGH = 0  # срочные посты
+TASK_PRIORITY_NORMAL = 5  # обычные посты
+TASK_PRIORITY_LOW = 9  # повторные попытки после ошибок
+
 # Конфигурация Celery
 celery_app.conf.update(
     task_serializer="json",
@@ -25,5 +67,69 @@ celery_app.conf.update(
     task_soft_time_limit=240,  # мягкий лимит 4 минуты
     worker_prefetch_multiplier=1,  # Брать по одной задаче за раз
     worker_max_tasks_per_child=50,  # Перезапускать воркер после 50 задач
+    task_queues=[Queue(name) for name in TASK_QUEUES] + [Queue(name) for name in shard_queue_names()],
+    task_default_queue="maintenance",
+    task_default_priority=TASK_PRIORITY_NORMAL,
+    # route_task выбирает очередь шарда для post_to_instagram, остальное - по словарю
+    task_routes=(route_task, {
+        "instagram_cf.batch_post": {"queue": "fanout"},
+        "instagram_cf.retry_failed_executions": {"queue": "fanout"},
+        "instagram_cf.post_to_instagram": {"queue": "post"},
+        "instagram_cf.prepare_post_media": {"queue": "media"},
+        "instagram_cf.account_*": {"queue": "accounts"},
+        # Сетевая проверка прокси: воркер с пулом потоков, как у операций с аккаунтами
+        "instagram_cf.check_proxies": {"queue": "accounts"},
+        "instagram_cf.reencrypt_account_passwords": {"queue": "maintenance"},
+        "instagram_cf.reap_executions": {"queue": "maintenance"},
+        "instagram_cf.dispatch_scheduled_posts": {"queue": "maintenance"},
+        "instagram_cf.release_scheduled_post": {"queue": "maintenance"},
+        "instagram_cf.refresh_sessions": {"queue": "maintenance"},
+        "instagram_cf.reconcile_group_counts": {"queue": "maintenance"},
+        "instagram_cf.advance_warmup_stages": {"queue": "maintenance"},
+        "instagram_cf.rebalance_post_queues": {"queue": "maintenance"},
+        # Короткая I/O задача: gevent воркер очереди post всегда может её взять сразу
+        "instagram_cf.dispatch_delayed_tasks": {"queue": "post"},
+    }),
+    # Периодические задачи (процесс celery beat)
+    beat_schedule={
+        "reap-executions": {
+            "task": "instagram_cf.reap_executions",
+            "schedule": float(settings.EXECUTION_REAPER_INTERVAL_SEC),
+        },
+        "dispatch-scheduled-posts": {
+            "task": "instagram_cf.dispatch_scheduled_posts",
+            "schedule": float(settings.SCHEDULER_INTERVAL_SEC),
+        },
+        "refresh-sessions": {
+            "task": "instagram_cf.refresh_sessions",
+            "schedule": float(settings.SESSION_REFRESH_INTERVAL_SEC),
+        },
+        "reconcile-group-counts": {
+            "task": "instagram_cf.reconcile_group_counts",
+            "schedule": float(settings.GROUP_COUNTS_RECONCILE_INTERVAL_SEC),
+        },
+        "advance-warmup-stages": {
+            "task": "instagram_cf.advance_warmup_stages",
+            "schedule": float(settings.WARMUP_ADVANCE_INTERVAL_SEC),
+        },
+        "rebalance-post-queues": {
+            "task": "instagram_cf.rebalance_post_queues",
+            "schedule": float(settings.POST_SHARD_REBALANCE_INTERVAL_SEC),
+            "options": {"expires": float(settings.POST_SHARD_REBALANCE_INTERVAL_SEC)},
+        },
+        "dispatch-delayed-tasks": {
+            "task": "instagram_cf.dispatch_delayed_tasks",
+            "schedule": float(settings.DELAYED_DISPATCH_INTERVAL_SEC),
+            # Просроченный запуск не нужен: следующий заберёт все накопившиеся задачи
+            "options": {"expires": float(settings.DELAYED_DISPATCH_INTERVAL_SEC)},
+        },
+    },
+    # Без priority_steps Redis игнорирует priority: каждая очередь разбивается
+    # на 10 подочередей, воркер забирает задачи начиная с наивысшего приоритета.
+    # queue_order_strategy: воркер с несколькими очередями (-Q a,b) опрашивает их по порядку
+    broker_transport_options={
+        "priority_steps": list(range(10)),
+        "sep": ":",
+        "queue_order_strategy": "priority",
+    },
 )
-
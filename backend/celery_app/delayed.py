@@ -0,0 +1,103 @@
+"""
+Отложенный запуск задач через Redis sorted set вместо countdown/ETA Celery
+
+ETA-задачи Celery забираются воркером заранее и висят в его памяти до срока,
+а на Redis брокере после visibility_timeout доставляются повторно. Здесь задача
+хранится в sorted set (score - время запуска), а диспетчер (celery beat,
+instagram_cf.dispatch_delayed_tasks) отправляет её брокеру только когда срок наступил.
+Память воркеров не зависит от того, насколько далеко вперёд запланирована кампания.
+"""
+import json
+import logging
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+from redis.exceptions import RedisError
+from app.core.config import settings
+from app.core.redis import get_redis
+from backend.celery_app.config import celery_app
+
+logger = logging.getLogger(__name__)
+
+DELAYED_TASKS_KEY = "celery:delayed_tasks"
+
+# Забрать и удалить из множества задачи, срок которых наступил (атомарно, без двойной отправки)
+_POP_DUE_SCRIPT = """
+local items = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+if #items > 0 then
+    redis.call('ZREM', KEYS[1], unpack(items))
+end
+return items
+"""
+
+_pop_due_script = None
+
+
+def _get_pop_due_script():
+    global _pop_due_script
+    if _pop_due_script is None:
+        _pop_due_script = get_redis().register_script(_POP_DUE_SCRIPT)
+    return _pop_due_script
+
+
+def apply_later(task, args: Optional[List[Any]] = None, kwargs: Optional[Dict[str, Any]] = None, countdown: float = 0, **options) -> None:
+    """
+    Запустить задачу через countdown секунд
+
+    Короткие задержки (до DELAYED_DISPATCH_MIN_COUNTDOWN_SEC) отправляются брокеру сразу
+    обычным countdown. Если Redis недоступен - тоже обычный countdown.
+
+    Args:
+        task: Задача Celery
+        args, kwargs: Аргументы задачи
+        countdown: Задержка в секундах
+        options: Опции apply_async (priority, queue, ...)
+    """
+    if countdown <= settings.DELAYED_DISPATCH_MIN_COUNTDOWN_SEC:
+        task.apply_async(args=args, kwargs=kwargs, countdown=countdown or None, **options)
+        return
+
+    payload = json.dumps({
+        "id": uuid.uuid4().hex,
+        "task": task.name,
+        "args": args or [],
+        "kwargs": kwargs or {},
+        "options": options
+    })
+    try:
+        get_redis().zadd(DELAYED_TASKS_KEY, {payload: time.time() + countdown})
+    except RedisError as e:
+        logger.warning(f"Хранилище отложенных задач недоступно, используем countdown: {e}")
+        task.apply_async(args=args, kwargs=kwargs, countdown=countdown, **options)
+
+
+def dispatch_due_tasks(batch_size: Optional[int] = None) -> int:
+    """
+    Отправить брокеру задачи, срок которых наступил
+
+    Returns:
+        int: Количество отправленных задач
+    """
+    batch_size = batch_size or settings.DELAYED_DISPATCH_BATCH
+    dispatched = 0
+
+    while True:
+        items = _get_pop_due_script()(keys=[DELAYED_TASKS_KEY], args=[time.time(), batch_size])
+        for index, item in enumerate(items):
+            entry = json.loads(item)
+            try:
+                celery_app.send_task(entry["task"], args=entry["args"], kwargs=entry["kwargs"], **entry["options"])
+                dispatched += 1
+            except Exception as e:
+                # Возвращаем неотправленные задачи, чтобы не потерять их
+                logger.error(f"Не удалось отправить отложенную задачу {entry['task']}: {e}")
+                get_redis().zadd(DELAYED_TASKS_KEY, {pending: time.time() for pending in items[index:]})
+                return dispatched
+
+        if len(items) < batch_size:
+            return dispatched
+
+
+def pending_delayed_tasks() -> int:
+    """Количество задач, ожидающих срока"""
+    return get_redis().zcard(DELAYED_TASKS_KEY)
@@ -0,0 +1,244 @@
+"""
+Привязка задач публикации к воркерам по аккаунту (consistent hashing)
+
+При POST_QUEUE_SHARDS > 0 задача instagram_cf.post_to_instagram отправляется
+не в общую очередь post, а в одну из очередей post.0 ... post.<N-1>,
+выбранную по account_id на кольце consistent hashing. Повторные задачи
+одного аккаунта попадают в один и тот же процесс воркера.
+
+Членство: воркер, слушающий очереди post.<i>, раз в POST_SHARD_HEARTBEAT_SEC
+отмечает их в Redis (sorted set, score - время). Кольцо строится только из
+живых очередей, поэтому при добавлении или уходе воркера меняется владелец
+лишь ~1/N аккаунтов. Задачи, оставшиеся в очереди ушедшего воркера,
+переносит task_rebalance_post_queues (см. rebalance_orphaned_queues).
+Если живых очередей нет или Redis недоступен - используется общая очередь post.
+"""
+import bisect
+import hashlib
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from celery.signals import worker_ready, worker_shutdown
+from redis.exceptions import RedisError
+from app.core.config import settings
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+POST_TASK_NAME = "instagram_cf.post_to_instagram"
+POST_QUEUE = "post"
+LIVE_SHARDS_KEY = "celery:post_shards:alive"
+
+# Точек на кольце на одну очередь: равномерное распределение аккаунтов
+VIRTUAL_NODES = 64
+
+
+def shard_queue_names() -> List[str]:
+    """Все очереди шардов (пусто, если шардирование выключено)"""
+    return [f"{POST_QUEUE}.{index}" for index in range(settings.POST_QUEUE_SHARDS)]
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """Кольцо consistent hashing с виртуальными узлами"""
+
+    def __init__(self, nodes: List[str], virtual_nodes: int = VIRTUAL_NODES):
+        points = sorted(
+            (_hash(f"{node}#{replica}"), node)
+            for node in nodes
+            for replica in range(virtual_nodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def get(self, key: str) -> Optional[str]:
+        """Узел, владеющий ключом (первая точка по часовой стрелке)"""
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._nodes[index]
+
+
+_ring_lock = threading.Lock()
+_ring_cache: Tuple[float, Tuple[str, ...], Optional[HashRing]] = (0.0, (), None)
+
+
+def live_shard_queues() -> List[str]:
+    """Очереди шардов, у которых есть живой воркер (по heartbeat в Redis)"""
+    all_queues = set(shard_queue_names())
+    if not all_queues:
+        return []
+    min_score = time.time() - settings.POST_SHARD_TTL_SEC
+    alive = get_redis().zrangebyscore(LIVE_SHARDS_KEY, min_score, "+inf")
+    return sorted(queue for queue in alive if queue in all_queues)
+
+
+def _current_ring() -> Optional[HashRing]:
+    """Кольцо по живым очередям, кэшируется в процессе на POST_SHARD_MEMBERSHIP_CACHE_SEC"""
+    global _ring_cache
+    now = time.monotonic()
+    cached_at, _, ring = _ring_cache
+    if now - cached_at < settings.POST_SHARD_MEMBERSHIP_CACHE_SEC:
+        return ring
+
+    with _ring_lock:
+        cached_at, cached_nodes, ring = _ring_cache
+        if now - cached_at < settings.POST_SHARD_MEMBERSHIP_CACHE_SEC:
+            return ring
+        try:
+            nodes = tuple(live_shard_queues())
+        except RedisError as e:
+            logger.warning(f"Не удалось получить живые очереди публикации: {e}")
+            nodes = ()
+        if nodes != cached_nodes:
+            logger.info(f"Кольцо очередей публикации: {list(nodes) or [POST_QUEUE]}")
+            ring = HashRing(list(nodes)) if nodes else None
+        _ring_cache = (now, nodes, ring)
+        return ring
+
+
+def queue_for_account(account_id: str) -> str:
+    """Очередь публикации для аккаунта"""
+    ring = _current_ring() if settings.POST_QUEUE_SHARDS > 0 else None
+    if ring is None:
+        return POST_QUEUE
+    return ring.get(str(account_id))
+
+
+def task_account_id(args, kwargs) -> Optional[str]:
+    """account_id задачи публикации: kwargs или второй позиционный аргумент"""
+    account_id = (kwargs or {}).get("account_id")
+    if account_id is None and args and len(args) > 1:
+        account_id = args[1]
+    return account_id
+
+
+def route_task(name, args, kwargs, options, task=None, **kw) -> Optional[Dict[str, str]]:
+    """
+    Роутер Celery (task_routes): post_to_instagram - в очередь по account_id
+
+    Остальные задачи маршрутизируются словарём task_routes. Явно переданный
+    queue в apply_async имеет приоритет над роутером.
+    """
+    if name != POST_TASK_NAME or settings.POST_QUEUE_SHARDS <= 0:
+        return None
+    account_id = task_account_id(args, kwargs)
+    if account_id is None:
+        return None
+    return {"queue": queue_for_account(account_id)}
+
+
+def register_live_queues(queues: List[str]) -> None:
+    """Отметить очереди шардов воркера живыми (heartbeat)"""
+    if queues:
+        get_redis().zadd(LIVE_SHARDS_KEY, {queue: time.time() for queue in queues})
+
+
+def unregister_live_queues(queues: List[str]) -> None:
+    """Убрать очереди воркера из кольца при штатной остановке"""
+    if queues:
+        get_redis().zrem(LIVE_SHARDS_KEY, *queues)
+
+
+def start_shard_heartbeat(queues: List[str]) -> threading.Event:
+    """
+    Запустить фоновый heartbeat очередей шардов воркера
+
+    Returns:
+        threading.Event: установить, чтобы остановить heartbeat
+    """
+    stop = threading.Event()
+
+    def beat():
+        while not stop.is_set():
+            try:
+                register_live_queues(queues)
+            except RedisError as e:
+                logger.warning(f"Heartbeat очередей публикации не отправлен: {e}")
+            stop.wait(settings.POST_SHARD_HEARTBEAT_SEC)
+
+    threading.Thread(target=beat, name="post-shard-heartbeat", daemon=True).start()
+    return stop
+
+
+def rebalance_orphaned_queues(celery_app, limit: int) -> Dict[str, int]:
+    """
+    Перенести задачи из очередей шардов без живого воркера к текущим владельцам
+
+    Сообщения забираются из брокера и публикуются заново без изменений
+    (тот же id задачи и заголовки), меняется только очередь.
+
+    Returns:
+        dict: {очередь-источник: перенесено задач}
+    """
+    from kombu import Queue
+
+    live = live_shard_queues()
+    orphaned = [queue for queue in shard_queue_names() if queue not in live]
+    moved = {}
+    if not orphaned:
+        return moved
+    # Кольцо строится заново, а не из кэша процесса: в нём не должно быть очередей-источников
+    ring = HashRing(live) if live else None
+
+    with celery_app.connection_for_write() as connection:
+        channel = connection.default_channel
+        producer = connection.Producer(channel)
+        for queue_name in orphaned:
+            queue = Queue(queue_name).bind(channel)
+            count = 0
+            while count < limit:
+                message = queue.get(no_ack=False)
+                if message is None:
+                    break
+                account_id = None
+                if message.headers.get("task") == POST_TASK_NAME:
+                    args, kwargs = message.decode()[:2]
+                    account_id = task_account_id(args, kwargs)
+                target = ring.get(str(account_id)) if ring and account_id is not None else POST_QUEUE
+                producer.publish(
+                    message.body,
+                    routing_key=target,
+                    headers=message.headers,
+                    content_type=message.content_type,
+                    content_encoding=message.content_encoding,
+                    priority=message.properties.get("priority"),
+                    correlation_id=message.properties.get("correlation_id"),
+                    reply_to=message.properties.get("reply_to"),
+                )
+                message.ack()
+                count += 1
+            if count:
+                moved[queue_name] = count
+    return moved
+
+
+_heartbeat_stop: Optional[threading.Event] = None
+_worker_shard_queues: List[str] = []
+
+
+@worker_ready.connect
+def _on_worker_ready(sender=None, **kwargs):
+    """Воркер с очередями post.<i> (-Q post.0,post.1) входит в кольцо"""
+    global _heartbeat_stop, _worker_shard_queues
+    consumed = set(sender.app.amqp.queues.consume_from or {})
+    _worker_shard_queues = [queue for queue in shard_queue_names() if queue in consumed]
+    if _worker_shard_queues:
+        logger.info(f"Воркер обслуживает очереди публикации: {_worker_shard_queues}")
+        _heartbeat_stop = start_shard_heartbeat(_worker_shard_queues)
+
+
+@worker_shutdown.connect
+def _on_worker_shutdown(sender=None, **kwargs):
+    """Штатная остановка: очереди сразу выходят из кольца, не дожидаясь TTL"""
+    if _heartbeat_stop is None:
+        return
+    _heartbeat_stop.set()
+    try:
+        unregister_live_queues(_worker_shard_queues)
+    except RedisError as e:
+        logger.warning(f"Не удалось убрать очереди публикации из кольца: {e}")
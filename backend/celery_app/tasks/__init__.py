@@ -1,10 +1,55 @@
 from backend.celery_app.tasks.posting import (
     task_post_to_instagram,
     task_batch_post,
+    task_retry_failed_executions,
+)
+from backend.celery_app.tasks.accounts import (
+    task_login_account,
+    task_submit_2fa_code,
+    task_check_account_status,
+    task_get_account_profile,
+    task_update_account_profile,
+    task_set_profile_privacy,
+    task_test_post,
+    task_keep_alive_session,
+)
+from backend.celery_app.tasks.media import (
+    task_prepare_post_media,
+)
+from backend.celery_app.tasks.maintenance import (
+    task_reencrypt_account_passwords,
+    task_reap_executions,
+    task_refresh_sessions,
+    task_reconcile_group_counts,
+    task_rebalance_post_queues,
+)
+from backend.celery_app.tasks.scheduler import (
+    task_dispatch_scheduled_posts,
+    task_dispatch_delayed_tasks,
+)
+from backend.celery_app.tasks.proxies import (
+    task_check_proxies,
 )
 
 __all__ = [
     "task_post_to_instagram",
     "task_batch_post",
+    "task_retry_failed_executions",
+    "task_login_account",
+    "task_submit_2fa_code",
+    "task_check_account_status",
+    "task_get_account_profile",
+    "task_update_account_profile",
+    "task_set_profile_privacy",
+    "task_test_post",
+    "task_keep_alive_session",
+    "task_prepare_post_media",
+    "task_reencrypt_account_passwords",
+    "task_reap_executions",
+    "task_refresh_sessions",
+    "task_reconcile_group_counts",
+    "task_rebalance_post_queues",
+    "task_dispatch_scheduled_posts",
+    "task_dispatch_delayed_tasks",
+    "task_check_proxies",
 ]
-
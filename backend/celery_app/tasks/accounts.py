@@ -0,0 +1,60 @@
+"""
+Фоновые операции с аккаунтами Instagram (логин, 2FA, профиль, тестовый пост)
+
+Выполняются на отдельных воркерах очереди "accounts", чтобы сетевые запросы
+через прокси не занимали потоки и соединения с БД у API.
+Результат задачи совпадает с ответом соответствующего синхронного endpoint
+и доступен через GET /api/jobs/{job_id}.
+"""
+from typing import Dict, Any, Optional
+from uuid import UUID
+from backend.celery_app.config import celery_app
+from app.services import account_operations
+
+
+@celery_app.task(name="instagram_cf.account_login")
+def task_login_account(account_id: str, verification_code: Optional[str] = None) -> Dict[str, Any]:
+    """Авторизация аккаунта в Instagram"""
+    return account_operations.login_account(UUID(account_id), verification_code)
+
+
+@celery_app.task(name="instagram_cf.account_submit_2fa")
+def task_submit_2fa_code(account_id: str, code: str) -> Dict[str, Any]:
+    """Отправка 2FA кода"""
+    return account_operations.submit_2fa_code(UUID(account_id), code)
+
+
+@celery_app.task(name="instagram_cf.account_check_status")
+def task_check_account_status(account_id: str) -> Dict[str, Any]:
+    """Проверка статуса аккаунта в Instagram"""
+    return account_operations.check_account_status(UUID(account_id))
+
+
+@celery_app.task(name="instagram_cf.account_get_profile")
+def task_get_account_profile(account_id: str) -> Dict[str, Any]:
+    """Получение профиля аккаунта"""
+    return account_operations.get_account_profile(UUID(account_id))
+
+
+@celery_app.task(name="instagram_cf.account_update_profile")
+def task_update_account_profile(account_id: str, profile_update: Dict[str, Any]) -> Dict[str, Any]:
+    """Обновление профиля аккаунта"""
+    return account_operations.update_account_profile(UUID(account_id), profile_update)
+
+
+@celery_app.task(name="instagram_cf.account_set_privacy")
+def task_set_profile_privacy(account_id: str, is_private: bool) -> Dict[str, Any]:
+    """Изменение приватности профиля"""
+    return account_operations.set_profile_privacy(UUID(account_id), is_private)
+
+
+@celery_app.task(name="instagram_cf.account_test_post")
+def task_test_post(post_id: str, account_id: str) -> Dict[str, Any]:
+    """Тестовая публикация поста на один аккаунт"""
+    return account_operations.test_post(UUID(post_id), UUID(account_id))
+
+
+@celery_app.task(name="instagram_cf.account_keep_alive")
+def task_keep_alive_session(account_id: str) -> Dict[str, Any]:
+    """Keep-alive сессии или проактивный перелогин"""
+    return account_operations.keep_alive_session(UUID(account_id))
@@ -0,0 +1,394 @@
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Any, List
+from uuid import UUID
+from sqlalchemy import update, select, func
+from sqlalchemy.orm import Session
+from backend.celery_app.config import celery_app, TASK_PRIORITY_LOW
+from backend.celery_app.delayed import apply_later
+from backend.celery_app.tasks.posting import DatabaseTask, task_post_to_instagram
+from backend.celery_app.tasks.accounts import task_keep_alive_session
+from app.core.security import is_encrypted_with_current_key, rotate_encrypted_data
+from app.models.account import Account
+from app.models.post import Post, PostExecution, PostStatus, PostExecutionStatus
+from app.core.config import settings
+from app.services.execution_lease import MAX_EXECUTION_ATTEMPTS, expired_lease_condition
+from app.services.session_keeper import select_sessions_to_refresh, mark_refresh_scheduled
+from app.services.group_counters import reconcile_group_counts
+from app.services.post_scheduler import has_no_executions
+from app.services.capacity_planner import advance_warmup_stages
+from backend.celery_app.routing import rebalance_orphaned_queues
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(
+    bind=True,
+    base=DatabaseTask,
+    name="instagram_cf.reencrypt_account_passwords",
+    max_retries=0
+)
+def task_reencrypt_account_passwords(self, batch_size: int = 500) -> Dict[str, Any]:
+    """
+    Перешифровать пароли аккаунтов текущим ENCRYPTION_KEY
+
+    Запускается после ротации ключа (новый ключ в ENCRYPTION_KEY, старый - в ENCRYPTION_KEYS_OLD):
+        celery -A backend.celery_app.config.celery_app call instagram_cf.reencrypt_account_passwords
+
+    Аккаунты обходятся пачками по id, читаются только id и password,
+    каждая пачка сохраняется отдельной транзакцией.
+
+    Args:
+        batch_size: Размер пачки
+
+    Returns:
+        dict: Количество проверенных и перешифрованных паролей
+    """
+    db = self.db
+
+    checked = 0
+    rotated = 0
+    failed = 0
+    last_id = None
+
+    while True:
+        query = db.query(Account.id, Account.password).order_by(Account.id)
+        if last_id is not None:
+            query = query.filter(Account.id > last_id)
+        rows = query.limit(batch_size).all()
+        if not rows:
+            break
+
+        updates = []
+        for account_id, encrypted_password in rows:
+            checked += 1
+            if is_encrypted_with_current_key(encrypted_password):
+                continue
+            try:
+                updates.append({"id": account_id, "password": rotate_encrypted_data(encrypted_password)})
+            except Exception as e:
+                failed += 1
+                logger.error(f"Не удалось перешифровать пароль аккаунта {account_id}: {e}")
+
+        if updates:
+            db.execute(update(Account), updates)
+            db.commit()
+            rotated += len(updates)
+
+        last_id = rows[-1][0]
+
+    logger.info(f"Ротация ключа шифрования: проверено {checked}, перешифровано {rotated}, ошибок {failed}")
+
+    return {
+        "success": failed == 0,
+        "checked": checked,
+        "rotated": rotated,
+        "failed": failed
+    }
+
+
+def _reap_expired_leases(db: Session, batch_size: int) -> Dict[str, int]:
+    """
+    Вернуть в очередь или провалить выполнения с истёкшей арендой (одна пачка)
+
+    Каждое зависание считается попыткой. Пока попытки не исчерпаны, выполнение
+    снова ставится в очередь: фаза захвата увидит upload_started_at и перед
+    повторной загрузкой проверит, не вышел ли пост.
+    """
+    now = datetime.utcnow()
+
+    # Пачка выбирается один раз и остаётся заблокированной до commit: оба UPDATE
+    # работают с одними строками. SKIP LOCKED: параллельный запуск reaper'а их пропустит
+    expired_ids = db.execute(
+        select(PostExecution.id)
+        .where(expired_lease_condition(now))
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    if not expired_ids:
+        db.commit()
+        return {"failed": 0, "requeued": 0}
+
+    failed = db.execute(
+        update(PostExecution)
+        .where(
+            PostExecution.id.in_(expired_ids),
+            PostExecution.retry_count + 1 >= MAX_EXECUTION_ATTEMPTS
+        )
+        .values(
+            status=PostExecutionStatus.FAILED,
+            error_message="Воркер не завершил публикацию (истекла аренда)",
+            failed_at=now,
+            retry_count=PostExecution.retry_count + 1,
+            claim_token=None,
+            lease_expires_at=None
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    requeued = db.execute(
+        update(PostExecution)
+        .where(
+            PostExecution.id.in_(expired_ids),
+            PostExecution.retry_count + 1 < MAX_EXECUTION_ATTEMPTS
+        )
+        .values(
+            status=PostExecutionStatus.QUEUED,
+            retry_count=PostExecution.retry_count + 1,
+            claim_token=None,
+            lease_expires_at=None,
+            queued_at=now,
+            scheduled_for=now
+        )
+        .returning(PostExecution.id, PostExecution.post_id, PostExecution.account_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+
+    for execution_id, post_id, account_id in requeued:
+        task_post_to_instagram.apply_async(
+            args=[str(post_id), str(account_id), str(execution_id)],
+            priority=TASK_PRIORITY_LOW
+        )
+
+    return {"failed": failed, "requeued": len(requeued)}
+
+
+def _rollup_post_statuses(db: Session, post_ids: List[UUID]) -> int:
+    """
+    Свести итоги выполнений в Post.status и posted_at (один агрегирующий запрос на пачку)
+
+    Пост завершён, когда не осталось выполнений в очереди, в процессе или
+    с запланированным повтором: COMPLETED при хотя бы одной успешной публикации,
+    иначе FAILED.
+
+    Returns:
+        int: Количество постов, получивших итоговый статус
+    """
+    in_progress = (
+        PostExecution.status.in_([PostExecutionStatus.QUEUED, PostExecutionStatus.POSTING]) |
+        ((PostExecution.status == PostExecutionStatus.FAILED) & (PostExecution.retry_count < MAX_EXECUTION_ATTEMPTS))
+    )
+
+    rows = db.execute(
+        select(
+            PostExecution.post_id,
+            func.count().label("total"),
+            func.count().filter(PostExecution.status == PostExecutionStatus.SUCCESS).label("success"),
+            func.count().filter(in_progress).label("in_progress"),
+            func.max(PostExecution.posted_at).label("posted_at")
+        )
+        .where(PostExecution.post_id.in_(post_ids))
+        .group_by(PostExecution.post_id)
+    ).all()
+
+    updates = []
+    for row in rows:
+        if row.in_progress:
+            continue
+        updates.append({
+            "id": row.post_id,
+            "status": PostStatus.COMPLETED if row.success else PostStatus.FAILED,
+            "posted_at": row.posted_at
+        })
+
+    if updates:
+        db.execute(update(Post), updates)
+        db.commit()
+
+    return len(updates)
+
+
+def _fail_undispatched_posts(db: Session) -> int:
+    """
+    Провалить посты, застрявшие в POSTING без выполнений дольше POST_DISPATCH_TIMEOUT_SEC
+
+    Рассылка такого поста потеряна (задача не дошла до воркера или упала до создания
+    выполнений), а итоги по выполнениям (_rollup_post_statuses) его не касаются.
+
+    Returns:
+        int: Количество проваленных постов
+    """
+    started_before = datetime.utcnow() - timedelta(seconds=settings.POST_DISPATCH_TIMEOUT_SEC)
+    failed = db.execute(
+        update(Post)
+        .where(
+            Post.status == PostStatus.POSTING,
+            func.coalesce(Post.posting_started_at, Post.created_at) < started_before,
+            has_no_executions()
+        )
+        .values(status=PostStatus.FAILED)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return failed
+
+
+@celery_app.task(
+    bind=True,
+    base=DatabaseTask,
+    name="instagram_cf.reap_executions",
+    max_retries=0
+)
+def task_reap_executions(self, batch_size: int = 500) -> Dict[str, Any]:
+    """
+    Периодическое обслуживание публикаций (Celery beat)
+
+    1. Выполнения в POSTING с истёкшей арендой возвращаются в очередь или помечаются FAILED
+    2. Посты в статусе POSTING получают итоговый статус (COMPLETED/FAILED) и posted_at
+    3. Посты в POSTING без выполнений после POST_DISPATCH_TIMEOUT_SEC помечаются FAILED
+
+    Args:
+        batch_size: Размер пачки выполнений и постов
+
+    Returns:
+        dict: Количество обработанных выполнений и завершённых постов
+    """
+    db = self.db
+
+    reaped = {"failed": 0, "requeued": 0}
+    while True:
+        batch = _reap_expired_leases(db, batch_size)
+        reaped["failed"] += batch["failed"]
+        reaped["requeued"] += batch["requeued"]
+        if batch["failed"] + batch["requeued"] < batch_size:
+            break
+
+    completed = 0
+    last_id = None
+    while True:
+        query = db.query(Post.id).filter(Post.status == PostStatus.POSTING).order_by(Post.id)
+        if last_id is not None:
+            query = query.filter(Post.id > last_id)
+        post_ids = [row[0] for row in query.limit(batch_size).all()]
+        if not post_ids:
+            break
+
+        completed += _rollup_post_statuses(db, post_ids)
+        last_id = post_ids[-1]
+
+    undispatched = _fail_undispatched_posts(db)
+
+    if reaped["failed"] or reaped["requeued"] or completed or undispatched:
+        logger.info(
+            f"Обслуживание публикаций: возвращено в очередь {reaped['requeued']}, "
+            f"провалено {reaped['failed']}, завершено постов {completed}, "
+            f"постов без рассылки {undispatched}"
+        )
+
+    return {
+        "success": True,
+        "requeued": reaped["requeued"],
+        "failed": reaped["failed"],
+        "posts_completed": completed,
+        "posts_undispatched": undispatched
+    }
+
+
+@celery_app.task(
+    bind=True,
+    base=DatabaseTask,
+    name="instagram_cf.refresh_sessions",
+    max_retries=0
+)
+def task_refresh_sessions(self) -> Dict[str, Any]:
+    """
+    Планирование keep-alive и перелогина сессий (Celery beat)
+
+    Задачи для аккаунтов равномерно распределяются по интервалу планировщика,
+    чтобы не делать всплеск запросов к Instagram через одни и те же прокси.
+    Выбранные аккаунты отмечаются сразу: следующий проход не поставит им
+    вторую задачу, пока первая ждёт своего времени.
+
+    Returns:
+        dict: Количество запланированных проверок
+    """
+    account_ids = select_sessions_to_refresh(self.db)
+    spread = settings.SESSION_REFRESH_INTERVAL_SEC
+    mark_refresh_scheduled(self.db, account_ids, spread)
+
+    for account_id in account_ids:
+        apply_later(
+            task_keep_alive_session,
+            args=[str(account_id)],
+            countdown=random.randint(0, spread)
+        )
+
+    if account_ids:
+        logger.info(f"Запланирован keep-alive сессий для {len(account_ids)} аккаунтов")
+
+    return {"success": True, "scheduled": len(account_ids)}
+
+
+@celery_app.task(
+    bind=True,
+    base=DatabaseTask,
+    name="instagram_cf.reconcile_group_counts",
+    max_retries=0
+)
+def task_reconcile_group_counts(self) -> Dict[str, Any]:
+    """
+    Сверка Group.accounts_count с фактическим числом аккаунтов (Celery beat)
+
+    Счётчики поддерживаются инкрементально, сверка исправляет дрейф одним UPDATE.
+
+    Returns:
+        dict: Количество исправленных групп
+    """
+    db = self.db
+    fixed = reconcile_group_counts(db)
+    db.commit()
+
+    if fixed:
+        logger.warning(f"Исправлен счётчик аккаунтов у {fixed} групп")
+
+    return {"success": True, "fixed": fixed}
+
+
+@celery_app.task(
+    bind=True,
+    base=DatabaseTask,
+    name="instagram_cf.advance_warmup_stages",
+    max_retries=0
+)
+def task_advance_warmup_stages(self) -> Dict[str, Any]:
+    """
+    Повышение Account.warmup_stage по числу дней с публикациями (Celery beat)
+
+    Returns:
+        dict: Количество аккаунтов с повышенной стадией
+    """
+    db = self.db
+    advanced = advance_warmup_stages(db)
+    db.commit()
+
+    if advanced:
+        logger.info(f"Повышена стадия прогрева у {advanced} аккаунтов")
+
+    return {"success": True, "advanced": advanced}
+
+
+@celery_app.task(
+    bind=True,
+    name="instagram_cf.rebalance_post_queues",
+    max_retries=0
+)
+def task_rebalance_post_queues(self) -> Dict[str, Any]:
+    """
+    Перенос задач публикации из очередей шардов без живого воркера (Celery beat)
+
+    Воркер ушёл - его очередь выпала из кольца, новые задачи туда не идут,
+    а оставшиеся переносятся к новым владельцам аккаунтов.
+
+    Returns:
+        dict: Сколько задач перенесено из каждой очереди
+    """
+    if settings.POST_QUEUE_SHARDS <= 0:
+        return {"success": True, "moved": {}}
+
+    moved = rebalance_orphaned_queues(celery_app, settings.POST_SHARD_REBALANCE_BATCH)
+    if moved:
+        logger.warning(f"Перенесены задачи публикации из очередей без воркера: {moved}")
+
+    return {"success": True, "moved": moved}
@@ -0,0 +1,61 @@
+"""
+Подготовка медиа к публикации (CPU-операции)
+
+Выполняется на prefork воркерах очереди "media", чтобы обработка изображений
+не блокировала gevent воркеры очереди "post", которые заняты сетевым I/O.
+"""
+import logging
+from typing import Dict, Any
+from uuid import UUID
+from backend.celery_app.config import celery_app
+from app.core.database import session_scope
+from app.models.post import Post, MediaType
+from app.services.media import prepare_photo
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(
+    name="instagram_cf.prepare_post_media",
+    max_retries=1
+)
+def task_prepare_post_media(post_id: str) -> Dict[str, Any]:
+    """
+    Подготовить медиа поста один раз перед рассылкой по аккаунтам
+    
+    Пути к подготовленным файлам сохраняются в Post.media_paths,
+    поэтому задачи публикации загружают готовые файлы без обработки.
+    
+    Args:
+        post_id: UUID поста
+        
+    Returns:
+        dict: Результат подготовки
+    """
+    with session_scope() as db:
+        post = db.query(Post).filter(Post.id == UUID(post_id)).first()
+        if not post:
+            return {"success": False, "error": "Пост не найден"}
+        
+        if post.media_type != MediaType.PHOTO:
+            return {"success": True, "prepared": 0}
+        
+        media_paths = list(post.media_paths or [])
+    
+    prepared_paths = []
+    for media_path in media_paths:
+        try:
+            prepared_paths.append(prepare_photo(media_path))
+        except Exception as e:
+            logger.error(f"Не удалось подготовить медиа {media_path} поста {post_id}: {e}", exc_info=True)
+            prepared_paths.append(media_path)
+    
+    if prepared_paths != media_paths:
+        with session_scope() as db:
+            post = db.query(Post).filter(Post.id == UUID(post_id)).first()
+            if post:
+                post.media_paths = prepared_paths
+                db.commit()
+    
+    logger.info(f"Медиа поста {post_id} подготовлены: {len(prepared_paths)} файл(ов)")
+    return {"success": True, "prepared": len(prepared_paths)}
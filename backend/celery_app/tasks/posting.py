@@ -1,18 +1,40 @@
 import logging
+import math
 import random
 import os
 from datetime import datetime, timedelta
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from uuid import UUID
 from celery import Task
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
-from backend.celery_app.config import celery_app
+from backend.celery_app.config import celery_app, TASK_PRIORITY_NORMAL, TASK_PRIORITY_LOW
+from backend.celery_app.delayed import apply_later
 from app.core.config import settings
-from app.core.database import SessionLocal
-from app.models.post import Post, PostExecution, PostStatus, PostExecutionStatus
+from app.core.database import SessionLocal, session_scope
+from app.models.post import Post, PostExecution, PostStatus, PostExecutionStatus, MediaType
 from app.models.account import Account, AccountStatus
-from app.services.instagram import InstagramService
+from app.services.instagram import InstagramService, instagram_account_options
 from app.services.translator import translator_service
+from app.services.quota import record_post
+from app.services.capacity_planner import daily_limit, plan_post_slots
+from app.services.campaign_targeting import parse_group_ids, load_target_accounts
+from app.services.proxy_limiter import acquire_proxy_slot, release_proxy_slot, proxy_parallelism
+from app.services.circuit_breaker import (
+    KIND_ACCOUNT, KIND_PROXY, check_circuit, record_failure, record_success, release_probe
+)
+from app.services.execution_lease import (
+    MAX_EXECUTION_ATTEMPTS,
+    LeaseHeartbeat,
+    claim_execution,
+    exhausted_failed_condition,
+    is_stale_queued,
+    mark_scheduled,
+    release_execution,
+    retryable_condition,
+    stale_queued_condition,
+)
 from app.utils.logging import log_activity, update_account_status
 from app.models.activity_log import LogStatus
 
@@ -20,7 +42,12 @@ logger = logging.getLogger(__name__)
 
 
 class DatabaseTask(Task):
-    """Базовый класс для задач с доступом к БД"""
+    """
+    Базовый класс для задач с доступом к БД
+    
+    Сессия хранится в экземпляре задачи (один на процесс), поэтому подходит только
+    для prefork воркеров. Задачи gevent воркера (очередь post) используют session_scope().
+    """
     
     _db: Session = None
     
@@ -37,39 +64,38 @@ class DatabaseTask(Task):
             self._db = None
 
 
-@celery_app.task(
-    bind=True,
-    base=DatabaseTask,
-    name="instagram_cf.post_to_instagram",
-    max_retries=3,
-    default_retry_delay=300  # 5 минут между попытками
-)
-def task_post_to_instagram(
-    self,
-    post_id: str,
-    account_id: str,
-    execution_id: str
-) -> Dict[str, Any]:
+def _fail_execution(db: Session, execution: PostExecution, error_message: str) -> Dict[str, Any]:
+    """Пометить выполнение как окончательно FAILED (без автоповторов), снять захват и сохранить"""
+    execution.status = PostExecutionStatus.FAILED
+    execution.error_message = error_message
+    execution.failed_at = datetime.utcnow()
+    execution.retry_count = max(execution.retry_count or 0, MAX_EXECUTION_ATTEMPTS)
+    execution.claim_token = None
+    execution.lease_expires_at = None
+    db.commit()
+    return {"success": False, "error": error_message}
+
+
+def _claim_execution(post_id: UUID, account_id: UUID, execution_id: UUID) -> Dict[str, Any]:
     """
-    Задача для публикации поста на один аккаунт Instagram
+    Фаза 1: проверки и захват выполнения (короткая транзакция)
+    
+    Выполнение переводится в POSTING атомарно (compare-and-set), поэтому
+    повторная доставка задачи или дубликат в очереди не загрузят пост второй раз.
     
-    Args:
-        post_id: UUID поста
-        account_id: UUID аккаунта
-        execution_id: UUID записи PostExecution
-        
     Returns:
-        dict: Результат публикации
+        dict: {"success": True, "account": Account (отвязан от сессии), "media_type", "media_path",
+               "caption", "claim_token", "recovered"}
+              {"success": False, "error": str} - публикация невозможна
+              {"success": False, "skipped": True, "error": str} - уже опубликовано или захвачено другим воркером
+              {"success": False, "deferred": True, "retry_after": int} - открыт circuit breaker
+              {"success": False, "wait_seconds": int} - нужно повторить позже
     """
-    db = self.db
-    
-    logger.info(f"Начало выполнения задачи публикации: post_id={post_id}, account_id={account_id}, execution_id={execution_id}")
-    
-    try:
-        # Получаем данные из БД
-        post = db.query(Post).filter(Post.id == UUID(post_id)).first()
-        account = db.query(Account).filter(Account.id == UUID(account_id)).first()
-        execution = db.query(PostExecution).filter(PostExecution.id == UUID(execution_id)).first()
+    # expire_on_commit=False: аккаунт нужен InstagramService после закрытия сессии
+    with session_scope(expire_on_commit=False) as db:
+        post = db.query(Post).filter(Post.id == post_id).first()
+        account = db.query(Account).options(*instagram_account_options()).filter(Account.id == account_id).first()
+        execution = db.query(PostExecution).filter(PostExecution.id == execution_id).first()
         
         logger.info(f"Данные получены: post={post is not None}, account={account.username if account else None}, execution={execution is not None}")
         
@@ -77,74 +103,175 @@ def task_post_to_instagram(
             logger.error(f"Не найдены необходимые данные: post={post_id}, account={account_id}, execution={execution_id}")
             return {"success": False, "error": "Данные не найдены"}
         
-        # Проверяем статус аккаунта
-        if account.status != AccountStatus.ACTIVE:
-            execution.status = PostExecutionStatus.FAILED
-            execution.error_message = f"Аккаунт не активен (статус: {account.status})"
-            db.commit()
-            return {"success": False, "error": execution.error_message}
+        if execution.instagram_media_id or execution.status == PostExecutionStatus.SUCCESS:
+            logger.info(f"Пост уже опубликован для {account.username} (execution={execution_id}), пропускаем")
+            return {"success": False, "skipped": True, "error": "Пост уже опубликован на этом аккаунте"}
         
-        # Проверяем лимиты
-        if account.posts_count_today >= account.posts_limit_per_day:
-            execution.status = PostExecutionStatus.FAILED
-            execution.error_message = "Достигнут дневной лимит постов"
-            db.commit()
-            return {"success": False, "error": execution.error_message}
-        
-        # Проверяем минимальную задержку между постами (используем настройки из конфига)
-        min_delay_minutes = settings.MIN_DELAY_BETWEEN_POSTS_SEC / 60  # Конвертируем секунды в минуты
-        if account.last_post_at:
-            time_since_last_post = datetime.utcnow() - account.last_post_at
-            if time_since_last_post < timedelta(minutes=min_delay_minutes):
-                wait_seconds = (timedelta(minutes=min_delay_minutes) - time_since_last_post).total_seconds()
-                logger.info(f"Ожидание {wait_seconds:.0f} секунд перед публикацией для {account.username} (прошло {time_since_last_post.total_seconds():.0f} сек с последнего поста)")
-                raise self.retry(countdown=int(wait_seconds))
-        
-        # Обновляем статус выполнения
-        execution.status = PostExecutionStatus.POSTING
-        db.commit()
+        # Пробы half_open этой задачи возвращаются, если до Instagram дело не дойдёт
+        # (отложена, пропущена или провалена до загрузки), иначе breaker ждал бы их TTL
+        probes = []
+        try:
+            # Открытый circuit breaker аккаунта или прокси: откладываем, не трогая Instagram.
+            # Аккаунт проверяется первым: его открытый breaker не должен занимать пробу half_open прокси
+            for kind, entity_id in ((KIND_ACCOUNT, account.id), (KIND_PROXY, account.proxy_id)):
+                if entity_id is None:
+                    continue
+                circuit = check_circuit(kind, entity_id)
+                if not circuit["allowed"]:
+                    logger.info(f"Circuit breaker {kind} открыт для {account.username}, публикация отложена на {circuit['retry_after']} сек")
+                    return {
+                        "success": False,
+                        "deferred": True,
+                        "retry_after": circuit["retry_after"],
+                        "error": f"Circuit breaker {kind}: {circuit['state']}"
+                    }
+                if circuit.get("probe"):
+                    probes.append((kind, entity_id, circuit["probe"]))
         
-        # Создаём сервис Instagram
-        instagram_service = InstagramService(account)
+            claim_token = claim_execution(db, execution.id)
+            if not claim_token:
+                logger.info(f"Выполнение {execution_id} уже обрабатывается другим воркером, пропускаем")
+                return {"success": False, "skipped": True, "error": "Выполнение уже обрабатывается другим воркером"}
+            db.refresh(execution)
         
-        # Получаем путь к медиа
-        if not post.media_paths:
-            execution.status = PostExecutionStatus.FAILED
-            execution.error_message = "У поста нет медиа файлов"
-            db.commit()
-            return {"success": False, "error": execution.error_message}
+            # Проверяем статус аккаунта
+            if account.status != AccountStatus.ACTIVE:
+                return _fail_execution(db, execution, f"Аккаунт не активен (статус: {account.status})")
         
-        media_path = post.media_paths[0]
+            # Проверяем лимиты (с учётом стадии прогрева)
+            if account.posts_count_today >= daily_limit(account):
+                return _fail_execution(db, execution, "Достигнут дневной лимит постов")
         
-        # Проверяем существование файла
-        if not os.path.exists(media_path):
-            execution.status = PostExecutionStatus.FAILED
-            execution.error_message = f"Файл не найден: {media_path}"
-            db.commit()
-            return {"success": False, "error": execution.error_message}
+            # Проверяем минимальную задержку между постами (используем настройки из конфига)
+            min_delay = timedelta(seconds=settings.MIN_DELAY_BETWEEN_POSTS_SEC)
+            if account.last_post_at:
+                time_since_last_post = datetime.utcnow() - account.last_post_at
+                if time_since_last_post < min_delay:
+                    wait_seconds = (min_delay - time_since_last_post).total_seconds()
+                    logger.info(f"Ожидание {wait_seconds:.0f} секунд перед публикацией для {account.username} (прошло {time_since_last_post.total_seconds():.0f} сек с последнего поста)")
+                    release_execution(db, execution.id, claim_token)
+                    # Вверх и не меньше секунды: 0 означал бы повтор раньше срока
+                    return {"success": False, "wait_seconds": max(1, math.ceil(wait_seconds))}
         
-        # Публикуем
-        if post.media_type.value == "photo":
-            result = instagram_service.post_photo(media_path, execution.caption_translated)
-        elif post.media_type.value == "video":
-            result = instagram_service.post_video(media_path, execution.caption_translated)
-        else:
-            execution.status = PostExecutionStatus.FAILED
-            execution.error_message = f"Неподдерживаемый тип медиа: {post.media_type}"
+            # Получаем путь к медиа
+            if not post.media_paths:
+                return _fail_execution(db, execution, "У поста нет медиа файлов")
+        
+            media_path = post.media_paths[0]
+        
+            # Проверяем существование файла
+            if not os.path.exists(media_path):
+                return _fail_execution(db, execution, f"Файл не найден: {media_path}")
+        
+            if post.media_type not in (MediaType.PHOTO, MediaType.VIDEO):
+                return _fail_execution(db, execution, f"Неподдерживаемый тип медиа: {post.media_type}")
+        
+            # Прошлая попытка начала загрузку и не сохранила результат - пост мог уже выйти
+            recovered = execution.upload_started_at is not None
+            execution.upload_started_at = datetime.utcnow()
             db.commit()
-            return {"success": False, "error": execution.error_message}
+        
+            # Проба уходит в Instagram: её результат закроет или снова откроет breaker
+            probes = []
+            return {
+                "success": True,
+                "account": account,
+                "media_type": post.media_type,
+                "media_path": media_path,
+                "caption": execution.caption_translated,
+                "claim_token": claim_token,
+                "recovered": recovered
+            }
+        finally:
+            for kind, entity_id, probe in probes:
+                release_probe(kind, entity_id, probe)
+
+
+def _upload_media(account: Account, media_type: MediaType, media_path: str, caption: str, recovered: bool = False) -> Dict[str, Any]:
+    """
+    Фаза 2: публикация в Instagram (без открытой сессии БД)
+    
+    При recovered=True сначала проверяем последние публикации аккаунта:
+    если пост с этой подписью уже есть, повторно не загружаем.
+    """
+    instagram_service = InstagramService(account)
+    
+    if recovered:
+        found = instagram_service.find_recent_media(caption)
+        if not found["success"]:
+            return {
+                "success": False,
+                "message": f"Не удалось проверить результат предыдущей попытки: {found.get('message')}"
+            }
+        if found["media_id"]:
+            logger.info(f"Пост для {account.username} уже опубликован предыдущей попыткой (media_id={found['media_id']})")
+            return {
+                "success": True,
+                "message": "Пост уже опубликован предыдущей попыткой",
+                "media_id": found["media_id"]
+            }
+    
+    if media_type == MediaType.PHOTO:
+        return instagram_service.post_photo(media_path, caption)
+    return instagram_service.post_video(media_path, caption)
+
+
+def _record_result(
+    post_id: UUID,
+    account_id: UUID,
+    execution_id: UUID,
+    claim_token: str,
+    result: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Фаза 3: сохранение результата публикации (новая короткая транзакция)
+    
+    Успех сохраняется всегда (пост уже в Instagram), ошибка - только если
+    выполнение всё ещё принадлежит нашему захвату.
+    
+    Returns:
+        dict: {"response": dict - результат задачи, "retry_delay": int (если нужен повтор)}
+    """
+    with session_scope() as db:
+        account = db.query(Account).filter(Account.id == account_id).first()
+        execution = db.query(PostExecution).filter(PostExecution.id == execution_id).with_for_update().first()
+        
+        if not account or not execution:
+            logger.error(f"Аккаунт или выполнение удалены во время публикации: account={account_id}, execution={execution_id}")
+            return {"response": {"success": False, "error": "Данные не найдены"}}
         
         if result["success"]:
+            record_success(KIND_ACCOUNT, account.id)
+            if account.proxy_id:
+                record_success(KIND_PROXY, account.proxy_id)
+            
+            if execution.status == PostExecutionStatus.SUCCESS:
+                # Результат уже сохранён другим воркером - счётчики не трогаем
+                db.commit()
+                return {
+                    "response": {
+                        "success": True,
+                        "media_id": execution.instagram_media_id,
+                        "account": account.username
+                    }
+                }
+            
             # Успешная публикация
             execution.status = PostExecutionStatus.SUCCESS
             execution.instagram_media_id = result.get("media_id")
             execution.posted_at = datetime.utcnow()
+            execution.claim_token = None
+            execution.lease_expires_at = None
+            execution.upload_started_at = None
+            
+            # Успешная загрузка подтверждает, что сессия жива
+            account.session_checked_at = datetime.utcnow()
             
-            # Обновляем счётчики аккаунта
-            account.posts_count_today += 1
+            # Обновляем счётчики аккаунта (дневной счётчик - атомарный upsert)
+            record_post(db, account.id)
             account.last_post_at = datetime.utcnow()
             
-            # Логируем успех
+            # Логируем успех (log_activity делает commit)
             log_activity(
                 db=db,
                 action="post",
@@ -154,63 +281,274 @@ def task_post_to_instagram(
                 duration_ms=result.get("duration_ms")
             )
             
-            db.commit()
-            
             logger.info(f"Пост успешно опубликован для {account.username}")
             return {
-                "success": True,
-                "media_id": result.get("media_id"),
-                "account": account.username
+                "response": {
+                    "success": True,
+                    "media_id": result.get("media_id"),
+                    "account": account.username
+                }
             }
-        else:
-            # Ошибка публикации
-            execution.status = PostExecutionStatus.FAILED
-            execution.error_message = result.get("message", "Неизвестная ошибка")
-            execution.retry_count += 1
-            
-            # Обновляем статус аккаунта при ошибках
-            if result.get("requires_login"):
-                update_account_status(db, account, AccountStatus.LOGIN_REQUIRED.value, "Требуется повторная авторизация")
-            elif result.get("rate_limited"):
-                update_account_status(db, account, AccountStatus.COOLDOWN.value, "Rate limit")
-            elif result.get("proxy_error"):
-                from app.services.proxy_manager import ProxyManager
-                ProxyManager.rotate_proxy_for_account(db, account, reason="proxy_error_in_celery_task")
-            
-            # Логируем ошибку
-            log_activity(
-                db=db,
-                action="post",
-                status=LogStatus.FAILED,
-                account_id=account.id,
-                error_message=execution.error_message
-            )
-            
+        
+        if execution.claim_token != claim_token:
+            # Аренда истекла и выполнение захватил другой воркер - решение за ним
             db.commit()
-            
-            # Если не превышен лимит попыток, повторяем
-            if execution.retry_count < 3:
-                retry_delay = min(300 * (2 ** execution.retry_count), 3600)  # Экспоненциальная задержка
-                logger.warning(f"Повторная попытка публикации для {account.username} через {retry_delay} сек")
-                raise self.retry(countdown=retry_delay)
-            
-            return {"success": False, "error": execution.error_message}
-            
-    except Exception as e:
-        logger.error(f"Ошибка в задаче task_post_to_instagram: {e}", exc_info=True)
+            logger.warning(f"Выполнение {execution_id} перехвачено другим воркером, ошибка не сохраняется")
+            return {"response": {"success": False, "skipped": True, "error": result.get("message", "Неизвестная ошибка")}}
+        
+        # Ошибка публикации: в окно breaker'а прокси (ошибки соединения) или аккаунта
+        if result.get("proxy_error") and account.proxy_id:
+            record_failure(KIND_PROXY, account.proxy_id)
+        else:
+            record_failure(KIND_ACCOUNT, account.id)
+        
+        execution.status = PostExecutionStatus.FAILED
+        execution.error_message = result.get("message", "Неизвестная ошибка")
+        execution.failed_at = datetime.utcnow()
+        execution.retry_count += 1
+        execution.claim_token = None
+        execution.lease_expires_at = None
+        
+        # Instagram явно отклонил загрузку - пост точно не вышел, проверка перед повтором не нужна
+        if result.get("requires_login") or result.get("rate_limited"):
+            execution.upload_started_at = None
+        
+        # Обновляем статус аккаунта при ошибках
+        if result.get("requires_login"):
+            update_account_status(db, account, AccountStatus.LOGIN_REQUIRED.value, "Требуется повторная авторизация")
+        elif result.get("rate_limited"):
+            update_account_status(db, account, AccountStatus.COOLDOWN.value, "Rate limit")
+        elif result.get("proxy_error"):
+            from app.services.proxy_manager import ProxyManager
+            ProxyManager.rotate_proxy_for_account(db, account, reason="proxy_error_in_celery_task")
+        
+        # Логируем ошибку
+        log_activity(
+            db=db,
+            action="post",
+            status=LogStatus.FAILED,
+            account_id=account.id,
+            error_message=execution.error_message
+        )
+        
+        db.commit()
         
-        # Обновляем статус выполнения
-        if execution:
-            execution.status = PostExecutionStatus.FAILED
-            execution.error_message = str(e)
-            execution.retry_count += 1
+        response = {"success": False, "error": execution.error_message}
+        
+        # Если не превышен лимит попыток, повторяем
+        if execution.retry_count < MAX_EXECUTION_ATTEMPTS:
+            retry_delay = min(300 * (2 ** execution.retry_count), 3600)  # Экспоненциальная задержка
+            execution.scheduled_for = datetime.utcnow() + timedelta(seconds=retry_delay)
             db.commit()
+            logger.warning(f"Повторная попытка публикации для {account.username} через {retry_delay} сек")
+            return {"response": response, "retry_delay": retry_delay}
         
-        # Повторяем при необходимости
-        if execution and execution.retry_count < 3:
-            raise self.retry(exc=e)
+        return {"response": response}
+
+
+@celery_app.task(
+    bind=True,
+    name="instagram_cf.post_to_instagram",
+    max_retries=3,
+    default_retry_delay=300  # 5 минут между попытками
+)
+def task_post_to_instagram(
+    self,
+    post_id: str,
+    account_id: str,
+    execution_id: str,
+    error_retries: int = 0
+) -> Dict[str, Any]:
+    """
+    Задача для публикации поста на один аккаунт Instagram
+    
+    Выполняется короткими фазами, сессия БД не удерживается во время загрузки:
+    1. Проверки и атомарный захват выполнения (commit, сессия закрыта)
+    2. Слот прокси и загрузка в Instagram без соединения с БД (аренда продлевается heartbeat'ом)
+    3. Сохранение результата в новой короткой транзакции
+    
+    Задача идемпотентна: повторный запуск для опубликованного или
+    захваченного другим воркером выполнения ничего не загружает.
+    
+    Args:
+        post_id: UUID поста
+        account_id: UUID аккаунта
+        execution_id: UUID записи PostExecution
+        error_retries: Сколько раз задача уже перезапускалась после ошибки БД/брокера
         
-        return {"success": False, "error": str(e)}
+    Returns:
+        dict: Результат публикации
+    """
+    logger.info(f"Начало выполнения задачи публикации: post_id={post_id}, account_id={account_id}, execution_id={execution_id}")
+    
+    try:
+        claim = _claim_execution(UUID(post_id), UUID(account_id), UUID(execution_id))
+    except Exception as e:
+        logger.error(f"Ошибка при подготовке публикации: {e}", exc_info=True)
+        return _retry_after_error(self, post_id, account_id, execution_id, error_retries, e)
+    
+    if "wait_seconds" in claim:
+        _defer_post_task(post_id, account_id, execution_id, claim["wait_seconds"])
+        return claim
+    if claim.get("deferred"):
+        _defer_post_task(post_id, account_id, execution_id, claim["retry_after"])
+        return claim
+    if not claim["success"]:
+        return claim
+    
+    # Ограничение параллельных загрузок через один прокси
+    proxy = claim["account"].proxy
+    proxy_slot = None
+    if proxy:
+        proxy_slot = acquire_proxy_slot(proxy.id, proxy_parallelism(proxy.max_parallel_uploads))
+        if proxy_slot is None:
+            with session_scope() as db:
+                release_execution(db, UUID(execution_id), claim["claim_token"], clear_upload_marker=not claim["recovered"])
+            _defer_post_task(post_id, account_id, execution_id, settings.PROXY_SLOT_WAIT_SEC)
+            return {"success": False, "deferred": True, "error": "Прокси занят, публикация отложена"}
+    
+    try:
+        with LeaseHeartbeat(UUID(execution_id), claim["claim_token"]):
+            result = _upload_media(
+                claim["account"], claim["media_type"], claim["media_path"], claim["caption"],
+                recovered=claim["recovered"]
+            )
+    except Exception as e:
+        logger.error(f"Ошибка в задаче task_post_to_instagram: {e}", exc_info=True)
+        result = {"success": False, "message": str(e)}
+    finally:
+        if proxy:
+            release_proxy_slot(proxy.id, proxy_slot)
+    
+    try:
+        outcome = _record_result(UUID(post_id), UUID(account_id), UUID(execution_id), claim["claim_token"], result)
+    except Exception as e:
+        logger.error(f"Ошибка при сохранении результата публикации: {e}", exc_info=True)
+        return _retry_after_error(self, post_id, account_id, execution_id, error_retries, e)
+    
+    if outcome.get("retry_delay"):
+        # Повторы после ошибок не должны обгонять посты, которым уже пора выйти
+        apply_later(
+            task_post_to_instagram,
+            args=[post_id, account_id, execution_id],
+            countdown=outcome["retry_delay"],
+            priority=TASK_PRIORITY_LOW
+        )
+    
+    return outcome["response"]
+
+
+def _retry_after_error(task, post_id: str, account_id: str, execution_id: str, error_retries: int, exc: Exception) -> Dict[str, Any]:
+    """
+    Повтор задачи после ошибки через хранилище отложенных задач, а не self.retry
+
+    self.retry ставит ETA задачу, которую воркер держит в памяти до срока.
+    Лимит и задержка те же: max_retries и default_retry_delay задачи.
+    
+    Returns:
+        dict: Результат задачи (повтор запланирован)
+    
+    Raises:
+        exc: попытки исчерпаны или повтор не удалось поставить
+    """
+    if error_retries >= task.max_retries:
+        raise exc
+    logger.warning(f"Повтор задачи публикации {execution_id} через {task.default_retry_delay} сек после ошибки: {exc}")
+    apply_later(
+        task_post_to_instagram,
+        args=[post_id, account_id, execution_id],
+        kwargs={"error_retries": error_retries + 1},
+        countdown=task.default_retry_delay,
+        priority=TASK_PRIORITY_LOW
+    )
+    return {"success": False, "deferred": True, "error": str(exc)}
+
+
+def _defer_post_task(post_id: str, account_id: str, execution_id: str, countdown: int) -> None:
+    """
+    Отложить публикацию новой задачей, а не retry:
+    ожидание прокси, паузы между постами или circuit breaker'а не должно расходовать попытки публикации
+    """
+    mark_scheduled(UUID(execution_id), datetime.utcnow() + timedelta(seconds=countdown))
+    apply_later(
+        task_post_to_instagram,
+        args=[post_id, account_id, execution_id],
+        countdown=countdown,
+        priority=TASK_PRIORITY_NORMAL
+    )
+
+
+def _is_republishable(execution: PostExecution, now: datetime) -> bool:
+    """Можно ли снова поставить выполнение в очередь при повторной публикации поста"""
+    if execution.instagram_media_id or execution.status == PostExecutionStatus.SUCCESS:
+        return False
+    if execution.status == PostExecutionStatus.POSTING:
+        return execution.lease_expires_at is not None and execution.lease_expires_at < now
+    if execution.status == PostExecutionStatus.QUEUED:
+        # Задача ещё ждёт в брокере или хранилище отложенных - вторая задача только дублирует её
+        return is_stale_queued(execution, now)
+    # FAILED с оставшимися попытками ждёт автоповтора (apply_later из _record_result)
+    return (execution.retry_count or 0) >= MAX_EXECUTION_ATTEMPTS
+
+
+def _queue_execution(
+    db: Session,
+    post_id: UUID,
+    account_id: UUID,
+    caption: str,
+    existing: Optional[PostExecution],
+    run_at: datetime
+) -> Optional[UUID]:
+    """
+    Поставить выполнение в очередь: переиспользовать существующее или создать новое
+    
+    run_at: плановое время запуска задачи (scheduled_for)
+    
+    Returns:
+        UUID выполнения или None, если его уже публикует/опубликовал кто-то другой
+    """
+    if existing is not None:
+        # Сброс условный: выполнение могли захватить между чтением и этим UPDATE
+        result = db.execute(
+            update(PostExecution)
+            .where(
+                PostExecution.id == existing.id,
+                PostExecution.instagram_media_id.is_(None),
+                exhausted_failed_condition() |
+                stale_queued_condition(datetime.utcnow()) |
+                (PostExecution.lease_expires_at < datetime.utcnow())
+            )
+            .values(
+                status=PostExecutionStatus.QUEUED,
+                caption_translated=caption,
+                error_message=None,
+                retry_count=0,
+                claim_token=None,
+                lease_expires_at=None,
+                queued_at=datetime.utcnow(),
+                scheduled_for=run_at
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return existing.id if result.rowcount else None
+    
+    # ON CONFLICT: параллельная публикация того же поста уже создала выполнение
+    result = db.execute(
+        pg_insert(PostExecution)
+        .values(
+            post_id=post_id,
+            account_id=account_id,
+            idempotency_key=PostExecution.make_idempotency_key(post_id, account_id),
+            caption_translated=caption,
+            status=PostExecutionStatus.QUEUED,
+            scheduled_for=run_at
+        )
+        .on_conflict_do_nothing(index_elements=[PostExecution.idempotency_key])
+        .returning(PostExecution.id)
+    )
+    db.commit()
+    return result.scalar()
 
 
 @celery_app.task(
@@ -219,19 +557,23 @@ def task_post_to_instagram(
     name="instagram_cf.batch_post",
     max_retries=1
 )
-def task_batch_post(self, post_id: str) -> Dict[str, Any]:
+def task_batch_post(self, post_id: str, start_at: Optional[str] = None) -> Dict[str, Any]:
     """
     Задача для массовой публикации поста на все аккаунты в выбранных группах
     
     Создаёт задачи task_post_to_instagram для каждого аккаунта с задержками.
+    Запланированные посты запускаются заранее (переводы и выполнения готовятся
+    до слота), а задержки публикаций отсчитываются от start_at.
     
     Args:
         post_id: UUID поста
+        start_at: Время начала публикации (ISO, UTC), по умолчанию - сразу
         
     Returns:
         dict: Результат создания задач
     """
     db = self.db
+    post = None
     
     try:
         post = db.query(Post).filter(Post.id == UUID(post_id)).first()
@@ -240,29 +582,29 @@ def task_batch_post(self, post_id: str) -> Dict[str, Any]:
         
         # Обновляем статус поста
         post.status = PostStatus.POSTING
+        post.posting_started_at = datetime.utcnow()
         db.commit()
         
-        # Получаем аккаунты из выбранных групп
-        from app.models.group import Group
-        
-        accounts_to_post = []
-        for group_id_str in post.target_groups:
-            try:
-                group_id = UUID(group_id_str)
-                group = db.query(Group).filter(Group.id == group_id).first()
-                if group:
-                    for account in group.accounts:
-                        if account.status == AccountStatus.ACTIVE:
-                            accounts_to_post.append(account)
-            except Exception as e:
-                logger.warning(f"Ошибка при получении группы {group_id_str}: {e}")
-                continue
+        # Получаем ACTIVE аккаунты из выбранных групп одним запросом
+        accounts_to_post = load_target_accounts(db, parse_group_ids(post.target_groups))
         
         if not accounts_to_post:
             post.status = PostStatus.FAILED
             db.commit()
             return {"success": False, "error": "Не найдено активных аккаунтов"}
         
+        # Слоты по прогреву и дневным лимитам: аккаунты без свободного слота не получают задач
+        plan = plan_post_slots(db, accounts_to_post, exclude_post_id=post.id)
+        over_limit = [account for account in accounts_to_post if plan[account.id]["remaining"] <= 0]
+        if over_limit:
+            logger.info(f"Пропущено {len(over_limit)} аккаунтов без свободного дневного лимита для поста {post_id}")
+            accounts_to_post = [account for account in accounts_to_post if plan[account.id]["remaining"] > 0]
+        
+        if not accounts_to_post:
+            post.status = PostStatus.FAILED
+            db.commit()
+            return {"success": False, "error": "Нет аккаунтов со свободным дневным лимитом"}
+        
         # Переводим текст для каждого языка
         languages_needed = set(acc.language for acc in accounts_to_post)
         translations = {}
@@ -283,9 +625,25 @@ def task_batch_post(self, post_id: str) -> Dict[str, Any]:
         for account in accounts_to_post:
             accounts_by_language[account.language].append(account)
         
+        # Выполнения, оставшиеся от прошлых публикаций поста (повторная публикация FAILED поста)
+        existing_executions = {}
+        for execution in db.query(PostExecution).filter(PostExecution.post_id == post.id).all():
+            current = existing_executions.get(execution.account_id)
+            # Для пары (пост, аккаунт) берём выполнение с ключом идемпотентности (старые дубликаты без ключа)
+            if current is None or (execution.idempotency_key and not current.idempotency_key):
+                existing_executions[execution.account_id] = execution
+        
         # Создаём задачи для каждого аккаунта с персонализацией
         created_tasks = 0
+        skipped_accounts = 0
+        now = datetime.utcnow()
         for account in accounts_to_post:
+            execution = existing_executions.get(account.id)
+            if execution and not _is_republishable(execution, now):
+                # Уже опубликовано или прямо сейчас публикуется - не дублируем
+                skipped_accounts += 1
+                continue
+            
             # Получаем переведённый текст
             translated_caption = translations.get(account.language, post.caption_original)
             
@@ -309,28 +667,30 @@ def task_batch_post(self, post_id: str) -> Dict[str, Any]:
                 else:
                     logger.warning(f"Не удалось персонализировать текст для {account.username}, используется базовый перевод")
             
-            # Создаём запись PostExecution
-            execution = PostExecution(
-                post_id=post.id,
-                account_id=account.id,
-                caption_translated=translated_caption,
-                status=PostExecutionStatus.QUEUED
-            )
-            db.add(execution)
-            db.commit()
-            db.refresh(execution)
-            
-            # Вычисляем задержку (random между MIN и MAX)
+            # Вычисляем задержку (random между MIN и MAX) от начала слота аккаунта:
+            # не раньше запланированного времени поста и минимальной паузы после его прошлых постов
             delay = random.randint(
                 settings.MIN_DELAY_BETWEEN_POSTS_SEC,
                 settings.MAX_DELAY_BETWEEN_POSTS_SEC
             )
+            slot_start = plan[account.id]["not_before"]
+            if start_at:
+                slot_start = max(slot_start, datetime.fromisoformat(start_at))
+            delay += max(0, int((slot_start - datetime.utcnow()).total_seconds()))
+            
+            # Создаём или переиспользуем запись PostExecution (одна на пару пост/аккаунт)
+            run_at = datetime.utcnow() + timedelta(seconds=delay)
+            execution_id = _queue_execution(db, post.id, account.id, translated_caption, execution, run_at)
+            if not execution_id:
+                skipped_accounts += 1
+                continue
             
-            # Создаём задачу Celery с задержкой
-            task_post_to_instagram.apply_async(
-                args=[str(post.id), str(account.id), str(execution.id)],
+            # Создаём задачу Celery с задержкой (до срока хранится в Redis, а не в памяти воркера)
+            apply_later(
+                task_post_to_instagram,
+                args=[str(post.id), str(account.id), str(execution_id)],
                 countdown=delay,
-                priority=5  # Нормальный приоритет
+                priority=TASK_PRIORITY_NORMAL
             )
             
             created_tasks += 1
@@ -342,6 +702,8 @@ def task_batch_post(self, post_id: str) -> Dict[str, Any]:
             "success": True,
             "post_id": str(post_id),
             "tasks_created": created_tasks,
+            "skipped": skipped_accounts,
+            "over_limit": len(over_limit),
             "accounts_count": len(accounts_to_post)
         }
         
@@ -352,3 +714,74 @@ def task_batch_post(self, post_id: str) -> Dict[str, Any]:
             db.commit()
         return {"success": False, "error": str(e)}
 
+
+
+@celery_app.task(
+    bind=True,
+    base=DatabaseTask,
+    name="instagram_cf.retry_failed_executions",
+    max_retries=1
+)
+def task_retry_failed_executions(self, post_id: str) -> Dict[str, Any]:
+    """
+    Повторная публикация только неудачных выполнений поста
+    
+    Ставит в очередь FAILED (попытки исчерпаны) и зависшие QUEUED выполнения с уже сохранённым
+    caption_translated - без переводов, перефразирования и обхода групп.
+    Успешные выполнения не затрагиваются.
+    
+    Args:
+        post_id: UUID поста
+        
+    Returns:
+        dict: Результат создания задач
+    """
+    db = self.db
+    
+    post = db.query(Post).filter(Post.id == UUID(post_id)).first()
+    if not post:
+        return {"success": False, "error": "Пост не найден"}
+    
+    now = datetime.utcnow()
+    
+    # Один UPDATE: сброс и выборка выполнений, которые нужно повторить
+    rows = db.execute(
+        update(PostExecution)
+        .where(PostExecution.post_id == post.id, retryable_condition(now))
+        .values(
+            status=PostExecutionStatus.QUEUED,
+            error_message=None,
+            retry_count=0,
+            claim_token=None,
+            lease_expires_at=None,
+            queued_at=now,
+            # Верхняя граница задержки: до неё выполнение не считается зависшим
+            scheduled_for=now + timedelta(seconds=settings.MAX_DELAY_BETWEEN_POSTS_SEC)
+        )
+        .returning(PostExecution.id, PostExecution.account_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    
+    if rows:
+        post.status = PostStatus.POSTING
+    db.commit()
+    
+    for execution_id, account_id in rows:
+        delay = random.randint(
+            settings.MIN_DELAY_BETWEEN_POSTS_SEC,
+            settings.MAX_DELAY_BETWEEN_POSTS_SEC
+        )
+        apply_later(
+            task_post_to_instagram,
+            args=[str(post.id), str(account_id), str(execution_id)],
+            countdown=delay,
+            priority=TASK_PRIORITY_NORMAL
+        )
+    
+    logger.info(f"Повторно поставлено в очередь {len(rows)} выполнений поста {post_id}")
+    
+    return {
+        "success": True,
+        "post_id": str(post_id),
+        "tasks_created": len(rows)
+    }
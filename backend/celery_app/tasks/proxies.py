@@ -0,0 +1,77 @@
+"""
+Фоновая проверка прокси
+
+После массового импорта новые прокси (статус CHECKING) проверяются пачками:
+одна задача проверяет до PROXY_CHECK_BATCH прокси параллельно в потоках
+(сетевые запросы без сессии БД), затем сохраняет результаты одним commit.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+from uuid import UUID
+from backend.celery_app.config import celery_app
+from backend.celery_app.tasks.posting import DatabaseTask
+from app.core.config import settings
+from app.models.proxy import Proxy, ProxyStatus
+from app.services.proxy_manager import ProxyManager
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(
+    bind=True,
+    base=DatabaseTask,
+    name="instagram_cf.check_proxies",
+    max_retries=0
+)
+def task_check_proxies(self, proxy_ids: List[str]) -> Dict[str, Any]:
+    """
+    Проверить пачку прокси параллельно
+
+    Прокси, не прошедший первую проверку (статус CHECKING), сразу помечается FAILED.
+
+    Args:
+        proxy_ids: id прокси (не больше PROXY_CHECK_BATCH)
+
+    Returns:
+        dict: Количество рабочих и нерабочих прокси
+    """
+    db = self.db
+    proxies = db.query(Proxy).filter(Proxy.id.in_([UUID(proxy_id) for proxy_id in proxy_ids])).all()
+    if not proxies:
+        return {"success": True, "active": 0, "failed": 0}
+
+    workers = min(settings.PROXY_CHECK_CONCURRENCY, len(proxies))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(
+            lambda proxy: ProxyManager.check_proxy(proxy, timeout=settings.PROXY_CHECK_TIMEOUT_SEC),
+            proxies
+        ))
+
+    active = 0
+    for proxy, check_result in zip(proxies, results):
+        first_check = proxy.status == ProxyStatus.CHECKING
+        ProxyManager.update_proxy_status(db, proxy, check_result, commit=False)
+        if not check_result["success"] and first_check:
+            proxy.status = ProxyStatus.FAILED
+        if proxy.status == ProxyStatus.ACTIVE:
+            active += 1
+    db.commit()
+
+    logger.info(f"Проверено прокси: {len(proxies)}, рабочих {active}")
+    return {"success": True, "active": active, "failed": len(proxies) - active}
+
+
+def schedule_proxy_checks(proxy_ids: List[UUID]) -> List[str]:
+    """
+    Поставить проверку прокси в очередь пачками по PROXY_CHECK_BATCH
+
+    Returns:
+        list: id задач Celery
+    """
+    batch = settings.PROXY_CHECK_BATCH
+    task_ids = []
+    for start in range(0, len(proxy_ids), batch):
+        chunk = [str(proxy_id) for proxy_id in proxy_ids[start:start + batch]]
+        task_ids.append(task_check_proxies.delay(chunk).id)
+    return task_ids
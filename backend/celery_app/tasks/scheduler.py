@@ -0,0 +1,91 @@
+import logging
+from typing import Dict, Any
+from uuid import UUID
+from celery import chain
+from backend.celery_app.config import celery_app
+from backend.celery_app.tasks.posting import DatabaseTask, task_batch_post
+from backend.celery_app.tasks.media import task_prepare_post_media
+from backend.celery_app.delayed import dispatch_due_tasks
+from app.services.post_scheduler import claim_due_posts, release_undispatched_post
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(
+    bind=True,
+    base=DatabaseTask,
+    name="instagram_cf.dispatch_scheduled_posts",
+    max_retries=0
+)
+def task_dispatch_scheduled_posts(self) -> Dict[str, Any]:
+    """
+    Запуск запланированных постов (Celery beat)
+
+    Для постов, чей слот близко, запускается та же цепочка, что и при ручной публикации:
+    подготовка медиа (очередь media), затем рассылка (fanout) с отсчётом задержек от слота.
+
+    Returns:
+        dict: Количество запущенных постов
+    """
+    db = self.db
+
+    dispatched = 0
+    while True:
+        due = claim_due_posts(db)
+        if not due:
+            break
+
+        sent = 0
+        for post_id, scheduled_at in due:
+            try:
+                # Ошибка подготовки медиа или рассылки прерывает цепочку - пост возвращается в PENDING
+                chain(
+                    task_prepare_post_media.si(str(post_id)),
+                    task_batch_post.si(str(post_id), start_at=scheduled_at.isoformat())
+                ).on_error(task_release_scheduled_post.si(str(post_id))).delay()
+            except Exception as e:
+                logger.error(f"Не удалось запустить запланированный пост {post_id}: {e}")
+                release_undispatched_post(db, post_id)
+                continue
+            sent += 1
+            logger.info(f"Запланированный пост {post_id} запущен (слот {scheduled_at.isoformat()})")
+
+        dispatched += sent
+        if sent < len(due):
+            # Брокер недоступен: вернувшиеся посты заберёт следующий проход
+            break
+
+    return {"success": True, "dispatched": dispatched}
+
+
+@celery_app.task(
+    bind=True,
+    base=DatabaseTask,
+    name="instagram_cf.release_scheduled_post",
+    max_retries=0
+)
+def task_release_scheduled_post(self, post_id: str) -> Dict[str, Any]:
+    """
+    Errback цепочки запланированного поста: вернуть пост в PENDING, если выполнения не созданы
+
+    Returns:
+        dict: Возвращён ли пост планировщику
+    """
+    released = release_undispatched_post(self.db, UUID(post_id))
+    if released:
+        logger.warning(f"Запуск запланированного поста {post_id} прерван, пост возвращён в PENDING")
+    return {"success": True, "released": released}
+
+
+@celery_app.task(name="instagram_cf.dispatch_delayed_tasks", max_retries=0)
+def task_dispatch_delayed_tasks() -> Dict[str, Any]:
+    """
+    Отправка брокеру отложенных задач, срок которых наступил (Celery beat)
+
+    Returns:
+        dict: Количество отправленных задач
+    """
+    dispatched = dispatch_due_tasks()
+    if dispatched:
+        logger.info(f"Отправлено отложенных задач: {dispatched}")
+    return {"success": True, "dispatched": dispatched}
@@ -1,6 +1,22 @@
 """
 Celery worker для запуска задач
-Использование: celery -A backend.celery_app.config.celery_app worker --loglevel=info
+Использование: celery -A backend.celery_app.config.celery_app worker --loglevel=info -Q <очередь>
+
+Очереди и профили воркеров (см. docker-compose.yml):
+    fanout      - prefork, --concurrency=2
+    post        - -P gevent, --concurrency=200
+    media       - prefork, --concurrency=4
+    accounts    - --pool=threads, --concurrency=10
+    maintenance - prefork, --concurrency=1
+
+Привязка аккаунтов к воркерам публикации (POST_QUEUE_SHARDS=N > 0):
+    каждый gevent воркер слушает свои шарды и общую очередь post, например
+    -Q post.0,post.1,post и -Q post.2,post.3,post при N=4. Публикации аккаунта
+    идут в один шард (consistent hashing по account_id), при уходе воркера
+    его шарды выпадают из кольца, остаток задач переносит rebalance_post_queues.
+
+Периодические задачи (beat_schedule) запускает отдельный процесс:
+    celery -A backend.celery_app.config.celery_app beat --loglevel=info
 """
 from backend.celery_app.config import celery_app
 
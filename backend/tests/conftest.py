@@ -0,0 +1,114 @@
+"""
+Общие фикстуры тестов
+
+Запуск из корня репозитория:
+    pytest backend/tests
+
+Redis заменяется на fakeredis (Lua-скрипты выполняются через lupa).
+Тесты с PostgreSQL запускаются, только если задан TEST_DATABASE_URL:
+это отдельная БД, схема в ней пересоздаётся, нужно расширение pg_trgm.
+"""
+import os
+import sys
+import uuid
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Как в docker-compose: PYTHONPATH=/app:/app/backend
+sys.path[:0] = [os.path.dirname(BACKEND_DIR), BACKEND_DIR]
+
+# До импорта app.core.config: session_scope() в сервисах должен работать с тестовой БД
+if os.getenv("TEST_DATABASE_URL"):
+    os.environ["DATABASE_URL"] = os.environ["TEST_DATABASE_URL"]
+
+import pytest
+
+
+@pytest.fixture
+def redis_server():
+    """Отдельный fakeredis сервер на тест; connected = False имитирует недоступный Redis"""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def redis_client(redis_server, monkeypatch):
+    """Клиент, который возвращает app.core.redis.get_redis()"""
+    import fakeredis
+    from app.core import redis as redis_module
+
+    client = fakeredis.FakeRedis(server=redis_server, decode_responses=True)
+    monkeypatch.setattr(redis_module, "_redis_client", client)
+    return client
+
+
+@pytest.fixture(scope="session")
+def db_engine():
+    """Схема тестовой БД (создаётся один раз на прогон)"""
+    if not os.getenv("TEST_DATABASE_URL"):
+        pytest.skip("TEST_DATABASE_URL не задан")
+    from sqlalchemy import text
+    from app.core.database import Base, engine
+    import app.models  # noqa: F401 - регистрация таблиц
+
+    with engine.begin() as connection:
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    yield engine
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(db_engine):
+    """Сессия БД; сервисы делают commit сами, поэтому таблицы очищаются после теста"""
+    from app.core.database import Base, SessionLocal
+
+    session = SessionLocal()
+    yield session
+    session.close()
+    with db_engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+
+
+@pytest.fixture
+def make_post(db):
+    """Создать пост с заданными полями"""
+    from app.models.post import MediaType, Post
+
+    def factory(**fields):
+        post = Post(
+            media_paths=["photo.jpg"],
+            media_type=MediaType.PHOTO,
+            caption_original="caption",
+            original_language="en",
+            target_groups=[],
+            **fields
+        )
+        db.add(post)
+        db.commit()
+        return post
+
+    return factory
+
+
+@pytest.fixture
+def make_execution(db, make_post):
+    """Создать выполнение публикации (с постом, если не передан, и аккаунтом) с заданными полями"""
+    from app.models.account import Account
+    from app.models.post import PostExecution
+
+    def factory(account=None, post=None, **fields):
+        if account is None:
+            account = Account(username=f"user_{uuid.uuid4().hex[:12]}", password="encrypted")
+            db.add(account)
+            db.flush()
+        post = post or make_post()
+        execution = PostExecution(post_id=post.id, account_id=account.id, caption_translated="caption", **fields)
+        db.add(execution)
+        db.commit()
+        return execution
+
+    return factory
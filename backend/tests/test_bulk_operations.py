@@ -0,0 +1,54 @@
+"""Массовое изменение аккаунтов по фильтру"""
+import uuid
+
+from app.models.account import Account
+from app.models.group import Group
+from app.models.proxy import Proxy, ProxyType
+from app.services.bulk_operations import update_accounts
+
+
+def _group(db):
+    group = Group(name=f"group_{uuid.uuid4().hex[:12]}", accounts_count=0)
+    db.add(group)
+    db.flush()
+    return group
+
+
+def _account(db, group):
+    account = Account(username=f"user_{uuid.uuid4().hex[:12]}", password="encrypted", group_id=group.id)
+    db.add(account)
+    group.accounts_count += 1
+    return account
+
+
+def test_filter_selection_is_fixed_before_changes(db):
+    source, target = _group(db), _group(db)
+    selected = [_account(db, source) for _ in range(2)]
+    untouched = _account(db, target)
+    for _ in range(3):
+        db.add(Proxy(url=f"http://{uuid.uuid4().hex[:12]}:8080", type=ProxyType.HTTP))
+    db.commit()
+
+    result = update_accounts(
+        db, None, [Account.group_id == source.id], {"group_id": target.id}, assign_free_proxies=True
+    )
+
+    db.expire_all()
+    assert result["updated"] == 2
+    assert result["groups_changed"] == 2
+    # Фильтр, вычисленный заново после переноса, не нашёл бы ни одного аккаунта
+    assert result["proxies_assigned"] == 2
+    assert all(db.get(Account, account.id).proxy_id for account in selected)
+    assert db.get(Account, untouched.id).proxy_id is None
+    assert db.get(Group, source.id).accounts_count == 0
+    assert db.get(Group, target.id).accounts_count == 3
+
+
+def test_empty_filter_selection_changes_nothing(db):
+    group = _group(db)
+    db.commit()
+
+    result = update_accounts(db, None, [Account.group_id == group.id], {"language": "en"}, assign_free_proxies=True)
+
+    assert result["updated"] == 0
+    assert result["proxies_assigned"] == 0
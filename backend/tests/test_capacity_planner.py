@@ -0,0 +1,67 @@
+"""Лимиты публикаций по стадии прогрева и недавним ошибкам"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.models.account import Account, AccountDailyQuota
+from app.models.post import PostExecutionStatus
+from app.services.capacity_planner import WARMUP_DAILY_LIMITS, advance_warmup_stages, daily_limit, plan_post_slots
+
+
+@pytest.fixture(autouse=True)
+def max_posts(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_POSTS_PER_DAY_PER_ACCOUNT", 10)
+
+
+@pytest.mark.parametrize("stage", sorted(WARMUP_DAILY_LIMITS))
+def test_daily_limit_follows_warmup_stage(stage):
+    account = Account(warmup_stage=stage, posts_limit_per_day=10)
+
+    assert daily_limit(account) == WARMUP_DAILY_LIMITS[stage]
+
+
+def test_daily_limit_respects_account_limit_and_failures():
+    account = Account(warmup_stage=3, posts_limit_per_day=6)
+
+    assert daily_limit(account) == 6
+    assert daily_limit(account, recent_failures=4) == 4
+
+
+def test_recent_failures_counted_by_failure_time(db, make_execution):
+    now = datetime.utcnow()
+    first = make_execution()
+    account = db.get(Account, first.account_id)
+    account.warmup_stage = 3
+    # Созданы давно, упали только что (повторы) - ошибки недавние
+    for _ in range(2):
+        make_execution(
+            account=account,
+            status=PostExecutionStatus.FAILED,
+            created_at=now - timedelta(days=3),
+            failed_at=now - timedelta(minutes=5)
+        )
+    # Создано сейчас, но ошибка вне окна
+    make_execution(account=account, status=PostExecutionStatus.FAILED, created_at=now, failed_at=now - timedelta(days=2))
+
+    plan = plan_post_slots(db, [account])
+
+    assert plan[account.id]["daily_limit"] == WARMUP_DAILY_LIMITS[3] - 1
+
+
+def test_advance_warmup_stages_only_promotes(db, make_execution):
+    fresh = db.get(Account, make_execution().account_id)
+    manual = db.get(Account, make_execution().account_id)
+    manual.warmup_stage = 3
+    today = datetime.utcnow().date()
+    for days_ago in range(7):
+        db.add(AccountDailyQuota(account_id=fresh.id, day=today - timedelta(days=days_ago), posts_count=2))
+        db.add(AccountDailyQuota(account_id=manual.id, day=today - timedelta(days=days_ago), posts_count=2))
+    db.commit()
+
+    assert advance_warmup_stages(db) == 1
+    db.commit()
+
+    db.expire_all()
+    assert db.get(Account, fresh.id).warmup_stage == 2
+    assert db.get(Account, manual.id).warmup_stage == 3
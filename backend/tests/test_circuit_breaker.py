@@ -0,0 +1,154 @@
+"""Состояния circuit breaker (closed -> open -> half_open -> closed/open)"""
+import threading
+import uuid
+
+import pytest
+
+from app.core.config import settings
+from app.services import circuit_breaker
+from app.services.circuit_breaker import (
+    KIND_PROXY, OPEN_KEY, STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN, TRIPPED_KEY,
+    check_circuit, get_circuit_state, record_failure, record_success, release_probe
+)
+
+THRESHOLD = 3
+
+
+@pytest.fixture(autouse=True)
+def breaker_settings(redis_client, monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "_release_probe_script", None)
+    monkeypatch.setattr(settings, "CIRCUIT_FAILURE_THRESHOLD", THRESHOLD)
+    monkeypatch.setattr(settings, "CIRCUIT_WINDOW_SEC", 300)
+    monkeypatch.setattr(settings, "CIRCUIT_OPEN_SEC", 120)
+    monkeypatch.setattr(settings, "CIRCUIT_PROBE_TTL_SEC", 60)
+
+
+@pytest.fixture
+def proxy_id():
+    return uuid.uuid4()
+
+
+def _trip(proxy_id):
+    for _ in range(THRESHOLD):
+        record_failure(KIND_PROXY, proxy_id)
+
+
+def _expire_open(redis_client, proxy_id):
+    """Срок open истёк: остаётся только отметка tripped"""
+    redis_client.delete(OPEN_KEY.format(kind=KIND_PROXY, entity_id=proxy_id))
+
+
+def test_closed_below_threshold(proxy_id):
+    for _ in range(THRESHOLD - 1):
+        record_failure(KIND_PROXY, proxy_id)
+
+    assert check_circuit(KIND_PROXY, proxy_id) == {"allowed": True, "state": STATE_CLOSED}
+
+
+def test_opens_at_threshold(proxy_id, redis_client):
+    _trip(proxy_id)
+
+    decision = check_circuit(KIND_PROXY, proxy_id)
+
+    assert decision["allowed"] is False
+    assert decision["state"] == STATE_OPEN
+    assert 0 < decision["retry_after"] <= settings.CIRCUIT_OPEN_SEC
+    # tripped переживает open, чтобы после него наступил half_open
+    assert redis_client.ttl(TRIPPED_KEY.format(kind=KIND_PROXY, entity_id=proxy_id)) > settings.CIRCUIT_OPEN_SEC
+
+
+def test_half_open_allows_single_probe(proxy_id, redis_client):
+    _trip(proxy_id)
+    _expire_open(redis_client, proxy_id)
+
+    assert get_circuit_state(KIND_PROXY, proxy_id) == STATE_HALF_OPEN
+    first = check_circuit(KIND_PROXY, proxy_id)
+    second = check_circuit(KIND_PROXY, proxy_id)
+
+    assert first["allowed"] is True
+    assert first["state"] == STATE_HALF_OPEN
+    assert first["probe"]
+    assert second["allowed"] is False
+    assert second["state"] == STATE_HALF_OPEN
+    assert second["retry_after"] > 0
+
+
+def test_concurrent_half_open_checks_admit_one_probe(proxy_id, redis_client):
+    _trip(proxy_id)
+    _expire_open(redis_client, proxy_id)
+    workers = 10
+    barrier = threading.Barrier(workers)
+    decisions = []
+
+    def check():
+        barrier.wait()
+        decisions.append(check_circuit(KIND_PROXY, proxy_id))
+
+    threads = [threading.Thread(target=check) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(decisions) == workers
+    assert len([decision for decision in decisions if decision["allowed"]]) == 1
+
+
+def test_released_probe_can_be_taken_again(proxy_id, redis_client):
+    _trip(proxy_id)
+    _expire_open(redis_client, proxy_id)
+    first = check_circuit(KIND_PROXY, proxy_id)
+
+    release_probe(KIND_PROXY, proxy_id, first["probe"])
+
+    assert check_circuit(KIND_PROXY, proxy_id)["allowed"] is True
+
+
+def test_release_keeps_probe_of_another_task(proxy_id, redis_client):
+    _trip(proxy_id)
+    _expire_open(redis_client, proxy_id)
+    check_circuit(KIND_PROXY, proxy_id)
+
+    release_probe(KIND_PROXY, proxy_id, "expired-probe")
+
+    assert check_circuit(KIND_PROXY, proxy_id)["allowed"] is False
+
+
+def test_probe_success_closes(proxy_id, redis_client):
+    _trip(proxy_id)
+    _expire_open(redis_client, proxy_id)
+    check_circuit(KIND_PROXY, proxy_id)
+
+    record_success(KIND_PROXY, proxy_id)
+
+    assert get_circuit_state(KIND_PROXY, proxy_id) == STATE_CLOSED
+    assert check_circuit(KIND_PROXY, proxy_id)["allowed"] is True
+    # Окно ошибок очищено: одна новая ошибка не открывает breaker
+    record_failure(KIND_PROXY, proxy_id)
+    assert get_circuit_state(KIND_PROXY, proxy_id) == STATE_CLOSED
+
+
+def test_probe_failure_reopens(proxy_id, redis_client):
+    _trip(proxy_id)
+    _expire_open(redis_client, proxy_id)
+    check_circuit(KIND_PROXY, proxy_id)
+
+    record_failure(KIND_PROXY, proxy_id)
+
+    assert get_circuit_state(KIND_PROXY, proxy_id) == STATE_OPEN
+    assert check_circuit(KIND_PROXY, proxy_id)["allowed"] is False
+
+
+def test_breakers_are_independent(proxy_id):
+    _trip(proxy_id)
+
+    assert check_circuit(KIND_PROXY, uuid.uuid4())["allowed"] is True
+
+
+def test_unavailable_redis_allows_task(proxy_id, redis_server):
+    redis_server.connected = False
+
+    record_failure(KIND_PROXY, proxy_id)
+
+    assert check_circuit(KIND_PROXY, proxy_id) == {"allowed": True, "state": STATE_CLOSED}
+    assert get_circuit_state(KIND_PROXY, proxy_id) == STATE_CLOSED
@@ -0,0 +1,180 @@
+"""Хранилище отложенных задач: постановка, выборка по сроку, возврат при ошибке отправки"""
+import json
+import threading
+import time
+
+import pytest
+
+from app.core.config import settings
+from backend.celery_app import delayed
+from backend.celery_app.delayed import DELAYED_TASKS_KEY, apply_later, dispatch_due_tasks, pending_delayed_tasks
+
+
+class RecordingTask:
+    """Задача Celery, у которой записывается apply_async"""
+    name = "instagram_cf.test_task"
+
+    def __init__(self):
+        self.calls = []
+
+    def apply_async(self, **options):
+        self.calls.append(options)
+
+
+@pytest.fixture(autouse=True)
+def fresh_script(redis_client, monkeypatch):
+    """Скрипт регистрируется на клиенте, поэтому у каждого теста свой"""
+    monkeypatch.setattr(delayed, "_pop_due_script", None)
+    monkeypatch.setattr(settings, "DELAYED_DISPATCH_MIN_COUNTDOWN_SEC", 5)
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Задачи, отправленные брокеру диспетчером"""
+    sent = []
+    monkeypatch.setattr(
+        delayed.celery_app, "send_task",
+        lambda name, args=None, kwargs=None, **options: sent.append((name, args, kwargs, options))
+    )
+    return sent
+
+
+def _make_due(redis_client):
+    """Сдвинуть срок всех отложенных задач в прошлое"""
+    for item in redis_client.zrange(DELAYED_TASKS_KEY, 0, -1):
+        redis_client.zadd(DELAYED_TASKS_KEY, {item: time.time() - 1})
+
+
+def test_short_countdown_goes_to_broker_directly(redis_client):
+    task = RecordingTask()
+
+    apply_later(task, args=[1], countdown=3, priority=9)
+
+    assert task.calls == [{"args": [1], "kwargs": None, "countdown": 3, "priority": 9}]
+    assert pending_delayed_tasks() == 0
+
+
+def test_long_countdown_is_stored_with_run_time(redis_client):
+    task = RecordingTask()
+    before = time.time()
+
+    apply_later(task, args=["post"], kwargs={"error_retries": 1}, countdown=600, priority=9)
+
+    assert task.calls == []
+    [(payload, score)] = redis_client.zrange(DELAYED_TASKS_KEY, 0, -1, withscores=True)
+    entry = json.loads(payload)
+    assert entry["task"] == task.name
+    assert entry["args"] == ["post"]
+    assert entry["kwargs"] == {"error_retries": 1}
+    assert entry["options"] == {"priority": 9}
+    assert before + 600 <= score <= time.time() + 600
+
+
+def test_same_task_twice_is_stored_twice(redis_client):
+    task = RecordingTask()
+
+    apply_later(task, args=["post"], countdown=600)
+    apply_later(task, args=["post"], countdown=600)
+
+    assert pending_delayed_tasks() == 2
+
+
+def test_unavailable_redis_falls_back_to_countdown(redis_server):
+    task = RecordingTask()
+    redis_server.connected = False
+
+    apply_later(task, args=[1], countdown=600)
+
+    assert task.calls == [{"args": [1], "kwargs": None, "countdown": 600}]
+
+
+def test_dispatch_sends_only_due_tasks(redis_client, sent):
+    task = RecordingTask()
+    apply_later(task, args=["due"], countdown=600)
+    _make_due(redis_client)
+    apply_later(task, args=["later"], countdown=600)
+
+    assert dispatch_due_tasks() == 1
+
+    assert sent == [(task.name, ["due"], {}, {})]
+    assert pending_delayed_tasks() == 1
+
+
+def test_dispatch_drains_in_batches(redis_client, sent):
+    task = RecordingTask()
+    for index in range(7):
+        apply_later(task, args=[index], countdown=600)
+    _make_due(redis_client)
+
+    assert dispatch_due_tasks(batch_size=3) == 7
+
+    assert sorted(args[0] for _, args, _, _ in sent) == list(range(7))
+    assert pending_delayed_tasks() == 0
+
+
+def test_failed_send_returns_remaining_tasks(redis_client, monkeypatch):
+    task = RecordingTask()
+    for index in range(3):
+        apply_later(task, args=[index], countdown=600)
+    _make_due(redis_client)
+    attempts = []
+
+    def send_task(name, args=None, kwargs=None, **options):
+        attempts.append(args)
+        if len(attempts) == 2:
+            raise ConnectionError("broker down")
+
+    monkeypatch.setattr(delayed.celery_app, "send_task", send_task)
+
+    assert dispatch_due_tasks() == 1
+
+    # Отправленная задача удалена, неотправленные вернулись и уже готовы к запуску
+    remaining = [json.loads(item)["args"] for item in redis_client.zrangebyscore(DELAYED_TASKS_KEY, "-inf", time.time())]
+    assert len(remaining) == 2
+    assert attempts[0] not in remaining
+
+
+def test_concurrent_dispatchers_send_each_task_once(redis_client, sent):
+    task = RecordingTask()
+    for index in range(50):
+        apply_later(task, args=[index], countdown=600)
+    _make_due(redis_client)
+    workers = 5
+    barrier = threading.Barrier(workers)
+
+    def dispatch():
+        barrier.wait()
+        dispatch_due_tasks(batch_size=4)
+
+    threads = [threading.Thread(target=dispatch) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(args[0] for _, args, _, _ in sent) == list(range(50))
+
+
+def test_error_retry_goes_through_delayed_store(redis_client):
+    from backend.celery_app.tasks.posting import _retry_after_error, task_post_to_instagram
+
+    result = _retry_after_error(task_post_to_instagram, "post", "account", "execution", 0, RuntimeError("db"))
+
+    assert result == {"success": False, "deferred": True, "error": "db"}
+    [payload] = redis_client.zrange(DELAYED_TASKS_KEY, 0, -1)
+    entry = json.loads(payload)
+    assert entry["task"] == task_post_to_instagram.name
+    assert entry["args"] == ["post", "account", "execution"]
+    assert entry["kwargs"] == {"error_retries": 1}
+
+
+def test_error_retry_raises_when_retries_exhausted(redis_client):
+    from backend.celery_app.tasks.posting import _retry_after_error, task_post_to_instagram
+
+    with pytest.raises(RuntimeError):
+        _retry_after_error(
+            task_post_to_instagram, "post", "account", "execution",
+            task_post_to_instagram.max_retries, RuntimeError("db")
+        )
+
+    assert pending_delayed_tasks() == 0
@@ -0,0 +1,137 @@
+"""Захват выполнений публикации (compare-and-set по статусу, аренда)"""
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.database import SessionLocal
+from app.models.post import PostExecution, PostExecutionStatus
+from app.services.execution_lease import (
+    MAX_EXECUTION_ATTEMPTS, claim_execution, extend_lease, is_stale_queued, release_execution
+)
+
+
+def _reload(db, execution):
+    db.expire_all()
+    return db.get(PostExecution, execution.id)
+
+
+def test_claim_moves_queued_execution_to_posting(db, make_execution):
+    execution = make_execution()
+
+    token = claim_execution(db, execution.id)
+
+    execution = _reload(db, execution)
+    assert token
+    assert execution.status == PostExecutionStatus.POSTING
+    assert execution.claim_token == token
+    assert execution.lease_expires_at > datetime.utcnow()
+
+
+def test_second_claim_is_rejected_while_lease_is_active(db, make_execution):
+    execution = make_execution()
+
+    assert claim_execution(db, execution.id)
+    assert claim_execution(db, execution.id) is None
+
+
+def test_concurrent_claims_have_single_winner(db, make_execution):
+    execution_id = make_execution().id
+    workers = 8
+    barrier = threading.Barrier(workers)
+    tokens = []
+
+    def claim():
+        session = SessionLocal()
+        try:
+            barrier.wait()
+            tokens.append(claim_execution(session, execution_id))
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=claim) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    winners = [token for token in tokens if token]
+    assert len(tokens) == workers
+    assert len(winners) == 1
+    db.expire_all()
+    assert db.get(PostExecution, execution_id).claim_token == winners[0]
+
+
+def test_expired_lease_can_be_claimed_again(db, make_execution):
+    execution = make_execution(
+        status=PostExecutionStatus.POSTING,
+        claim_token="old",
+        lease_expires_at=datetime.utcnow() - timedelta(seconds=1)
+    )
+
+    token = claim_execution(db, execution.id)
+
+    assert token and token != "old"
+    assert not extend_lease(execution.id, "old")
+    assert extend_lease(execution.id, token)
+
+
+def test_published_or_exhausted_executions_are_not_claimed(db, make_execution):
+    published = make_execution(instagram_media_id="123")
+    exhausted = make_execution(status=PostExecutionStatus.FAILED, retry_count=MAX_EXECUTION_ATTEMPTS)
+    retryable = make_execution(status=PostExecutionStatus.FAILED, retry_count=MAX_EXECUTION_ATTEMPTS - 1)
+
+    assert claim_execution(db, published.id) is None
+    assert claim_execution(db, exhausted.id) is None
+    assert claim_execution(db, retryable.id)
+
+
+def test_release_requires_matching_token(db, make_execution):
+    execution = make_execution()
+    token = claim_execution(db, execution.id)
+
+    assert not release_execution(db, execution.id, "foreign")
+    assert release_execution(db, execution.id, token)
+
+    execution = _reload(db, execution)
+    assert execution.status == PostExecutionStatus.QUEUED
+    assert execution.claim_token is None
+
+
+def test_stale_queued_counts_from_scheduled_time(db, make_execution):
+    now = datetime.utcnow()
+    long_ago = now - timedelta(days=1)
+    waiting = make_execution(queued_at=long_ago, scheduled_for=now + timedelta(hours=3))
+    lost = make_execution(queued_at=long_ago, scheduled_for=long_ago)
+
+    assert not is_stale_queued(waiting, now)
+    assert is_stale_queued(lost, now)
+
+
+@pytest.mark.parametrize("fields, expected", [
+    ({"status": PostExecutionStatus.FAILED, "retry_count": MAX_EXECUTION_ATTEMPTS}, True),
+    # Автоповтор уже запланирован
+    ({"status": PostExecutionStatus.FAILED, "retry_count": MAX_EXECUTION_ATTEMPTS - 1}, False),
+    ({"status": PostExecutionStatus.SUCCESS, "instagram_media_id": "1"}, False),
+    ({"status": PostExecutionStatus.QUEUED, "queued_at": datetime.utcnow()}, False),
+])
+def test_republish_skips_executions_with_pending_work(fields, expected):
+    from backend.celery_app.tasks.posting import _is_republishable
+
+    assert _is_republishable(PostExecution(**fields), datetime.utcnow()) is expected
+
+
+def test_republish_reset_leaves_pending_retry_alone(db, make_execution):
+    from backend.celery_app.tasks.posting import _queue_execution
+
+    pending = make_execution(status=PostExecutionStatus.FAILED, retry_count=1)
+    exhausted = make_execution(status=PostExecutionStatus.FAILED, retry_count=MAX_EXECUTION_ATTEMPTS)
+    run_at = datetime.utcnow()
+
+    assert _queue_execution(db, pending.post_id, pending.account_id, "caption", pending, run_at) is None
+    assert _queue_execution(db, exhausted.post_id, exhausted.account_id, "caption", exhausted, run_at) == exhausted.id
+
+    assert _reload(db, pending).status == PostExecutionStatus.FAILED
+    exhausted = _reload(db, exhausted)
+    assert exhausted.status == PostExecutionStatus.QUEUED
+    assert exhausted.retry_count == 0
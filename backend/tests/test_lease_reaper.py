@@ -0,0 +1,107 @@
+"""Возврат в очередь выполнений с истёкшей арендой (task_reap_executions)"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.post import PostExecution, PostExecutionStatus
+from app.services.execution_lease import MAX_EXECUTION_ATTEMPTS, claim_execution
+
+
+@pytest.fixture
+def maintenance(monkeypatch):
+    """Модуль задач обслуживания; отправка задач брокеру записывается, а не выполняется"""
+    from backend.celery_app.tasks import maintenance as module
+
+    sent = []
+    monkeypatch.setattr(
+        module.task_post_to_instagram, "apply_async",
+        lambda args=None, **options: sent.append(args)
+    )
+    monkeypatch.setattr(module, "sent", sent, raising=False)
+    return module
+
+
+def _expired(**fields):
+    return dict(
+        status=PostExecutionStatus.POSTING,
+        claim_token="dead-worker",
+        lease_expires_at=datetime.utcnow() - timedelta(minutes=1),
+        **fields
+    )
+
+
+def test_expired_lease_is_requeued_and_task_resent(db, make_execution, maintenance):
+    execution = make_execution(**_expired(retry_count=0))
+
+    result = maintenance._reap_expired_leases(db, batch_size=10)
+
+    db.expire_all()
+    execution = db.get(PostExecution, execution.id)
+    assert result == {"failed": 0, "requeued": 1}
+    assert execution.status == PostExecutionStatus.QUEUED
+    assert execution.retry_count == 1
+    assert execution.claim_token is None
+    assert maintenance.sent == [[str(execution.post_id), str(execution.account_id), str(execution.id)]]
+
+
+def test_last_attempt_is_failed_instead_of_requeued(db, make_execution, maintenance):
+    execution = make_execution(**_expired(retry_count=MAX_EXECUTION_ATTEMPTS - 1))
+
+    result = maintenance._reap_expired_leases(db, batch_size=10)
+
+    db.expire_all()
+    execution = db.get(PostExecution, execution.id)
+    assert result == {"failed": 1, "requeued": 0}
+    assert execution.status == PostExecutionStatus.FAILED
+    assert maintenance.sent == []
+
+
+def test_active_lease_and_published_executions_are_untouched(db, make_execution, maintenance):
+    active = make_execution()
+    claim_execution(db, active.id)
+    published = make_execution(**_expired(instagram_media_id="123"))
+
+    result = maintenance._reap_expired_leases(db, batch_size=10)
+
+    db.expire_all()
+    assert result == {"failed": 0, "requeued": 0}
+    assert db.get(PostExecution, active.id).status == PostExecutionStatus.POSTING
+    assert db.get(PostExecution, published.id).status == PostExecutionStatus.POSTING
+
+
+def test_requeued_execution_can_be_claimed_by_new_worker(db, make_execution, maintenance):
+    execution = make_execution(**_expired(retry_count=0))
+
+    maintenance._reap_expired_leases(db, batch_size=10)
+
+    assert claim_execution(db, execution.id)
+
+
+def test_reaper_processes_in_batches(db, make_execution, maintenance):
+    for _ in range(5):
+        make_execution(**_expired(retry_count=0))
+
+    first = maintenance._reap_expired_leases(db, batch_size=3)
+    second = maintenance._reap_expired_leases(db, batch_size=3)
+
+    assert first["requeued"] == 3
+    assert second["requeued"] == 2
+    assert len(maintenance.sent) == 5
+
+
+def test_batch_is_selected_once_for_both_updates(db, make_execution, maintenance):
+    for retry_count in (MAX_EXECUTION_ATTEMPTS - 1, MAX_EXECUTION_ATTEMPTS - 1, 0, 0, 0):
+        make_execution(**_expired(retry_count=retry_count))
+
+    result = maintenance._reap_expired_leases(db, batch_size=3)
+
+    db.expire_all()
+    assert result["failed"] + result["requeued"] == 3
+    executions = db.query(PostExecution).all()
+    assert len([execution for execution in executions if execution.status == PostExecutionStatus.POSTING]) == len(executions) - 3
+    # Исчерпанные попытки не возвращаются в очередь
+    assert all(
+        execution.retry_count <= MAX_EXECUTION_ATTEMPTS
+        for execution in executions if execution.status == PostExecutionStatus.QUEUED
+    )
+    assert len(maintenance.sent) == result["requeued"]
@@ -0,0 +1,116 @@
+"""Планировщик постов: захват наступивших постов, запуск цепочки, возврат при ошибке"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.models.post import Post, PostStatus
+from app.services.post_scheduler import claim_due_posts, release_undispatched_post
+
+
+class FakeChain:
+    """Цепочка Celery: записывает errback и отправку, при broken - брокер недоступен"""
+    sent = []
+    broken = False
+
+    def __init__(self, *tasks):
+        self.tasks = tasks
+        self.errback = None
+
+    def on_error(self, errback):
+        self.errback = errback
+        return self
+
+    def delay(self):
+        if FakeChain.broken:
+            raise ConnectionError("broker down")
+        FakeChain.sent.append(self)
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    from backend.celery_app.tasks import scheduler as module
+
+    monkeypatch.setattr(module, "chain", FakeChain)
+    monkeypatch.setattr(FakeChain, "sent", [])
+    monkeypatch.setattr(FakeChain, "broken", False)
+    yield module
+    # run() вызывает задачу без after_return: сессии DatabaseTask закрываются здесь
+    for task in (module.task_dispatch_scheduled_posts, module.task_release_scheduled_post):
+        task.after_return()
+
+
+def _status(db, post):
+    db.expire_all()
+    return db.get(Post, post.id).status
+
+
+def test_claim_takes_only_due_pending_posts(db, make_post):
+    now = datetime.utcnow()
+    due = make_post(status=PostStatus.PENDING, scheduled_at=now + timedelta(seconds=60))
+    later = make_post(status=PostStatus.PENDING, scheduled_at=now + timedelta(seconds=settings.SCHEDULER_PREWARM_SEC + 600))
+    archived = make_post(status=PostStatus.PENDING, scheduled_at=now, archived_at=now)
+    draft = make_post(status=PostStatus.DRAFT, scheduled_at=now)
+
+    claimed = claim_due_posts(db)
+
+    assert [post_id for post_id, _ in claimed] == [due.id]
+    db.expire_all()
+    assert db.get(Post, due.id).status == PostStatus.POSTING
+    assert db.get(Post, due.id).posting_started_at is not None
+    assert [_status(db, post) for post in (later, archived, draft)] == [PostStatus.PENDING, PostStatus.PENDING, PostStatus.DRAFT]
+    assert claim_due_posts(db) == []
+
+
+def test_dispatch_sends_chain_with_release_errback(db, make_post, scheduler):
+    post = make_post(status=PostStatus.PENDING, scheduled_at=datetime.utcnow())
+
+    result = scheduler.task_dispatch_scheduled_posts.run()
+
+    assert result == {"success": True, "dispatched": 1}
+    [sent] = FakeChain.sent
+    assert sent.errback.task == scheduler.task_release_scheduled_post.name
+    assert sent.errback.args == (str(post.id),)
+    assert _status(db, post) == PostStatus.POSTING
+
+
+def test_failed_dispatch_returns_post_to_pending(db, make_post, scheduler):
+    post = make_post(status=PostStatus.PENDING, scheduled_at=datetime.utcnow())
+    FakeChain.broken = True
+
+    result = scheduler.task_dispatch_scheduled_posts.run()
+
+    assert result == {"success": True, "dispatched": 0}
+    assert _status(db, post) == PostStatus.PENDING
+
+    # Брокер снова доступен - следующий проход запускает пост
+    FakeChain.broken = False
+    assert scheduler.task_dispatch_scheduled_posts.run()["dispatched"] == 1
+
+
+def test_release_errback_keeps_post_with_executions(db, make_post, make_execution, scheduler):
+    started = make_post(status=PostStatus.POSTING, scheduled_at=datetime.utcnow())
+    make_execution(post=started)
+    untouched = make_post(status=PostStatus.POSTING, scheduled_at=datetime.utcnow())
+
+    assert not release_undispatched_post(db, started.id)
+    assert scheduler.task_release_scheduled_post.run(str(untouched.id)) == {"success": True, "released": True}
+
+    assert _status(db, started) == PostStatus.POSTING
+    assert _status(db, untouched) == PostStatus.PENDING
+
+
+def test_reaper_fails_posts_stuck_without_executions(db, make_post, make_execution):
+    from backend.celery_app.tasks.maintenance import _fail_undispatched_posts
+
+    long_ago = datetime.utcnow() - timedelta(seconds=settings.POST_DISPATCH_TIMEOUT_SEC + 60)
+    stuck = make_post(status=PostStatus.POSTING, posting_started_at=long_ago)
+    recent = make_post(status=PostStatus.POSTING, posting_started_at=datetime.utcnow())
+    with_executions = make_post(status=PostStatus.POSTING, posting_started_at=long_ago)
+    make_execution(post=with_executions)
+
+    assert _fail_undispatched_posts(db) == 1
+
+    assert _status(db, stuck) == PostStatus.FAILED
+    assert _status(db, recent) == PostStatus.POSTING
+    assert _status(db, with_executions) == PostStatus.POSTING
@@ -0,0 +1,100 @@
+"""Фаза захвата задачи публикации: ожидание паузы между постами, circuit breaker"""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.models.account import Account, AccountStatus
+from app.models.post import PostExecution, PostExecutionStatus
+from app.models.proxy import Proxy, ProxyType
+from app.services import circuit_breaker
+from app.services.circuit_breaker import KIND_ACCOUNT, KIND_PROXY, OPEN_KEY, PROBE_KEY, record_failure
+
+
+@pytest.fixture
+def deferred(redis_client, monkeypatch):
+    """Задержки отложенных задач публикации (задачи не отправляются)"""
+    from backend.celery_app.tasks import posting
+
+    deferred = []
+    monkeypatch.setattr(
+        posting, "apply_later",
+        lambda task, args=None, kwargs=None, countdown=0, **options: deferred.append(countdown)
+    )
+    return deferred
+
+
+@pytest.fixture
+def active_execution(db, make_execution):
+    """Выполнение активного аккаунта без прокси"""
+    execution = make_execution()
+    account = db.get(Account, execution.account_id)
+    account.status = AccountStatus.ACTIVE
+    account.warmup_stage = 3
+    db.commit()
+    return execution
+
+
+@pytest.fixture
+def proxied_execution(db, active_execution, monkeypatch):
+    """Выполнение аккаунта с прокси; breaker открывается с первой ошибки"""
+    monkeypatch.setattr(circuit_breaker, "_release_probe_script", None)
+    monkeypatch.setattr(settings, "CIRCUIT_FAILURE_THRESHOLD", 1)
+    proxy = Proxy(url=f"http://{uuid.uuid4().hex[:12]}:8080", type=ProxyType.HTTP)
+    db.add(proxy)
+    db.flush()
+    db.get(Account, active_execution.account_id).proxy_id = proxy.id
+    db.commit()
+    return active_execution
+
+
+def _half_open(redis_client, kind, entity_id):
+    """Открыть breaker и сразу перевести его в half_open"""
+    record_failure(kind, entity_id)
+    redis_client.delete(OPEN_KEY.format(kind=kind, entity_id=entity_id))
+
+
+def _run(execution):
+    from backend.celery_app.tasks import posting
+
+    return posting.task_post_to_instagram.run(str(execution.post_id), str(execution.account_id), str(execution.id))
+
+
+def test_sub_second_wait_is_deferred_not_orphaned(db, deferred, active_execution):
+    account = db.get(Account, active_execution.account_id)
+    # До конца паузы между постами осталось меньше секунды
+    account.last_post_at = datetime.utcnow() - timedelta(seconds=settings.MIN_DELAY_BETWEEN_POSTS_SEC - 0.5)
+    db.commit()
+
+    result = _run(active_execution)
+
+    assert result == {"success": False, "wait_seconds": 1}
+    assert deferred == [1]
+    db.expire_all()
+    execution = db.get(PostExecution, active_execution.id)
+    assert execution.status == PostExecutionStatus.QUEUED
+    assert execution.scheduled_for is not None
+
+
+def test_open_account_breaker_does_not_take_proxy_probe(db, redis_client, deferred, proxied_execution):
+    account = db.get(Account, proxied_execution.account_id)
+    _half_open(redis_client, KIND_PROXY, account.proxy_id)
+    record_failure(KIND_ACCOUNT, account.id)
+
+    result = _run(proxied_execution)
+
+    assert result["deferred"] is True
+    assert not redis_client.exists(PROBE_KEY.format(kind=KIND_PROXY, entity_id=account.proxy_id))
+
+
+def test_deferred_task_releases_its_probe(db, redis_client, deferred, proxied_execution):
+    account = db.get(Account, proxied_execution.account_id)
+    account.last_post_at = datetime.utcnow()
+    db.commit()
+    _half_open(redis_client, KIND_PROXY, account.proxy_id)
+
+    result = _run(proxied_execution)
+
+    assert "wait_seconds" in result
+    assert not redis_client.exists(PROBE_KEY.format(kind=KIND_PROXY, entity_id=account.proxy_id))
@@ -0,0 +1,99 @@
+"""Семафор параллельных загрузок через прокси (Lua-скрипт в Redis)"""
+import threading
+import uuid
+
+import pytest
+
+from app.core.config import settings
+from app.services import proxy_limiter
+from app.services.proxy_limiter import (
+    SEMAPHORE_KEY, SLOT_UNAVAILABLE, acquire_proxy_slot, get_proxy_slot_metrics, release_proxy_slot
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_script(redis_client, monkeypatch):
+    """Скрипт регистрируется на клиенте, поэтому у каждого теста свой"""
+    monkeypatch.setattr(proxy_limiter, "_acquire_script", None)
+    monkeypatch.setattr(settings, "PROXY_SLOT_POLL_SEC", 0.01)
+
+
+@pytest.fixture
+def proxy_id():
+    return uuid.uuid4()
+
+
+def test_slots_are_limited(proxy_id):
+    tokens = [acquire_proxy_slot(proxy_id, limit=2, wait_sec=0) for _ in range(3)]
+
+    assert all(tokens[:2])
+    assert tokens[2] is None
+
+
+def test_release_frees_slot(proxy_id):
+    token = acquire_proxy_slot(proxy_id, limit=1, wait_sec=0)
+    assert acquire_proxy_slot(proxy_id, limit=1, wait_sec=0) is None
+
+    release_proxy_slot(proxy_id, token)
+
+    assert acquire_proxy_slot(proxy_id, limit=1, wait_sec=0)
+
+
+def test_expired_holder_is_evicted(proxy_id, redis_client):
+    key = SEMAPHORE_KEY.format(proxy_id=proxy_id)
+    # Держатель упавшего воркера: срок аренды в прошлом
+    redis_client.zadd(key, {"dead-worker": 1})
+
+    token = acquire_proxy_slot(proxy_id, limit=1, wait_sec=0)
+
+    assert token
+    assert redis_client.zrange(key, 0, -1) == [token]
+
+
+def test_concurrent_acquire_never_exceeds_limit(proxy_id, redis_client):
+    workers = 20
+    barrier = threading.Barrier(workers)
+    tokens = []
+
+    def acquire():
+        barrier.wait()
+        tokens.append(acquire_proxy_slot(proxy_id, limit=3, wait_sec=0))
+
+    threads = [threading.Thread(target=acquire) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(tokens) == workers
+    assert len([token for token in tokens if token]) == 3
+    assert redis_client.zcard(SEMAPHORE_KEY.format(proxy_id=proxy_id)) == 3
+
+
+def test_waiting_acquire_gets_released_slot(proxy_id):
+    token = acquire_proxy_slot(proxy_id, limit=1, wait_sec=0)
+    timer = threading.Timer(0.05, release_proxy_slot, args=(proxy_id, token))
+    timer.start()
+
+    try:
+        assert acquire_proxy_slot(proxy_id, limit=1, wait_sec=5)
+    finally:
+        timer.cancel()
+
+
+def test_wait_metrics(proxy_id):
+    acquire_proxy_slot(proxy_id, limit=1, wait_sec=0)
+    acquire_proxy_slot(proxy_id, limit=1, wait_sec=0)
+
+    metrics = get_proxy_slot_metrics(proxy_id)
+
+    assert metrics["in_use"] == 1
+    assert metrics["waits"] == 2
+    assert metrics["timeouts"] == 1
+
+
+def test_unavailable_redis_does_not_block_upload(proxy_id, redis_server):
+    redis_server.connected = False
+
+    assert acquire_proxy_slot(proxy_id, limit=1, wait_sec=0) == SLOT_UNAVAILABLE
+    release_proxy_slot(proxy_id, SLOT_UNAVAILABLE)
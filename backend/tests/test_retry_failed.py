@@ -0,0 +1,60 @@
+"""Повтор неудачных выполнений поста (task_retry_failed_executions)"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.models.post import PostExecution, PostExecutionStatus, PostStatus
+from app.services.execution_lease import MAX_EXECUTION_ATTEMPTS
+
+
+@pytest.fixture
+def posting(monkeypatch):
+    """Модуль задач публикации; отложенные задачи записываются, а не отправляются"""
+    from backend.celery_app.tasks import posting as module
+
+    scheduled = []
+    monkeypatch.setattr(
+        module, "apply_later",
+        lambda task, args=None, kwargs=None, countdown=0, **options: scheduled.append(args)
+    )
+    monkeypatch.setattr(module, "scheduled", scheduled, raising=False)
+    yield module
+    module.task_retry_failed_executions.after_return()
+
+
+def test_retry_failed_requeues_only_final_failures_and_lost_tasks(db, make_post, make_execution, posting):
+    now = datetime.utcnow()
+    long_ago = now - timedelta(seconds=settings.POST_EXECUTION_STALE_QUEUED_SEC + 60)
+    post = make_post(status=PostStatus.FAILED)
+    exhausted = make_execution(post=post, status=PostExecutionStatus.FAILED, retry_count=MAX_EXECUTION_ATTEMPTS)
+    # Автоповтор уже запланирован через хранилище отложенных задач
+    pending_retry = make_execution(
+        post=post, status=PostExecutionStatus.FAILED, retry_count=1, scheduled_for=now + timedelta(minutes=10)
+    )
+    lost = make_execution(post=post, queued_at=long_ago, scheduled_for=long_ago)
+    waiting = make_execution(post=post, queued_at=long_ago, scheduled_for=now + timedelta(hours=2))
+    published = make_execution(post=post, status=PostExecutionStatus.SUCCESS, instagram_media_id="1")
+
+    result = posting.task_retry_failed_executions.run(str(post.id))
+
+    assert result["tasks_created"] == 2
+    assert sorted(args[2] for args in posting.scheduled) == sorted([str(exhausted.id), str(lost.id)])
+    db.expire_all()
+    requeued = db.get(PostExecution, exhausted.id)
+    assert requeued.status == PostExecutionStatus.QUEUED
+    assert requeued.retry_count == 0
+    assert db.get(PostExecution, pending_retry.id).status == PostExecutionStatus.FAILED
+    assert db.get(PostExecution, pending_retry.id).retry_count == 1
+    assert db.get(PostExecution, waiting.id).queued_at == long_ago
+    assert db.get(PostExecution, published.id).status == PostExecutionStatus.SUCCESS
+
+
+def test_retry_failed_twice_does_not_duplicate_tasks(db, make_post, make_execution, posting):
+    post = make_post(status=PostStatus.FAILED)
+    make_execution(post=post, status=PostExecutionStatus.FAILED, retry_count=MAX_EXECUTION_ATTEMPTS)
+
+    posting.task_retry_failed_executions.run(str(post.id))
+    posting.task_retry_failed_executions.run(str(post.id))
+
+    assert len(posting.scheduled) == 1
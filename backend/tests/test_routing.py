@@ -0,0 +1,157 @@
+"""Шардирование очередей публикации: кольцо consistent hashing, роутер, перенос задач"""
+import uuid
+from collections import Counter
+
+import pytest
+
+from app.core.config import settings
+from backend.celery_app import routing
+from backend.celery_app.routing import (
+    POST_QUEUE, POST_TASK_NAME, HashRing, rebalance_orphaned_queues, register_live_queues, route_task
+)
+
+SHARDS = ["post.0", "post.1", "post.2", "post.3"]
+ACCOUNT_IDS = [str(uuid.UUID(int=index)) for index in range(2000)]
+
+
+@pytest.fixture
+def sharding(redis_client, monkeypatch):
+    """Шардирование включено, кэш кольца процесса сброшен"""
+    monkeypatch.setattr(settings, "POST_QUEUE_SHARDS", len(SHARDS))
+    monkeypatch.setattr(routing, "_ring_cache", (0.0, (), None))
+    monkeypatch.setattr(settings, "POST_SHARD_MEMBERSHIP_CACHE_SEC", 0)
+    return redis_client
+
+
+def test_ring_is_deterministic():
+    first, second = HashRing(SHARDS), HashRing(list(reversed(SHARDS)))
+
+    assert all(first.get(key) == second.get(key) for key in ACCOUNT_IDS)
+
+
+def test_ring_spreads_accounts_evenly():
+    counts = Counter(HashRing(SHARDS).get(key) for key in ACCOUNT_IDS)
+
+    assert set(counts) == set(SHARDS)
+    expected = len(ACCOUNT_IDS) / len(SHARDS)
+    assert all(0.6 * expected < count < 1.4 * expected for count in counts.values())
+
+
+def test_removing_node_moves_only_its_accounts():
+    before = HashRing(SHARDS)
+    after = HashRing(SHARDS[:-1])
+
+    moved = [key for key in ACCOUNT_IDS if before.get(key) != after.get(key)]
+
+    assert moved
+    assert all(before.get(key) == SHARDS[-1] for key in moved)
+
+
+def test_adding_node_moves_about_one_nth():
+    before = HashRing(SHARDS)
+    after = HashRing(SHARDS + ["post.4"])
+
+    moved = [key for key in ACCOUNT_IDS if before.get(key) != after.get(key)]
+
+    assert all(after.get(key) == "post.4" for key in moved)
+    assert len(moved) < 2 * len(ACCOUNT_IDS) / 5
+
+
+def test_empty_ring_has_no_owner():
+    assert HashRing([]).get("account") is None
+
+
+def test_route_task_disabled_without_shards(monkeypatch):
+    monkeypatch.setattr(settings, "POST_QUEUE_SHARDS", 0)
+
+    assert route_task(POST_TASK_NAME, ["post", "account", "execution"], {}, {}) is None
+
+
+def test_route_task_uses_args_and_kwargs_alike(sharding):
+    register_live_queues(SHARDS)
+    account_id = ACCOUNT_IDS[0]
+    owner = HashRing(SHARDS).get(account_id)
+
+    by_args = route_task(POST_TASK_NAME, ["post", account_id, "execution"], {}, {})
+    by_kwargs = route_task(POST_TASK_NAME, [], {"post_id": "post", "account_id": account_id}, {})
+
+    assert by_args == by_kwargs == {"queue": owner}
+    assert route_task("instagram_cf.other", ["post", account_id], {}, {}) is None
+
+
+def test_route_task_skips_dead_queues(sharding):
+    register_live_queues(SHARDS[:2])
+
+    queues = {route_task(POST_TASK_NAME, ["post", key, "execution"], {}, {})["queue"] for key in ACCOUNT_IDS[:200]}
+
+    assert queues == set(SHARDS[:2])
+
+
+def test_route_task_falls_back_to_post_queue_without_live_shards(sharding):
+    assert route_task(POST_TASK_NAME, ["post", ACCOUNT_IDS[0], "execution"], {}, {}) == {"queue": POST_QUEUE}
+
+
+@pytest.fixture
+def memory_app():
+    """Celery приложение на брокере в памяти процесса (очереди общие для всех соединений)"""
+    from celery import Celery
+
+    app = Celery("routing-tests", broker="memory://")
+    yield app
+    with app.connection_for_write() as connection:
+        for queue in SHARDS + [POST_QUEUE]:
+            connection.default_channel.queue_purge(queue)
+
+
+def _queued_account_ids(app, queue_name):
+    """Забрать задачи из очереди и вернуть account_id каждой"""
+    from kombu import Queue
+
+    account_ids = []
+    with app.connection_for_write() as connection:
+        queue = Queue(queue_name).bind(connection.default_channel)
+        while True:
+            message = queue.get(no_ack=True)
+            if message is None:
+                return account_ids
+            args, kwargs = message.decode()[:2]
+            account_ids.append(routing.task_account_id(args, kwargs))
+
+
+def test_rebalance_moves_orphaned_tasks_to_live_owners(sharding, memory_app):
+    live = SHARDS[:2]
+    register_live_queues(live)
+    ring = HashRing(live)
+    by_args, by_kwargs = ACCOUNT_IDS[:10], ACCOUNT_IDS[10:20]
+    for account_id in by_args:
+        memory_app.send_task(POST_TASK_NAME, args=["post", account_id, "execution"], queue="post.3")
+    for account_id in by_kwargs:
+        memory_app.send_task(
+            POST_TASK_NAME,
+            kwargs={"post_id": "post", "account_id": account_id, "execution_id": "execution"},
+            queue="post.3"
+        )
+
+    moved = rebalance_orphaned_queues(memory_app, limit=100)
+
+    assert moved == {"post.3": 20}
+    assert _queued_account_ids(memory_app, "post.3") == []
+    placed = {queue: _queued_account_ids(memory_app, queue) for queue in live}
+    assert sorted(sum(placed.values(), [])) == sorted(by_args + by_kwargs)
+    assert all(ring.get(account_id) == queue for queue, ids in placed.items() for account_id in ids)
+
+
+def test_rebalance_without_live_shards_uses_post_queue(sharding, memory_app):
+    memory_app.send_task(POST_TASK_NAME, args=["post", ACCOUNT_IDS[0], "execution"], queue="post.1")
+
+    assert rebalance_orphaned_queues(memory_app, limit=100) == {"post.1": 1}
+    assert _queued_account_ids(memory_app, POST_QUEUE) == [ACCOUNT_IDS[0]]
+
+
+def test_rebalance_respects_limit(sharding, memory_app):
+    register_live_queues(SHARDS[:1])
+    for account_id in ACCOUNT_IDS[:5]:
+        memory_app.send_task(POST_TASK_NAME, args=["post", account_id, "execution"], queue="post.2")
+
+    assert rebalance_orphaned_queues(memory_app, limit=3) == {"post.2": 3}
+    assert len(_queued_account_ids(memory_app, "post.2")) == 2
@@ -0,0 +1,44 @@
+"""Инвалидация кэша пользователя при изменениях через ORM-сессию"""
+import uuid
+from datetime import datetime
+
+import pytest
+
+from app.models.user import User
+from app.services import user_cache
+from app.services.user_cache import USER_CACHE_KEY, USER_INVALIDATED_KEY, cache_user
+
+
+@pytest.fixture
+def user(db, redis_client, monkeypatch):
+    """Пользователь, уже записанный в кэш"""
+    monkeypatch.setattr(user_cache, "_cache_if_valid_script", None)
+    user = User(username=f"user_{uuid.uuid4().hex[:12]}", email=f"{uuid.uuid4().hex[:12]}@example.com", password_hash="hash")
+    db.add(user)
+    db.commit()
+    cache_user(user)
+    return user
+
+
+def test_login_time_does_not_invalidate_cache(db, redis_client, user):
+    user.last_login_at = datetime.utcnow()
+    db.commit()
+
+    assert redis_client.exists(USER_CACHE_KEY.format(user_id=user.id))
+    assert not redis_client.exists(USER_INVALIDATED_KEY.format(user_id=user.id))
+
+
+def test_cached_field_change_invalidates_cache(db, redis_client, user):
+    user.is_active = False
+    db.commit()
+
+    assert not redis_client.exists(USER_CACHE_KEY.format(user_id=user.id))
+    assert redis_client.exists(USER_INVALIDATED_KEY.format(user_id=user.id))
+
+
+def test_rolled_back_change_keeps_cache(db, redis_client, user):
+    user.is_active = False
+    db.flush()
+    db.rollback()
+
+    assert redis_client.exists(USER_CACHE_KEY.format(user_id=user.id))
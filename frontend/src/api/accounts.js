@@ -1,4 +1,8 @@
 import client from './client'
+import { runInBackground } from './jobs'
+
+// Операции с Instagram выполняются воркерами (?background=true), API не ждёт сеть
+const background = { params: { background: true } }
 
 export const accountsApi = {
   getAll: (params = {}) => client.get('/api/accounts/', { params }),
@@ -6,13 +10,16 @@ export const accountsApi = {
   create: (data) => client.post('/api/accounts/', data),
   update: (id, data) => client.put(`/api/accounts/${id}`, data),
   delete: (id) => client.delete(`/api/accounts/${id}`),
-  login: (id, data = {}) => client.post(`/api/accounts/${id}/login`, data),
-  getStatus: (id) => client.get(`/api/accounts/${id}/status`),
-  getProfile: (id) => client.get(`/api/accounts/${id}/profile`),
-  updateProfile: (id, data) => client.put(`/api/accounts/${id}/profile`, data),
-  setProfilePrivacy: (id, isPrivate) => client.post(`/api/accounts/${id}/profile/privacy`, {
+  bulkDelete: (accountIds) => client.post('/api/accounts/bulk-delete', { account_ids: accountIds }),
+  bulkUpdate: (data) => client.post('/api/accounts/bulk-update', data),
+  login: (id, data = {}) => runInBackground(client.post(`/api/accounts/${id}/login`, data, background)),
+  submit2fa: (id, code) => runInBackground(client.post(`/api/accounts/${id}/2fa`, { code }, background)),
+  getStatus: (id) => runInBackground(client.get(`/api/accounts/${id}/status`, background)),
+  getProfile: (id) => runInBackground(client.get(`/api/accounts/${id}/profile`, background)),
+  updateProfile: (id, data) => runInBackground(client.put(`/api/accounts/${id}/profile`, data, background)),
+  setProfilePrivacy: (id, isPrivate) => runInBackground(client.post(`/api/accounts/${id}/profile/privacy`, {
     is_private: isPrivate
-  }),
+  }, background)),
   importSessionFromText: (data) => client.post('/api/accounts/import-session-from-text', data),
 }
 
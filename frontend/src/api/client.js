@@ -57,5 +57,11 @@ client.interceptors.response.use(
   }
 )
 
+// Списки отдаются страницами: курсор следующей страницы - в заголовке X-Next-Cursor
+export const getNextCursor = (response) => response.headers['x-next-cursor'] || undefined
+
+// Приблизительное общее число строк (запрос с with_total=true)
+export const getTotalEstimate = (response) => Number(response.headers['x-total-estimate'] || 0)
+
 export default client
 
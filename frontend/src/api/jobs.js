@@ -0,0 +1,37 @@
+import client from './client'
+
+const POLL_INTERVAL_MS = 1500
+const POLL_TIMEOUT_MS = 5 * 60 * 1000
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms))
+
+export const jobsApi = {
+  get: (jobId) => client.get(`/api/jobs/${jobId}`),
+}
+
+// Операция с Instagram в фоне (?background=true): ждём результат задачи опросом
+// GET /api/jobs/{job_id}. Возвращает ответ в том же виде, что и синхронный endpoint
+// ({ data: result }), ошибка операции - исключение с её сообщением.
+export async function runInBackground(request) {
+  const accepted = await request
+  if (accepted.status !== 202) {
+    return accepted
+  }
+
+  const jobId = accepted.data.job_id
+  const deadline = Date.now() + POLL_TIMEOUT_MS
+  while (Date.now() < deadline) {
+    await sleep(POLL_INTERVAL_MS)
+    const { data: job } = await jobsApi.get(jobId)
+    if (job.status === 'success') {
+      if (job.result && job.result.success === false) {
+        throw new Error(job.result.message || 'Операция не выполнена')
+      }
+      return { data: job.result }
+    }
+    if (job.status === 'failure') {
+      throw new Error(job.error || 'Операция завершилась с ошибкой')
+    }
+  }
+  throw new Error('Операция не завершилась за отведённое время')
+}
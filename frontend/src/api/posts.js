@@ -1,4 +1,5 @@
 import client from './client'
+import { runInBackground } from './jobs'
 
 export const postsApi = {
   getAll: (params = {}) => client.get('/api/posts/', { params }),
@@ -8,9 +9,20 @@ export const postsApi = {
   }),
   update: (id, data) => client.put(`/api/posts/${id}`, data),
   delete: (id) => client.delete(`/api/posts/${id}`),
-  publish: (id) => client.post(`/api/posts/${id}/publish`),
-  getExecutions: (id) => client.get(`/api/posts/${id}/executions`),
+  bulkDelete: (postIds) => client.post('/api/posts/bulk-delete', { post_ids: postIds }),
+  bulkArchive: (postIds, archived = true) => client.post('/api/posts/bulk-archive', { post_ids: postIds, archived }),
+  publish: (id, scheduledAt = null) => client.post(`/api/posts/${id}/publish`, null, {
+    params: scheduledAt ? { scheduled_at: scheduledAt } : {},
+  }),
+  reschedule: (id, scheduledAt) => client.post(`/api/posts/${id}/schedule`, null, {
+    params: { scheduled_at: scheduledAt },
+  }),
+  cancelSchedule: (id) => client.post(`/api/posts/${id}/cancel-schedule`),
+  retryFailed: (id) => client.post(`/api/posts/${id}/retry-failed`),
+  getExecutions: (id, params = {}) => client.get(`/api/posts/${id}/executions`, { params }),
   getTranslations: (id) => client.post(`/api/posts/${id}/translate`),
-  testPost: (postId, accountId) => client.post(`/api/posts/${postId}/test-post/${accountId}`),
+  testPost: (postId, accountId) => runInBackground(
+    client.post(`/api/posts/${postId}/test-post/${accountId}`, null, { params: { background: true } })
+  ),
 }
 
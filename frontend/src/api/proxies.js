@@ -5,6 +5,9 @@ export const proxiesApi = {
   getAvailable: () => client.get('/api/proxies/available'),
   getById: (id) => client.get(`/api/proxies/${id}`),
   create: (data) => client.post('/api/proxies/', data),
+  importList: (formData) => client.post('/api/proxies/import', formData, {
+    headers: { 'Content-Type': 'multipart/form-data' },
+  }),
   update: (id, data) => client.put(`/api/proxies/${id}`, data),
   delete: (id) => client.delete(`/api/proxies/${id}`),
   check: (id) => client.post(`/api/proxies/${id}/check`),
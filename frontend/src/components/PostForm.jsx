@@ -9,6 +9,7 @@ export default function PostForm({ groups, onSuccess }) {
     original_language: 'ru',
     target_groups: [],
     media_type: 'photo',
+    scheduled_at: '',
   })
   const [files, setFiles] = useState([])
 
@@ -37,6 +38,10 @@ export default function PostForm({ groups, onSuccess }) {
     formDataToSend.append('original_language', formData.original_language)
     formDataToSend.append('media_type', formData.media_type)
     formDataToSend.append('target_groups', JSON.stringify(formData.target_groups))
+    if (formData.scheduled_at) {
+      // datetime-local - локальное время браузера, сервер хранит UTC
+      formDataToSend.append('scheduled_at', new Date(formData.scheduled_at).toISOString())
+    }
 
     await createMutation.mutateAsync(formDataToSend)
   }
@@ -137,6 +142,21 @@ export default function PostForm({ groups, onSuccess }) {
         </select>
       </div>
 
+      <div>
+        <label className="block text-sm font-medium text-gray-700 mb-1">
+          Время публикации
+        </label>
+        <input
+          type="datetime-local"
+          value={formData.scheduled_at}
+          onChange={(e) => setFormData({ ...formData, scheduled_at: e.target.value })}
+          className="input"
+        />
+        <p className="mt-1 text-xs text-gray-500">
+          Если указано, кнопка публикации запланирует пост на это время
+        </p>
+      </div>
+
       <div>
         <label className="block text-sm font-medium text-gray-700 mb-2">
           Группы для публикации *
@@ -1,6 +1,7 @@
 import { useState } from 'react'
-import { useQuery, useMutation, useQueryClient } from 'react-query'
+import { useQuery, useInfiniteQuery, useMutation, useQueryClient } from 'react-query'
 import { accountsApi } from '../api/accounts'
+import { getNextCursor } from '../api/client'
 import { groupsApi } from '../api/groups'
 import { Plus, Edit, Trash2, LogIn, RefreshCw, CheckCircle, XCircle, Clock, User, Upload } from 'lucide-react'
 import Modal from '../components/Modal'
@@ -18,9 +19,19 @@ export default function Accounts() {
   const [loginAccount, setLoginAccount] = useState(null)
   const queryClient = useQueryClient()
 
-  const { data: accounts, isLoading } = useQuery('accounts', () => 
-    accountsApi.getAll().then(r => r.data)
+  const {
+    data: accountPages,
+    isLoading,
+    hasNextPage,
+    fetchNextPage,
+    isFetchingNextPage,
+  } = useInfiniteQuery(
+    ['accounts', 'list'],
+    ({ pageParam }) => accountsApi.getAll({ cursor: pageParam })
+      .then(r => ({ items: r.data, nextCursor: getNextCursor(r) })),
+    { getNextPageParam: (lastPage) => lastPage.nextCursor }
   )
+  const accounts = accountPages?.pages.flatMap(page => page.items)
   const { data: groups } = useQuery('groups', () => 
     groupsApi.getAll().then(r => Array.isArray(r.data) ? r.data : [])
   )
@@ -182,6 +193,17 @@ export default function Accounts() {
             </tbody>
           </table>
         </div>
+        {hasNextPage && (
+          <div className="pt-4 text-center">
+            <button
+              onClick={() => fetchNextPage()}
+              disabled={isFetchingNextPage}
+              className="btn btn-secondary"
+            >
+              {isFetchingNextPage ? 'Загрузка...' : 'Показать ещё'}
+            </button>
+          </div>
+        )}
       </div>
 
       <Modal isOpen={isModalOpen} onClose={() => setIsModalOpen(false)} title={editingAccount ? 'Редактировать аккаунт' : 'Добавить аккаунт'}>
@@ -3,17 +3,27 @@ import { accountsApi } from '../api/accounts'
 import { groupsApi } from '../api/groups'
 import { postsApi } from '../api/posts'
 import { proxiesApi } from '../api/proxies'
+import { getTotalEstimate } from '../api/client'
 import { Users, FolderTree, FileImage, Network, CheckCircle, XCircle, Clock } from 'lucide-react'
 
 export default function Dashboard() {
-  const { data: accounts } = useQuery('accounts', () => accountsApi.getAll().then(r => r.data))
+  // Счётчики аккаунтов - по оценке X-Total-Estimate, без выгрузки всего списка
+  const { data: totalAccounts = 0 } = useQuery(['accounts', 'total'], () =>
+    accountsApi.getAll({ limit: 1, with_total: true }).then(getTotalEstimate)
+  )
+  const { data: activeAccounts = 0 } = useQuery(['accounts', 'total', 'active'], () =>
+    accountsApi.getAll({ limit: 1, with_total: true, status_filter: 'active' }).then(getTotalEstimate)
+  )
   const { data: groups } = useQuery('groups', () => groupsApi.getAll().then(r => r.data))
-  const { data: posts } = useQuery('posts', () => postsApi.getAll().then(r => r.data))
+  // Только число постов: одна строка и оценка общего количества из заголовка
+  const { data: postsTotal } = useQuery(['posts', 'total'], () =>
+    postsApi.getAll({ limit: 1, with_total: true }).then(getTotalEstimate)
+  )
   const { data: proxies } = useQuery('proxies', () => proxiesApi.getAll().then(r => r.data))
+  const { data: accounts } = useQuery(['accounts', 'recent'], () =>
+    accountsApi.getAll({ limit: 5 }).then(r => r.data)
+  )
 
-  const activeAccounts = accounts?.filter(acc => acc.status === 'active')?.length || 0
-  const totalAccounts = accounts?.length || 0
-  
   const stats = [
     {
       name: 'Аккаунты',
@@ -32,7 +42,7 @@ export default function Dashboard() {
     },
     {
       name: 'Посты',
-      value: posts?.length || 0,
+      value: postsTotal || 0,
       icon: FileImage,
       color: 'text-purple-600',
       bgColor: 'bg-purple-50',
@@ -1,8 +1,9 @@
 import { useState } from 'react'
-import { useQuery, useMutation, useQueryClient } from 'react-query'
+import { useQuery, useInfiniteQuery, useMutation, useQueryClient } from 'react-query'
 import { postsApi } from '../api/posts'
+import { getNextCursor } from '../api/client'
 import { groupsApi } from '../api/groups'
-import { Plus, Send, Eye, FileImage } from 'lucide-react'
+import { Plus, Send, Eye, FileImage, Clock, XCircle } from 'lucide-react'
 import Modal from '../components/Modal'
 import PostForm from '../components/PostForm'
 
@@ -11,9 +12,19 @@ export default function Posts() {
   const [selectedPost, setSelectedPost] = useState(null)
   const queryClient = useQueryClient()
 
-  const { data: posts, isLoading } = useQuery('posts', () => 
-    postsApi.getAll().then(r => r.data)
+  const {
+    data: postPages,
+    isLoading,
+    hasNextPage,
+    fetchNextPage,
+    isFetchingNextPage,
+  } = useInfiniteQuery(
+    ['posts', 'list'],
+    ({ pageParam }) => postsApi.getAll({ cursor: pageParam })
+      .then(r => ({ items: r.data, nextCursor: getNextCursor(r) })),
+    { getNextPageParam: (lastPage) => lastPage.nextCursor }
   )
+  const posts = postPages?.pages.flatMap(page => page.items)
   const { data: groups } = useQuery('groups', () => 
     groupsApi.getAll().then(r => r.data)
   )
@@ -31,12 +42,48 @@ export default function Posts() {
     }
   )
 
+  const scheduleMutation = useMutation(
+    ({ id, scheduledAt }) => scheduledAt
+      ? postsApi.reschedule(id, scheduledAt)
+      : postsApi.cancelSchedule(id),
+    {
+      onSuccess: (response) => {
+        queryClient.invalidateQueries('posts')
+        alert(response.data.message)
+      },
+      onError: (error) => {
+        alert(`Ошибка: ${error.message}`)
+      },
+    }
+  )
+
   const handlePublish = async (id) => {
     if (confirm('Запустить публикацию этого поста на все аккаунты в выбранных группах?')) {
       await publishMutation.mutateAsync(id)
     }
   }
 
+  const handleReschedule = async (post) => {
+    // Текущее время поста (UTC в API) в местном времени, формат поля ввода
+    const scheduled = new Date(post.scheduled_at + 'Z')
+    const current = new Date(scheduled.getTime() - scheduled.getTimezoneOffset() * 60000)
+      .toISOString().slice(0, 16).replace('T', ' ')
+    const value = prompt('Новое время публикации (ГГГГ-ММ-ДД ЧЧ:ММ, местное время)', current)
+    if (!value) return
+    const date = new Date(value.replace(' ', 'T'))
+    if (isNaN(date.getTime())) {
+      alert('Некорректная дата')
+      return
+    }
+    await scheduleMutation.mutateAsync({ id: post.id, scheduledAt: date.toISOString() })
+  }
+
+  const handleCancelSchedule = async (id) => {
+    if (confirm('Отменить запланированную публикацию? Пост вернётся в черновики.')) {
+      await scheduleMutation.mutateAsync({ id, scheduledAt: null })
+    }
+  }
+
   if (isLoading) {
     return <div className="text-center py-12">Загрузка...</div>
   }
@@ -66,7 +113,9 @@ export default function Posts() {
                 <PostStatusBadge status={post.status} />
               </div>
               <span className="text-xs text-gray-500">
-                {new Date(post.created_at).toLocaleDateString('ru-RU')}
+                {post.scheduled_at
+                  ? `на ${new Date(post.scheduled_at + 'Z').toLocaleString('ru-RU')}`
+                  : new Date(post.created_at).toLocaleDateString('ru-RU')}
               </span>
             </div>
             
@@ -95,12 +144,42 @@ export default function Posts() {
                     <Send className="h-4 w-4" />
                   </button>
                 )}
+                {post.status === 'pending' && post.scheduled_at && (
+                  <>
+                    <button
+                      onClick={() => handleReschedule(post)}
+                      className="text-yellow-600 hover:text-yellow-900"
+                      title="Перенести"
+                    >
+                      <Clock className="h-4 w-4" />
+                    </button>
+                    <button
+                      onClick={() => handleCancelSchedule(post.id)}
+                      className="text-red-600 hover:text-red-900"
+                      title="Отменить публикацию"
+                    >
+                      <XCircle className="h-4 w-4" />
+                    </button>
+                  </>
+                )}
               </div>
             </div>
           </div>
         ))}
       </div>
 
+      {hasNextPage && (
+        <div className="text-center">
+          <button
+            onClick={() => fetchNextPage()}
+            disabled={isFetchingNextPage}
+            className="btn btn-secondary"
+          >
+            {isFetchingNextPage ? 'Загрузка...' : 'Показать ещё'}
+          </button>
+        </div>
+      )}
+
       <Modal isOpen={isModalOpen} onClose={() => setIsModalOpen(false)} title="Создать пост">
         <PostForm
           groups={groups || []}
@@ -135,10 +214,24 @@ function PostStatusBadge({ status }) {
   return <span className={`badge ${config.className}`}>{config.label}</span>
 }
 
+// Все выполнения поста: API отдаёт их страницами по next_cursor
+async function fetchAllExecutions(postId) {
+  const executions = []
+  let statistics = null
+  let cursor
+  do {
+    const { data } = await postsApi.getExecutions(postId, { limit: 1000, cursor })
+    executions.push(...data.executions)
+    statistics = data.statistics
+    cursor = data.next_cursor || undefined
+  } while (cursor)
+  return { executions, statistics }
+}
+
 function PostDetailsModal({ post, groups, onClose }) {
   const { data: executions } = useQuery(
     ['post-executions', post.id],
-    () => postsApi.getExecutions(post.id).then(r => r.data),
+    () => fetchAllExecutions(post.id),
     { enabled: !!post, refetchInterval: 5000 } // Обновление каждые 5 секунд
   )
 